@@ -0,0 +1,72 @@
+import time
+
+import minqlx
+from minqlx import Plugin
+
+
+def relay_to_quake_chat(msg):
+    """
+    Relays a message from discord to the Quake Live chat. The message is queued with the mydiscordbot plugin, which
+    sends it together with the other relayed messages on the next frame, or sent right away if the plugin is not
+    loaded.
+
+    :param: msg: the message to send to the Quake Live chat
+    """
+    # noinspection PyProtectedMember
+    if "mydiscordbot" not in Plugin._loaded_plugins:
+        minqlx.CHAT_CHANNEL.reply(msg)
+        return
+
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    Plugin._loaded_plugins["mydiscordbot"].quake_chat.add(msg)  # type: ignore
+
+
+class PeriodicJobMetrics:
+    """
+    Keeps track of the runs of a periodic job of a discord extension, so that the mydiscordbot plugin can report them
+    with its status.
+
+    discord.ext.tasks loops never skip a run: a run that takes longer than the job's interval just delays the next run,
+    which then starts right away. Those runs are counted as overruns.
+    """
+
+    def __init__(self, interval):
+        """
+        :param: interval: the amount of seconds between two runs of the job
+        """
+        self.interval = interval
+        self.runs = 0
+        self.overruns = 0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+
+    async def measure(self, job, *args):
+        """
+        Runs the given job, and records how long it took, even if it raised an exception.
+
+        :param: job: the coroutine function of the job
+        :param: args: the arguments passed to the job
+        """
+        started = time.monotonic()
+        try:
+            await job(*args)
+        finally:
+            self.record(time.monotonic() - started)
+
+    def record(self, duration):
+        self.runs += 1
+        self.last_duration = duration
+        self.total_duration += duration
+        if duration > self.interval:
+            self.overruns += 1
+
+    def metrics(self):
+        """
+        :return: the number of runs and overruns of the job, and how long the job took
+        """
+        return {
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "last_duration": self.last_duration,
+            "average_duration": self.total_duration / self.runs if self.runs > 0 else 0.0,
+        }
@@ -1,6 +1,4 @@
 import asyncio
-import threading
-import time
 from datetime import timedelta, datetime, timezone
 from contextlib import suppress
 
@@ -9,12 +7,19 @@ from discord import PrivacyLevel, EntityType, EventStatus
 from discord.errors import NotFound, Forbidden
 
 # noinspection PyPackageRequirements
-from discord.utils import utcnow
+from discord.ext import tasks
+
+# noinspection PyPackageRequirements
+from discord.ext.commands import Cog
 
-import schedule  # type: ignore
+# noinspection PyPackageRequirements
+from discord.utils import utcnow
 
+import minqlx
 from minqlx import Plugin
 
+from . import PeriodicJobMetrics
+
 
 async def create_and_start_event(bot):
     event_name = Plugin.get_cvar("qlx_discord_ext_event_name")
@@ -81,23 +86,53 @@ async def end_event(bot):
         await asyncio.gather(*end_events)
 
 
-def check_playing_activity(bot):
+async def check_playing_activity(bot):
     players = Plugin.players()
     if len(players) == 0:
-        bot.loop.create_task(end_event(bot))
+        await end_event(bot)
     else:
-        bot.loop.create_task(create_and_start_event(bot))
+        await create_and_start_event(bot)
+
+
+class EventScheduler(Cog):
+    """
+    Uses:
+    * qlx_discord_ext_event_name (default: None) The name of the scheduled event on discord.
+    * qlx_discord_ext_event_location (default: None) The location shown for the scheduled event on discord.
+    * qlx_discord_ext_event_check_interval (default: 60) Amount of seconds between checks for playing activity on the
+    server.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        Plugin.set_cvar_once("qlx_discord_ext_event_check_interval", "60")
+
+        self.check_interval = Plugin.get_cvar("qlx_discord_ext_event_check_interval", int) or 60
+
+        self.job_metrics = PeriodicJobMetrics(self.check_interval)
+
+        super().__init__()
+
+    async def cog_load(self):
+        self.playing_activity_check.change_interval(seconds=self.check_interval)
+        self.playing_activity_check.start()
+
+    async def cog_unload(self):
+        self.playing_activity_check.cancel()
+
+    @tasks.loop(seconds=60)
+    async def playing_activity_check(self):
+        # noinspection PyBroadException
+        try:
+            await self.job_metrics.measure(check_playing_activity, self.bot)
+        except Exception:
+            # a failing check must not end the loop, it would not be restarted until the extension is reloaded
+            minqlx.log_exception()
 
 
 async def setup(bot):
     if not bot.intents.guild_scheduled_events:
         raise ValueError("client needs guild_scheduled_events for this extension")
 
-    schedule.every(1).minute.do(check_playing_activity, bot)
-    threading.Thread(target=run_schedule).start()
-
-
-def run_schedule():
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    await bot.add_cog(EventScheduler(bot))
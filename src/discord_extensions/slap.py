@@ -5,6 +5,8 @@ from discord import app_commands, PartialMessageable, Member
 
 from minqlx import Plugin
 
+from . import relay_to_quake_chat
+
 
 @app_commands.context_menu(name="slap")
 @app_commands.guild_only()
@@ -71,10 +73,10 @@ async def send_to_discord_and_quake(interaction, message):
     show_channel_name = Plugin.get_cvar("qlx_displayChannelForDiscordRelayChannels", bool) or False
     discord_message_prefix = Plugin.get_cvar("qlx_discordMessagePrefix") or "[DISCORD]"
     if not show_channel_name or interaction.channel is None or isinstance(interaction.channel, PartialMessageable):
-        Plugin.msg(f"{discord_message_prefix}^2 {quake_message}")
+        relay_to_quake_chat(f"{discord_message_prefix}^2 {quake_message}")
         return
 
-    Plugin.msg(f"{discord_message_prefix} ^5#{interaction.channel.name}^7:^2 {quake_message}")
+    relay_to_quake_chat(f"{discord_message_prefix} ^5#{interaction.channel.name}^7:^2 {quake_message}")
 
 
 async def setup(bot):
@@ -1,3 +1,5 @@
+import time
+
 # noinspection PyPackageRequirements
 import discord
 
@@ -7,8 +9,7 @@ from discord import app_commands
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog, Bot, Command
 
-import minqlx
-from minqlx import Plugin, NonexistentGameError
+from minqlx import Plugin
 
 
 def get_game_info(game):
@@ -31,15 +32,17 @@ def get_game_info(game):
     return "Warmup"
 
 
-def player_data():
+def player_data(game):
     """
     Formats the top 5 scorers connected to the server in a string. The return value may be used for status messages
     and used in topics to indicate reveal more data about the server and its current game.
 
+    :param: game: the snapshot of the game to take the players from
+
     :return: string of the current top5 scorers with the scores and connection time to the server
     """
     _player_data = ""
-    teams = Plugin.teams()
+    teams = game.teams()
     if len(teams["red"]) > 0:
         _player_data += f"\n**R:** {team_data(teams['red'])}"
     if len(teams["blue"]) > 0:
@@ -70,15 +73,30 @@ def team_data(player_list):
     return _team_data
 
 
+def published_game_state():
+    """
+    Looks up the game state snapshots the mydiscordbot plugin publishes on the game thread, so that the game is not
+    accessed from the bot's thread.
+
+    :return: the game state publisher of the mydiscordbot plugin, or None if it is not loaded
+    """
+    # noinspection PyProtectedMember
+    if "mydiscordbot" not in Plugin._loaded_plugins:
+        return None
+
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    return Plugin._loaded_plugins["mydiscordbot"].game_state  # type: ignore
+
+
 def game_status_with_teams():
-    try:
-        game = minqlx.Game()
-    except NonexistentGameError:
+    game_state = published_game_state()
+    game = game_state.snapshot if game_state is not None else None
+    if game is None:
         return "Currently no game running."
 
     ginfo = get_game_info(game)
 
-    num_players = len(Plugin.players())
+    num_players = len(game.players)
     max_players = game.maxclients
 
     maptitle = game.map_title if game.map_title else game.map
@@ -86,7 +104,7 @@ def game_status_with_teams():
 
     return (
         f"{ginfo} on **{Plugin.clean_text(maptitle)}** ({gametype}) "
-        f"with **{num_players}/{max_players}** players. {player_data()}"
+        f"with **{num_players}/{max_players}** players. {player_data(game)}"
     )
 
 
@@ -112,6 +130,8 @@ class Status(Cog):
     server.
     * qlx_discord_ext_status_show_spectators (default: "0") Whether or not !status will also show the currently
     connected spectator players
+    * qlx_discord_ext_status_max_staleness (default: "60") Maximum age in seconds of a cached status reply. Replies
+    are reused as long as the game state did not change and they are not older than this. Set to "0" to disable caching.
     * qlx_discordRelayChannelIds (default: "") Comma separated list of channel ids for full relay.
     * qlx_discordTriggeredChannelIds (default: "") Comma separated list of channel ids for triggered relay.
     * qlx_discordTriggeredChatMessagePrefix (default: "") Prefix any triggered message from QL with this text portion.
@@ -123,6 +143,7 @@ class Status(Cog):
 
         Plugin.set_cvar_once("qlx_discordTriggerStatus", "status")
         Plugin.set_cvar_once("qlx_discord_ext_status_show_spectators", "0")
+        Plugin.set_cvar_once("qlx_discord_ext_status_max_staleness", "60")
         Plugin.set_cvar_once("qlx_discordTriggeredChatMessagePrefix", "")
         Plugin.set_cvar_once("qlx_discordRelayChannelIds", "")
         Plugin.set_cvar_once("qlx_discordTriggeredChannelIds", "")
@@ -131,6 +152,11 @@ class Status(Cog):
         self.discord_triggered_channel_message_prefix = Plugin.get_cvar("qlx_discordTriggeredChatMessagePrefix") or ""
         self.discord_relay_channel_ids = int_set(Plugin.get_cvar("qlx_discordRelayChannelIds", set))
         self.discord_triggered_channel_ids = int_set(Plugin.get_cvar("qlx_discordTriggeredChannelIds", set))
+        self.max_staleness: float = Plugin.get_cvar("qlx_discord_ext_status_max_staleness", float) or 0.0
+
+        self.cached_status: str | None = None
+        self.cached_status_version: int | None = None
+        self.cached_status_at: float = 0.0
 
         self.bot.add_command(
             Command(
@@ -156,6 +182,31 @@ class Status(Cog):
 
         super().__init__()
 
+    def game_status(self):
+        """
+        Returns the current game status with the teams, reusing the last reply as long as the game state published by
+        the mydiscordbot plugin did not change and the reply is not older than the configured maximum staleness.
+        """
+        game_state = published_game_state()
+        if game_state is None:
+            # without a published version, a cached reply could not tell when the game state changed
+            return game_status_with_teams()
+
+        # read the version before rendering, so a reply is never stored with a newer version than it was built from
+        version = game_state.version
+        now = time.monotonic()
+        if (
+            self.cached_status is not None
+            and self.cached_status_version == version
+            and now - self.cached_status_at < self.max_staleness
+        ):
+            return self.cached_status
+
+        self.cached_status = game_status_with_teams()
+        self.cached_status_version = version
+        self.cached_status_at = now
+        return self.cached_status
+
     def is_message_in_relay_or_triggered_channel(self, ctx):
         """
         Checks whether a message was either sent in a configured relay or triggered channel
@@ -170,21 +221,20 @@ class Status(Cog):
 
         :param: ctx: the context the trigger happened in
         """
-        reply = game_status_with_teams()
+        reply = self.game_status()
 
         if self.is_message_in_triggered_channel(ctx):
             reply = f"{self.discord_triggered_channel_message_prefix} {reply}"
 
         await ctx.reply(reply)
 
-    # noinspection PyMethodMayBeStatic
     async def slash_trigger_status(self, interaction):
         """
         Triggers game status information sent towards the originating channel
 
         :param: interaction: the interaction that triggered the status request
         """
-        reply = game_status_with_teams()
+        reply = self.game_status()
 
         await interaction.response.send_message(content=reply)
 
@@ -1,10 +1,7 @@
 import asyncio
-import threading
-import time
 import contextlib
-
-# noinspection PyPackageRequirements
-import schedule
+from collections import defaultdict
+from itertools import islice
 
 # noinspection PyPackageRequirements
 from discord import (
@@ -15,6 +12,9 @@ from discord import (
     Member,
 )
 
+# noinspection PyPackageRequirements
+from discord.ext import tasks
+
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog, GroupCog
 
@@ -22,11 +22,77 @@ import minqlx
 from minqlx import Plugin, NonexistentGameError
 from minqlx.database import Redis
 
+from . import PeriodicJobMetrics
+
 DISCORD_MAP_SUBSCRIPTION_KEY = "minqlx:discord:{}:subscribed_maps"
 DISCORD_PLAYER_SUBSCRIPTION_KEY = "minqlx:discord:{}:subscribed_players"
 DISCORD_MEMBER_SUBSCRIPTION_KEY = "minqlx:discord:{}:subscribed_members"
+DISCORD_MAP_SUBSCRIBERS_KEY = "minqlx:maps:{}:discord_subscribers"
+DISCORD_PLAYER_SUBSCRIBERS_KEY = "minqlx:players:{}:discord_subscribers"
+DISCORD_MEMBER_SUBSCRIBERS_KEY = "minqlx:discord:{}:subscribers"
+DISCORD_SUBSCRIBERS_INDEXED_KEY = "minqlx:discord:subscribers_indexed"
 LONG_MAP_NAMES_KEY = "minqlx:maps:longnames"
 LAST_USED_NAME_KEY = "minqlx:players:{}:last_used_name"
+NAME_LOOKUP_BATCH_SIZE = 1000
+
+
+class SubstringIndex:
+    """Case-insensitive substring search over keyed texts. Candidates are narrowed down through a trigram index
+    before the actual substring check, so lookups stay fast with tens of thousands of entries."""
+
+    def __init__(self):
+        self.texts = {}
+        self.trigrams = defaultdict(set)
+        self._sorted_keys = None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, key):
+        return key in self.texts
+
+    @staticmethod
+    def trigrams_of(*texts):
+        return {text[index : index + 3] for text in texts for index in range(len(text) - 2)}
+
+    def update(self, key, *texts):
+        lowered_texts = tuple(text.lower() for text in texts)
+        if self.texts.get(key) == lowered_texts:
+            return
+
+        self.remove(key)
+        self.texts[key] = lowered_texts
+        for trigram in self.trigrams_of(*lowered_texts):
+            self.trigrams[trigram].add(key)
+        self._sorted_keys = None
+
+    def remove(self, key):
+        lowered_texts = self.texts.pop(key, None)
+        if lowered_texts is None:
+            return
+
+        for trigram in self.trigrams_of(*lowered_texts):
+            keys = self.trigrams[trigram]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.trigrams[trigram]
+        self._sorted_keys = None
+
+    def search(self, query):
+        """Yields the keys of all texts containing the query in ascending key order."""
+        lowered_query = query.lower()
+        query_trigrams = self.trigrams_of(lowered_query)
+        if len(query_trigrams) == 0:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self.texts)
+            candidates = self._sorted_keys
+        else:
+            posting_lists = sorted((self.trigrams.get(trigram, set()) for trigram in query_trigrams), key=len)
+            candidates = sorted(set.intersection(*posting_lists))
+
+        for key in candidates:
+            if any(lowered_query in text for text in self.texts.get(key, ())):
+                yield key
 
 
 class SubscriberCog(Cog):
@@ -63,12 +129,22 @@ class SubscriberCog(Cog):
         for mapname, long_map_name in self.long_map_names_lookup.items():
             if mapname in self.installed_maps and long_map_name.lower() != mapname.lower():
                 self.formatted_installed_maps[mapname] = f"{long_map_name} ({mapname})"
+        self.map_index = SubstringIndex()
+        self.index_installed_maps()
 
-        self.known_players = self.gather_known_players()
+        self.known_players = {}
+        self.player_index = SubstringIndex()
+        self.gather_known_players()
+        self.build_subscriber_indexes()
 
         self.last_notified_map = None
         self.notified_steam_ids = []
 
+        Plugin.set_cvar_once("qlx_discord_ext_subscribe_check_interval", "60")
+        self.check_interval = Plugin.get_cvar("qlx_discord_ext_subscribe_check_interval", int) or 60
+
+        self.job_metrics = PeriodicJobMetrics(self.check_interval)
+
         if not self.bot.intents.presences:
             self.subscribe_group.remove_command("member")
             self.unsubscribe_group.remove_command("member")
@@ -76,20 +152,90 @@ class SubscriberCog(Cog):
 
         super().__init__()
 
+    async def cog_load(self):
+        self.subscription_check.change_interval(seconds=self.check_interval)
+        self.subscription_check.start()
+
+    async def cog_unload(self):
+        self.subscription_check.cancel()
+
+    @tasks.loop(seconds=60)
+    async def subscription_check(self):
+        # noinspection PyBroadException
+        try:
+            await self.job_metrics.measure(self.check_subscriptions)
+        except Exception:
+            # a failing check must not end the loop, it would not be restarted until the extension is reloaded
+            minqlx.log_exception()
+
+    def index_installed_maps(self):
+        for mapname, formatted_long_name in self.formatted_installed_maps.items():
+            self.map_index.update(mapname, formatted_long_name)
+
     def gather_known_players(self):
-        returned = {}
-        prefix = LAST_USED_NAME_KEY.rsplit("{", maxsplit=1)[0]
-        suffix = LAST_USED_NAME_KEY.rsplit("}", maxsplit=1)[-1]
-        for key in self.db.keys(LAST_USED_NAME_KEY.format("*")):
-            steam_id_candidate = key.replace(prefix, "").replace(suffix, "")
+        prefix, suffix = LAST_USED_NAME_KEY.split("{}")
+        steam_ids = []
+        for key in self.db.scan_iter(match=LAST_USED_NAME_KEY.format("*")):
+            steam_id_candidate = key[len(prefix) : -len(suffix)]
             if not steam_id_candidate.isdigit():
                 continue
 
-            steam_id = int(steam_id_candidate)
-            last_used_name = self.db.get(key)
-            returned[steam_id] = Plugin.clean_text(last_used_name)
+            steam_ids.append(int(steam_id_candidate))
+            if len(steam_ids) >= NAME_LOOKUP_BATCH_SIZE:
+                self.remember_players_from_db(steam_ids)
+                steam_ids = []
+
+        self.remember_players_from_db(steam_ids)
+
+    def remember_players_from_db(self, steam_ids):
+        if len(steam_ids) == 0:
+            return
+
+        last_used_names = self.db.mget([LAST_USED_NAME_KEY.format(steam_id) for steam_id in steam_ids])
+        for steam_id, last_used_name in zip(steam_ids, last_used_names):
+            if last_used_name is None:
+                continue
+            self.remember_player(steam_id, Plugin.clean_text(last_used_name))
+
+    def remember_player(self, steam_id, clean_name):
+        self.known_players[steam_id] = clean_name
+        self.player_index.update(steam_id, clean_name, str(steam_id))
+
+    def build_subscriber_indexes(self):
+        if self.db.exists(DISCORD_SUBSCRIBERS_INDEXED_KEY):
+            return
+
+        for subscription_key, subscribers_key in (
+            (DISCORD_MAP_SUBSCRIPTION_KEY, DISCORD_MAP_SUBSCRIBERS_KEY),
+            (DISCORD_PLAYER_SUBSCRIPTION_KEY, DISCORD_PLAYER_SUBSCRIBERS_KEY),
+            (DISCORD_MEMBER_SUBSCRIPTION_KEY, DISCORD_MEMBER_SUBSCRIBERS_KEY),
+        ):
+            prefix, suffix = subscription_key.split("{}")
+            for key in self.db.scan_iter(match=subscription_key.format("*")):
+                discord_id_candidate = key[len(prefix) : -len(suffix)]
+                if not discord_id_candidate.isdigit():
+                    continue
+
+                subscriptions = self.db.smembers(key)
+                if len(subscriptions) == 0:
+                    continue
+
+                pipeline = self.db.pipeline()
+                for subscription in subscriptions:
+                    pipeline.sadd(subscribers_key.format(subscription), discord_id_candidate)
+                pipeline.execute()
+
+        self.db.set(DISCORD_SUBSCRIBERS_INDEXED_KEY, 1)
 
-        return returned
+    def subscribers_of(self, subscribers_key, subscription):
+        subscribers = []
+        for discord_str_id in self.db.smembers(subscribers_key.format(subscription)):
+            subscribed_discord_user = self.bot.get_user(int(discord_str_id))
+            if subscribed_discord_user is None:
+                continue
+            subscribers.append(subscribed_discord_user)
+
+        return subscribers
 
     @subscribe_group.command(name="map", description="Get notified when your favorite maps are played")  # type: ignore
     @app_commands.describe(mapname="the name of the map to subscribe to")
@@ -112,6 +258,7 @@ class SubscriberCog(Cog):
             return
 
         db_return_value = self.db.sadd(DISCORD_MAP_SUBSCRIPTION_KEY.format(interaction.user.id), stripped_mapname)
+        self.db.sadd(DISCORD_MAP_SUBSCRIBERS_KEY.format(stripped_mapname), interaction.user.id)
 
         if not db_return_value:
             immediate_reply_message = (
@@ -147,16 +294,11 @@ class SubscriberCog(Cog):
     @subscribe_map.autocomplete(name="mapname")
     async def subscribe_map_autocomplete(self, interaction, current):
         subscribed_maps = self.subscribed_maps_of(interaction.user.id)
-        filtered_candidates = [
-            mapname
-            for mapname, formatted_long_name in self.formatted_installed_maps.items()
-            if current.lower() in formatted_long_name.lower() and mapname not in subscribed_maps
-        ]
-        filtered_candidates.sort()
+        filtered_candidates = (mapname for mapname in self.map_index.search(current) if mapname not in subscribed_maps)
 
         return [
             app_commands.Choice(name=self.formatted_installed_maps[mapname], value=mapname)
-            for mapname in filtered_candidates[:25]
+            for mapname in islice(filtered_candidates, 25)
         ]
 
     @subscribe_group.command(  # type: ignore
@@ -184,7 +326,7 @@ class SubscriberCog(Cog):
             return
 
         if len(matching_players) > 1:
-            matching_player_names = [self.formatted_last_used_name(steam_id) for steam_id in matching_players]
+            matching_player_names = list(self.formatted_last_used_names(matching_players).values())
             formatted_player_names = "`, `".join(matching_player_names)
             reply_embed.description = (
                 f"More than one player matching your player name found. "
@@ -199,6 +341,7 @@ class SubscriberCog(Cog):
             DISCORD_PLAYER_SUBSCRIPTION_KEY.format(interaction.user.id),
             matching_steam_id,
         )
+        self.db.sadd(DISCORD_PLAYER_SUBSCRIBERS_KEY.format(matching_steam_id), interaction.user.id)
 
         last_used_name = self.formatted_last_used_name(matching_steam_id)
         if not db_return_value:
@@ -209,29 +352,43 @@ class SubscriberCog(Cog):
         await interaction.edit_original_response(embed=reply_embed)
 
         subscribed_players = self.subscribed_players_of(interaction.user.id)
-        formatted_players = "`, `".join(
-            [self.formatted_last_used_name(subscribed_steam_id) for subscribed_steam_id in subscribed_players]
-        )
+        formatted_players = "`, `".join(self.formatted_last_used_names(subscribed_players).values())
         reply_embed.description = (
             f"{immediate_reply_message}\nYou are currently subscribed to the following players: `{formatted_players}`"
         )
         await interaction.edit_original_response(embed=reply_embed)
 
     def find_matching_players(self, player):
-        if player.isdigit() and int(player) in self.known_players:
-            return [int(player)]
+        return list(self.iter_matching_players(player))
 
-        matching_steam_ids = []
-        for steam_id, player_name in self.known_players.items():
-            if player.lower() in player_name.lower() or player in str(steam_id):
-                matching_steam_ids.append(steam_id)
+    def iter_matching_players(self, player):
+        if player.isdigit() and int(player) in self.known_players:
+            yield int(player)
+            return
 
-        return matching_steam_ids
+        yield from self.player_index.search(player)
 
     def formatted_last_used_name(self, steam_id):
-        if not self.db.exists(LAST_USED_NAME_KEY.format(steam_id)):
-            return str(steam_id)
-        return Plugin.clean_text(self.db.get(LAST_USED_NAME_KEY.format(steam_id))).replace("`", r"\`")
+        return self.formatted_last_used_names([steam_id])[steam_id]
+
+    def formatted_last_used_names(self, steam_ids):
+        if len(steam_ids) == 0:
+            return {}
+
+        last_used_names = self.db.mget([LAST_USED_NAME_KEY.format(steam_id) for steam_id in steam_ids])
+        return {
+            steam_id: str(steam_id) if last_used_name is None else self.formatted_name(last_used_name)
+            for steam_id, last_used_name in zip(steam_ids, last_used_names)
+        }
+
+    def formatted_known_player_name(self, steam_id):
+        if steam_id not in self.known_players:
+            return self.formatted_last_used_name(steam_id)
+        return self.known_players[steam_id].replace("`", r"\`")
+
+    @staticmethod
+    def formatted_name(name):
+        return Plugin.clean_text(name).replace("`", r"\`")
 
     def subscribed_players_of(self, user_id):
         player_subscriptions = self.db.smembers(DISCORD_PLAYER_SUBSCRIPTION_KEY.format(user_id))
@@ -239,17 +396,16 @@ class SubscriberCog(Cog):
 
     @subscribe_player.autocomplete(name="player")
     async def subscribe_player_autocomplete(self, interaction, current):
-        subscribed_players = self.subscribed_players_of(interaction.user.id)
-        filtered_candidates = [
+        subscribed_players = set(self.subscribed_players_of(interaction.user.id))
+        filtered_candidates = (
             candidate_steam_id
-            for candidate_steam_id in self.find_matching_players(current)
+            for candidate_steam_id in self.iter_matching_players(current)
             if candidate_steam_id not in subscribed_players
-        ]
-        filtered_candidates.sort()
+        )
 
         return [
-            app_commands.Choice(name=self.formatted_last_used_name(steam_id), value=str(steam_id))
-            for steam_id in filtered_candidates[:25]
+            app_commands.Choice(name=self.formatted_known_player_name(steam_id), value=str(steam_id))
+            for steam_id in islice(filtered_candidates, 25)
         ]
 
     @subscribe_group.command(  # type: ignore
@@ -265,6 +421,7 @@ class SubscriberCog(Cog):
         reply_embed = Embed(color=Color.blurple())
         await interaction.response.defer(thinking=True, ephemeral=True)
         db_return_value = self.db.sadd(DISCORD_MEMBER_SUBSCRIPTION_KEY.format(interaction.user.id), member.id)
+        self.db.sadd(DISCORD_MEMBER_SUBSCRIBERS_KEY.format(member.id), interaction.user.id)
 
         if not db_return_value:
             immediate_reply_message = f"You already were subscribed to Quake Live activities of {member.mention}."
@@ -307,6 +464,7 @@ class SubscriberCog(Cog):
             return
 
         db_return_value = self.db.srem(DISCORD_MAP_SUBSCRIPTION_KEY.format(interaction.user.id), stripped_mapname)
+        self.db.srem(DISCORD_MAP_SUBSCRIBERS_KEY.format(stripped_mapname), interaction.user.id)
 
         if not db_return_value:
             immediate_reply_message = (
@@ -360,7 +518,7 @@ class SubscriberCog(Cog):
             return
 
         if len(matching_players) > 1:
-            matching_player_names = [self.formatted_last_used_name(steam_id) for steam_id in matching_players]
+            matching_player_names = list(self.formatted_last_used_names(matching_players).values())
             formatted_player_names = "`, `".join(matching_player_names)
             reply_embed.description = (
                 f"More than one player matching your player name found. "
@@ -373,8 +531,9 @@ class SubscriberCog(Cog):
         matching_steam_id = int(matching_players[0])
         db_return_value = self.db.srem(
             DISCORD_PLAYER_SUBSCRIPTION_KEY.format(interaction.user.id),
-            stripped_player_name,
+            matching_steam_id,
         )
+        self.db.srem(DISCORD_PLAYER_SUBSCRIBERS_KEY.format(matching_steam_id), interaction.user.id)
 
         last_used_name = self.formatted_last_used_name(matching_steam_id)
         if not db_return_value:
@@ -385,9 +544,7 @@ class SubscriberCog(Cog):
         await interaction.edit_original_response(embed=reply_embed)
 
         subscribed_players = self.subscribed_players_of(interaction.user.id)
-        formatted_players = "`, `".join(
-            [self.formatted_last_used_name(subscribed_steam_id) for subscribed_steam_id in subscribed_players]
-        )
+        formatted_players = "`, `".join(self.formatted_last_used_names(subscribed_players).values())
 
         if len(subscribed_players) == 0:
             reply_embed.description = f"{immediate_reply_message}\nYou are no longer subscribed to any players."
@@ -403,15 +560,16 @@ class SubscriberCog(Cog):
     async def unsubscribe_player_autocomplete(self, interaction, current):
         subscribed_players = self.subscribed_players_of(interaction.user.id)
 
+        subscribed_player_names = self.formatted_last_used_names(subscribed_players)
         candidates = [
             steam_id
-            for steam_id in subscribed_players
-            if current.lower() in self.formatted_last_used_name(steam_id).lower()
+            for steam_id, subscribed_player_name in subscribed_player_names.items()
+            if current.lower() in subscribed_player_name.lower()
         ]
         candidates.sort()
 
         return [
-            app_commands.Choice(name=self.formatted_last_used_name(steam_id), value=str(steam_id))
+            app_commands.Choice(name=subscribed_player_names[steam_id], value=str(steam_id))
             for steam_id in candidates[:25]
         ]
 
@@ -425,6 +583,7 @@ class SubscriberCog(Cog):
         reply_embed = Embed(color=Color.blurple())
         await interaction.response.defer(thinking=True, ephemeral=True)
         db_return_value = self.db.srem(DISCORD_MEMBER_SUBSCRIPTION_KEY.format(interaction.user.id), member.id)
+        self.db.srem(DISCORD_MEMBER_SUBSCRIBERS_KEY.format(member.id), interaction.user.id)
 
         if not db_return_value:
             immediate_reply_message = f"You were not subscribed to Quake Live activities of {member.mention}."
@@ -449,43 +608,22 @@ class SubscriberCog(Cog):
         await interaction.edit_original_response(embed=reply_embed)
 
     async def notify_map_change(self, mapname):
-        prefix = DISCORD_MAP_SUBSCRIPTION_KEY.split("{", maxsplit=1)[0]
-        suffix = DISCORD_MAP_SUBSCRIPTION_KEY.rsplit("}", maxsplit=1)[-1]
-
-        notifications = []
-        for key in self.db.keys(DISCORD_MAP_SUBSCRIPTION_KEY.format("*")):
-            if self.db.sismember(key, mapname):
-                discord_id = int(key.replace(prefix, "").replace(suffix, ""))
-                subscribed_discord_user = self.bot.get_user(discord_id)
-                if subscribed_discord_user is None:
-                    continue
-
-                notifications.append(
-                    subscribed_discord_user.send(
-                        content=f"`{self.format_mapname(mapname)}`, one of your favourite maps has been loaded!"
-                    )
-                )
+        notifications = [
+            subscribed_discord_user.send(
+                content=f"`{self.format_mapname(mapname)}`, one of your favourite maps has been loaded!"
+            )
+            for subscribed_discord_user in self.subscribers_of(DISCORD_MAP_SUBSCRIBERS_KEY, mapname)
+        ]
 
         await asyncio.gather(*notifications)
 
     async def notify_player_connected(self, player):
-        prefix = DISCORD_PLAYER_SUBSCRIPTION_KEY.split("{", maxsplit=1)[0]
-        suffix = DISCORD_PLAYER_SUBSCRIPTION_KEY.rsplit("}", maxsplit=1)[-1]
-
-        notifications = []
-        for key in self.db.keys(DISCORD_PLAYER_SUBSCRIPTION_KEY.format("*")):
-            if self.db.sismember(key, player.steam_id):
-                discord_id = int(key.replace(prefix, "").replace(suffix, ""))
-                subscribed_discord_user = self.bot.get_user(discord_id)
-
-                if subscribed_discord_user is None:
-                    continue
-
-                notifications.append(
-                    subscribed_discord_user.send(
-                        content=f"`{player.clean_name}`, one of your followed players, just connected to the server!"
-                    )
-                )
+        notifications = [
+            subscribed_discord_user.send(
+                content=f"`{player.clean_name}`, one of your followed players, just connected to the server!"
+            )
+            for subscribed_discord_user in self.subscribers_of(DISCORD_PLAYER_SUBSCRIBERS_KEY, player.steam_id)
+        ]
 
         await asyncio.gather(*notifications)
 
@@ -501,6 +639,8 @@ class SubscriberCog(Cog):
                 notification_actions.append(self.notify_map_change(self.last_notified_map))
 
         players = Plugin.players()
+        for player in players:
+            self.remember_player(player.steam_id, player.clean_name)
         new_players = [player for player in players if player.steam_id not in self.notified_steam_ids]
         for player in new_players:
             notification_actions.append(self.notify_player_connected(player))
@@ -528,40 +668,16 @@ class SubscriberCog(Cog):
         if relevant_activity is None:
             return
 
-        prefix = DISCORD_MEMBER_SUBSCRIPTION_KEY.split("{", maxsplit=1)[0]
-        suffix = DISCORD_MEMBER_SUBSCRIPTION_KEY.rsplit("}", maxsplit=1)[-1]
-
-        notifications = []
-        for key in self.db.keys(DISCORD_MEMBER_SUBSCRIPTION_KEY.format("*")):
-            if self.db.sismember(key, str(after.id)):
-                discord_id = int(key.replace(prefix, "").replace(suffix, ""))
-                informed_user = self.bot.get_user(discord_id)
-                if informed_user is None:
-                    continue
-
-                notifications.append(
-                    informed_user.send(
-                        content=f"{after.display_name}, a discord user you are subscribed to, "
-                        f"just started playing Quake Live."
-                    )
-                )
+        notifications = [
+            informed_user.send(
+                content=f"{after.display_name}, a discord user you are subscribed to, just started playing Quake Live."
+            )
+            for informed_user in self.subscribers_of(DISCORD_MEMBER_SUBSCRIBERS_KEY, after.id)
+        ]
 
         await asyncio.gather(*notifications)
 
 
-def check_subscriptions(cog):
-    cog.bot.loop.create_task(cog.check_subscriptions())
-
-
 async def setup(bot):
     # noinspection PyTypeChecker
-    subscriber_cog = SubscriberCog(bot, Redis("mydiscordbot"))
-    await bot.add_cog(subscriber_cog)
-    schedule.every(1).minute.do(check_subscriptions, subscriber_cog)
-    threading.Thread(target=run_schedule).start()
-
-
-def run_schedule():
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    await bot.add_cog(SubscriberCog(bot, Redis("mydiscordbot")))
@@ -1,11 +1,18 @@
-import threading
+import time
 from ast import literal_eval
 
+# noinspection PyPackageRequirements
+from discord.ext import tasks
+
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog
 
 import minqlx
-from minqlx import Plugin, NonexistentGameError
+from minqlx import Plugin
+
+# discord allows two topic edits per channel within ten minutes
+TOPIC_EDITS_PER_PERIOD = 2
+TOPIC_EDIT_PERIOD = 600
 
 
 def get_game_info(game):
@@ -32,13 +39,13 @@ def game_status_information(game):
     """
     Generate the text for the topic set on discord channels.
 
-    :param: game: the game to derive the status information from
+    :param: game: the snapshot of the game to derive the status information from
 
     :return: the topic that represents the current game state.
     """
     ginfo = get_game_info(game)
 
-    num_players = len(Plugin.players())
+    num_players = len(game.players)
     max_players = game.maxclients
 
     maptitle = game.map_title if game.map_title else game.map
@@ -65,12 +72,28 @@ def int_set(string_set):
     return returned
 
 
+def published_game_state():
+    """
+    Looks up the game state snapshots the mydiscordbot plugin publishes on the game thread, so that the game is not
+    accessed from the bot's thread.
+
+    :return: the game state publisher of the mydiscordbot plugin, or None if it is not loaded
+    """
+    # noinspection PyProtectedMember
+    if "mydiscordbot" not in Plugin._loaded_plugins:
+        return None
+
+    # noinspection PyProtectedMember,PyUnresolvedReferences
+    return Plugin._loaded_plugins["mydiscordbot"].game_state  # type: ignore
+
+
 class TopicUpdater(Cog):
     """
     Uses:
     * qlx_discordUpdateTopicOnTriggeredChannels (default: "1") Boolean flag to indicate whether to update the topic with
     the current game state on triggered relay channels. Your bot needs edit_channel permission for these channels.
-    * qlx_discordUpdateTopicInterval (default: 305) Amount of seconds between automatic topic updates
+    * qlx_discordUpdateTopicInterval (default: 305) Amount of seconds between automatic topic updates. Channels are
+    only edited when their topic changed, and not more often than discord permits, i.e. twice per ten minutes.
     * qlx_discordKeptTopicSuffixes (default: {}) A dictionary of channel_ids for kept topic suffixes and the related
     suffixes. Make sure to use single quotes for the suffixes.
     """
@@ -91,20 +114,38 @@ class TopicUpdater(Cog):
         self.discord_topic_update_interval = Plugin.get_cvar("qlx_discordUpdateTopicInterval", int) or 305
         self.discord_kept_topic_suffixes = literal_eval(Plugin.get_cvar("qlx_discordKeptTopicSuffixes", str) or "{}")
 
+        self.topic_edit_buckets = {}
+
         super().__init__()
 
     async def cog_load(self):
-        self._topic_updater()
-
-    def _topic_updater(self):
-        try:
-            game = minqlx.Game()
-            topic = game_status_information(game)
-            self.update_topics_on_relay_and_triggered_channels(topic)
-        except NonexistentGameError:
-            pass
-        finally:
-            threading.Timer(self.discord_topic_update_interval, self._topic_updater).start()
+        self.topic_updater.change_interval(seconds=self.discord_topic_update_interval)
+        self.topic_updater.start()
+
+    async def cog_unload(self):
+        self.topic_updater.cancel()
+
+    @tasks.loop(seconds=305)
+    async def topic_updater(self):
+        topic = self.game_topic()
+        if topic is None:
+            return
+
+        self.update_topics_on_relay_and_triggered_channels(topic)
+
+    # noinspection PyMethodMayBeStatic
+    def game_topic(self):
+        """
+        Derives the topic from the latest game state snapshot, so that the game is not accessed from the bot's thread.
+
+        :return: the topic that represents the current game state, or None if no game is running
+        """
+        game_state = published_game_state()
+        game = game_state.snapshot if game_state is not None else None
+        if game is None:
+            return None
+
+        return game_status_information(game)
 
     def update_topics_on_relay_and_triggered_channels(self, topic):
         """
@@ -142,10 +183,37 @@ class TopicUpdater(Cog):
 
         for channel_id in channel_ids:
             channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+
+            # discord only permits a few topic edits, so don't waste them on topics that did not change
+            if getattr(channel, "topic", None) == topic:
+                continue
+
+            if not self.take_topic_edit_token(channel_id):
+                continue
+
             task = self.bot.loop.create_task(channel.edit(topic=topic))
             background_tasks.add(task)
             task.add_done_callback(background_tasks.discard)
 
+    def take_topic_edit_token(self, channel_id):
+        """
+        Token bucket per channel following discord's rate limit for channel topic edits.
+
+        :param: channel_id: the id of the channel about to be edited
+        :return: whether the channel's topic may be edited now
+        """
+        now = time.monotonic()
+        tokens, last_refill = self.topic_edit_buckets.get(channel_id, (TOPIC_EDITS_PER_PERIOD, now))
+        tokens = min(TOPIC_EDITS_PER_PERIOD, tokens + (now - last_refill) * TOPIC_EDITS_PER_PERIOD / TOPIC_EDIT_PERIOD)
+        if tokens < 1:
+            self.topic_edit_buckets[channel_id] = (tokens, now)
+            return False
+
+        self.topic_edit_buckets[channel_id] = (tokens - 1, now)
+        return True
+
     def is_discord_logged_in(self):
         if self.bot is None:
             return False
@@ -9,9 +9,10 @@ from discord import app_commands, Color, Embed, Member
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog, Command
 
-import minqlx
 from minqlx import Plugin
 
+from . import relay_to_quake_chat
+
 
 def int_set(string_set):
     returned = set()  # type: ignore
@@ -102,9 +103,7 @@ class TriggeredChat(Cog):
             return
 
         prefix_length = self.command_length(ctx)
-        minqlx.CHAT_CHANNEL.reply(
-            self._format_message_to_quake(channel, author, ctx.message.clean_content[prefix_length:])
-        )
+        relay_to_quake_chat(self._format_message_to_quake(channel, author, ctx.message.clean_content[prefix_length:]))
 
     @app_commands.describe(message="message to send to the server")
     async def slash_triggered_chat(self, interaction, message: str) -> None:
@@ -149,7 +148,7 @@ class TriggeredChat(Cog):
                 continue
             quake_message = quake_message.replace(f"<{match[0]}{match[1]}>", replacement)
 
-        minqlx.CHAT_CHANNEL.reply(self._format_message_to_quake(channel, author, quake_message))
+        relay_to_quake_chat(self._format_message_to_quake(channel, author, quake_message))
 
     def _format_message_to_quake(self, channel, author, content):
         """
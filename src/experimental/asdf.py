@@ -1,10 +1,13 @@
 import math
+import threading
+from collections import OrderedDict
 
 import minqlx
 from minqlx import Plugin, Player, NonexistentPlayerError
 
 WEAPON_STATS_KEY = "minqlx:{}:weaponstats"
 _name_key = "minqlx:players:{}:last_used_name"
+NAME_CACHE_SIZE = 1024
 
 
 def identify_reply_channel(channel):
@@ -34,6 +37,9 @@ class asdf(Plugin):
         self.add_hook("round_start", self.handle_round_start)
         self.add_hook("round_end", self.handle_round_end)
 
+        self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
+
         self.add_command("weaponstats", self.cmd_weaponstats, usage="[player or id]")
 
         self.stats_snapshot = {}
@@ -42,6 +48,16 @@ class asdf(Plugin):
 
         self.min_ammo_rate = self.get_cvar("qlx_asdf_minammo_rate", float) or 0.25
 
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
+
+    def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
+
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
+
     def handle_player_spawn(self, player):
         if not self.game or self.game.state != "in_progress":
             return
@@ -297,20 +313,47 @@ class asdf(Plugin):
         return target_player.name, target_player.steam_id
 
     def resolve_player_name(self, item):
-        if not isinstance(item, int) and not item.isdigit():
-            return item
-
-        steam_id = int(item)
-
-        player = self.player(steam_id)
-
-        if player is not None:
-            return player.name
-
-        if self.db and self.db.exists(_name_key.format(steam_id)):
-            return self.db.get(_name_key.format(steam_id))
-
-        return item
+        return self.lookup_player_names([item]).get(item) or item
+
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([_name_key.format(steam_id) for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
+
+        return resolved_names
+
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     def find_target_player_or_list_alternatives(self, player, target):
         # Tell a player which players matched
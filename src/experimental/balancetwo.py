@@ -17,7 +17,7 @@ import asyncio
 
 from abc import abstractmethod
 from ast import literal_eval
-from collections import Counter
+from collections import Counter, OrderedDict
 
 from operator import itemgetter
 
@@ -37,11 +37,18 @@ from minqlx.database import Redis
 
 PLAYER_BASE = "minqlx:players:{0}"
 IPS_BASE = "minqlx:ips"
+NAME_CACHE_SIZE = 1024
 
 SUPPORTED_GAMETYPES = ("ad", "ca", "ctf", "dom", "ft", "tdm")
 
 
-def requests_retry_session(retries=3, backoff_factor=0.1, status_forcelist=(500, 502, 504), session=None):
+def requests_retry_session(
+    retries=3,
+    backoff_factor=0.1,
+    status_forcelist=(500, 502, 504),
+    session=None,
+    pool_maxsize=4,
+):
     session = session or Session()
     retry = Retry(
         total=retries,
@@ -50,7 +57,7 @@ def requests_retry_session(retries=3, backoff_factor=0.1, status_forcelist=(500,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -103,7 +110,7 @@ def report_ratings_for_team(
     if team is None or len(team) <= 0:
         return
 
-    primary_filtered = [player for player in team if player.steam_id in primary_rating_provider.rated_steam_ids()]
+    primary_filtered = [player for player in team if player.steam_id in primary_rating_provider]
     primary_filtered = [
         player
         for player in primary_filtered
@@ -125,7 +132,7 @@ def report_ratings_for_team(
             primary_rating = primary_rating_provider.rating_for(player.steam_id, gametype)
             secondary_rating = secondary_rating_provider.rating_for(player.steam_id, gametype)
             if (
-                player.steam_id in secondary_rating_provider.rated_steam_ids()
+                player.steam_id in secondary_rating_provider
                 and gametype in secondary_rating_provider.rated_gametypes_for(player.steam_id)
                 and secondary_rating_provider.games_for(player.steam_id, gametype) > 0
             ):
@@ -144,9 +151,7 @@ def report_ratings_for_team(
     primary_unranked = [player for player in team if player not in primary_filtered]
 
     if len(primary_unranked) > 0:
-        secondary_filtered = [
-            player for player in primary_unranked if player.steam_id in secondary_rating_provider.rated_steam_ids()
-        ]
+        secondary_filtered = [player for player in primary_unranked if player.steam_id in secondary_rating_provider]
         secondary_filtered = [
             player
             for player in secondary_filtered
@@ -223,6 +228,12 @@ class balancetwo(Plugin):
     * qlx_balancetwo_elocheckReplyChannel (default: "public") The reply channel where the elocheck output is put to.
         Possible values: "public" or "private". Any other value leads to public announcements
     * qlx_balancetwo_elocheckShowSteamids (default: "0") Also lists the steam ids of the players checked
+    * qlx_balancetwo_ratingsEvictionTime (default: "3600") Time in seconds after which the ratings of disconnected
+        players are dropped from memory.
+    * qlx_balancetwo_aliasHops (default: "1") How many hops from a player over shared IPs to other steam ids are
+        followed when looking for aliases.
+    * qlx_balancetwo_aliasNodeLimit (default: "256") Maximum amount of steam ids and IPs visited per alias lookup.
+    * qlx_balancetwo_aliasCacheTime (default: "60") Time in seconds alias lookups are cached.
     * qlx_qlstatsPrivacyBlock (default: "0") set to 1 to kick any clients with unallowed privacy settings upon connect.
     * qlx_qlstatsPrivacyWhitelist (default: "public, private, untracked")
         List of allowed privacy settings on this server. Take out any value from the default expansive list.
@@ -288,6 +299,10 @@ class balancetwo(Plugin):
         self.set_cvar_once("qlx_balancetwo_elocheckPermission", "0")
         self.set_cvar_once("qlx_balancetwo_elocheckReplyChannel", "public")
         self.set_cvar_once("qlx_balancetwo_elocheckShowSteamids", "0")
+        self.set_cvar_once("qlx_balancetwo_ratingsEvictionTime", "3600")
+        self.set_cvar_once("qlx_balancetwo_aliasHops", "1")
+        self.set_cvar_once("qlx_balancetwo_aliasNodeLimit", "256")
+        self.set_cvar_once("qlx_balancetwo_aliasCacheTime", "60")
 
         self.set_cvar_once("qlx_qlstatsPrivacyBlock", "0")
         self.set_cvar_once("qlx_qlstatsPrivacyWhitelist", "public, private, untracked")
@@ -315,6 +330,12 @@ class balancetwo(Plugin):
         if self.reply_channel != "private":
             self.reply_channel = "public"
         self.show_steam_ids = self.get_cvar("qlx_balancetwo_elocheckShowSteamids", bool) or False
+        self.ratings_eviction_time = self.get_cvar("qlx_balancetwo_ratingsEvictionTime", int) or 3600
+        self.alias_graph = AliasGraph(
+            max_hops=self.get_cvar("qlx_balancetwo_aliasHops", int) or 1,
+            max_nodes=self.get_cvar("qlx_balancetwo_aliasNodeLimit", int) or 256,
+            ttl=self.get_cvar("qlx_balancetwo_aliasCacheTime", int) or 60,
+        )
 
         self.allowed_privacy = self.get_cvar("qlx_qlstatsPrivacyWhitelist", list) or [
             "public",
@@ -324,7 +345,7 @@ class balancetwo(Plugin):
         self.max_num_join_attempts = self.get_cvar("qlx_qlstatsPrivacyJoinAttempts", int) or 5
 
         self.connectthreads = {}
-        self.kickthreads = {}
+        self.kick_scheduler = KickScheduler()
         self.exceptions = set()
 
         self.jointimes = {}
@@ -337,6 +358,11 @@ class balancetwo(Plugin):
 
         self.ratings = {}
         self.rating_diffs = {}
+        self.ratings_version_counter = itertools.count(1)
+        self.ratings_version = next(self.ratings_version_counter)
+
+        self.precomputed_balance = FingerprintCache()
+        self.precomputing_fingerprint = None
 
         self.informed_players = []
 
@@ -352,6 +378,8 @@ class balancetwo(Plugin):
         self.privacy_checks_enabled = True
         self.join_attempts = {}
 
+        self.http_session = requests_retry_session()
+
         elocheck_premission = self.get_cvar("qlx_balancetwo_elocheckPermission", int) or 0
         self.add_command(
             ("elocheck", "getrating", "getelo", "elo"),
@@ -395,18 +423,31 @@ class balancetwo(Plugin):
             usage="<name>|<id>|<steam_id>",
         )
 
+        self.add_hook("unload", self.handle_plugin_unload)
         self.add_hook("map", self.handle_map_change)
         self.add_hook("player_connect", self.handle_player_connect, priority=minqlx.PRI_HIGHEST)
         self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
         self.add_hook("team_switch_attempt", self.handle_team_switch_attempt)
         self.add_hook("team_switch", self.handle_team_switch)
         self.add_hook("game_countdown", self.handle_game_countdown)
         self.add_hook("round_countdown", self.handle_round_countdown)
         self.add_hook("round_start", self.handle_round_start)
+        self.add_hook("round_end", self.handle_round_end)
         self.add_hook("game_end", self.handle_game_end)
 
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
+
         self.fetch_elos_from_all_players()
 
+    def handle_plugin_unload(self, plugin):
+        if plugin != self.__class__.__name__:
+            return
+
+        self.http_session.close()
+        RATINGS_CLIENT.close()
+
     def parse_rating_limit(self, cvar):
         configured_rating_limits = self.get_cvar(cvar)
         if configured_rating_limits is None:
@@ -472,8 +513,8 @@ class balancetwo(Plugin):
         for rating_provider in [TRUSKILLS, A_ELO, B_ELO]:
             missing_steam_ids = steam_ids
             if rating_provider.name in self.ratings:
-                rated_steam_ids = self.ratings[rating_provider.name].rated_steam_ids()
-                missing_steam_ids = [steam_id for steam_id in steam_ids if steam_id not in rated_steam_ids]
+                rating_provider_ratings = self.ratings[rating_provider.name]
+                missing_steam_ids = [steam_id for steam_id in steam_ids if steam_id not in rating_provider_ratings]
 
             async_requests.append(rating_provider.fetch_elos(missing_steam_ids))
 
@@ -502,8 +543,8 @@ class balancetwo(Plugin):
         rating_provider_name = f"{mapname} {TRUSKILLS.name}"
         missing_steam_ids = steam_ids
         if rating_provider_name in self.ratings:
-            rated_steam_ids = self.ratings[rating_provider_name].rated_steam_ids()
-            missing_steam_ids = [steam_id for steam_id in steam_ids if steam_id not in rated_steam_ids]
+            rating_provider_ratings = self.ratings[rating_provider_name]
+            missing_steam_ids = [steam_id for steam_id in steam_ids if steam_id not in rating_provider_ratings]
 
         if len(missing_steam_ids) == 0:
             return None, None
@@ -516,9 +557,11 @@ class balancetwo(Plugin):
 
         if rating_provider_name in self.ratings:
             self.ratings[rating_provider_name].append_ratings(json_result)
-            return
+        else:
+            self.ratings[rating_provider_name] = RatingProvider.from_json(json_result)
 
-        self.ratings[rating_provider_name] = RatingProvider.from_json(json_result)
+        self.ratings_version = next(self.ratings_version_counter)
+        self.schedule_balance_precomputation()
 
     def cmd_elocheck(self, player, msg, channel):
         if len(msg) > 2:
@@ -650,26 +693,14 @@ class balancetwo(Plugin):
         if self.db is None:
             return []
 
-        if not self.db.exists(PLAYER_BASE.format(steam_id) + ":ips"):
-            return [steam_id]
-
-        ips = self.db.smembers(PLAYER_BASE.format(steam_id) + ":ips")
-
-        used_steam_ids: set[str] = set()
-        for ip in ips:
-            if not self.db.exists(IPS_BASE + f":{ip}"):
-                continue
-
-            used_steam_ids = used_steam_ids | self.db.smembers(IPS_BASE + f":{ip}")
-
-        return [int(_steam_id) for _steam_id in used_steam_ids]
+        return self.alias_graph.used_steam_ids_for(self.db, steam_id)
 
     def fetch_aliases(self, steam_ids):
         formatted_steam_ids = "+".join([str(steam_id) for steam_id in steam_ids])
         url_template = f"{A_ELO.url_base}aliases/{formatted_steam_ids}.json"
 
         try:
-            result = requests_retry_session().get(url_template, timeout=A_ELO.timeout)
+            result = self.http_session.get(url_template, timeout=A_ELO.timeout)
         except RequestException as exception:
             self.logger.debug(f"request exception: {exception}")
             return {}
@@ -761,14 +792,47 @@ class balancetwo(Plugin):
         if not self.db:
             return "unknown"
 
-        player = self.player(steam_id)
-        if player is not None:
-            return remove_trailing_color_code(player.name)
+        return remove_trailing_color_code(self.lookup_player_names([steam_id]).get(steam_id) or "unknown")
 
-        if self.db.exists(PLAYER_BASE.format(steam_id) + ":last_used_name"):
-            return remove_trailing_color_code(self.db[PLAYER_BASE.format(steam_id) + ":last_used_name"])
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([PLAYER_BASE.format(steam_id) + ":last_used_name" for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
+
+        return resolved_names
 
-        return "unknown"
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     def cmd_aliases(self, player, msg, channel):
         if len(msg) != 2:
@@ -977,13 +1041,17 @@ class balancetwo(Plugin):
         teams = self.teams()
         steam_ids = [player.steam_id for player in teams["red"] + teams["blue"]]
 
-        if len(steam_ids) % 2 == 1:
-            player_to_spec = self.identify_player_to_move()
+        precomputed = self.precomputed_balance.get(self.balance_fingerprint(teams, self.game.type_short))
+        if len(steam_ids) % 2 == 0 and precomputed is not None and precomputed.teams is not None:
+            team1_steam_ids, team2_steam_ids = precomputed.teams
+        else:
+            if len(steam_ids) % 2 == 1:
+                player_to_spec = self.identify_player_to_move()
 
-            if player_to_spec is not None:
-                steam_ids.remove(player_to_spec.steam_id)
+                if player_to_spec is not None:
+                    steam_ids.remove(player_to_spec.steam_id)
 
-        team1_steam_ids, team2_steam_ids = self.find_balanced_teams(steam_ids)
+            team1_steam_ids, team2_steam_ids = self.find_balanced_teams(steam_ids)
         if len(team1_steam_ids) == 0 or len(team2_steam_ids) == 0:
             return
 
@@ -1132,9 +1200,7 @@ class balancetwo(Plugin):
             return [], []
 
         configured_rating_provider = self.ratings[configured_rating_provider_name]
-        rated_steam_ids = [
-            steam_id for steam_id in steam_ids if steam_id in configured_rating_provider.rated_steam_ids()
-        ]
+        rated_steam_ids = [steam_id for steam_id in steam_ids if steam_id in configured_rating_provider]
         rated_steam_ids = [
             steam_id
             for steam_id in rated_steam_ids
@@ -1317,7 +1383,7 @@ class balancetwo(Plugin):
             configured_rating_provider = self.ratings[configured_rating_provider_name]
 
         for steam_id in steam_ids:
-            if steam_id not in configured_rating_provider.rated_steam_ids():
+            if steam_id not in configured_rating_provider:
                 return 0
 
         return sum(configured_rating_provider.rating_for(steam_id, gametype) for steam_id in steam_ids) / len(steam_ids)
@@ -1342,7 +1408,7 @@ class balancetwo(Plugin):
             configured_rating_provider = self.ratings[configured_rating_provider_name]
 
         for steam_id in steam_ids:
-            if steam_id not in configured_rating_provider.rated_steam_ids():
+            if steam_id not in configured_rating_provider:
                 return 0
 
         team_elos = [pow(configured_rating_provider.rating_for(steam_id, gametype) - mu, 2) for steam_id in steam_ids]
@@ -1394,13 +1460,20 @@ class balancetwo(Plugin):
             self.switch_suggestion = None
             return minqlx.RET_STOP_ALL
 
+        precomputed = self.precomputed_balance.get(self.balance_fingerprint(teams, gametype))
+        if precomputed is not None:
+            self.handle_suggestions_collected(self.unrepeated_suggestions(precomputed.suggestions), channel)
+            return minqlx.RET_NONE
+
         self.collect_suggestions(teams, gametype, channel)
         return minqlx.RET_NONE
 
     @minqlx.thread
     def collect_suggestions(self, teams, gametype, channel):
         possible_switches = self.filtered_suggestions(teams, gametype)
+        self.handle_suggestions_collected(self.unrepeated_suggestions(possible_switches), channel)
 
+    def unrepeated_suggestions(self, possible_switches):
         if not self.repeat_vetoed_switches and len(self.vetoed_switches) > 0:
             possible_switches = list(
                 filter(
@@ -1417,7 +1490,65 @@ class balancetwo(Plugin):
                     possible_switches,
                 )
             )
-        self.handle_suggestions_collected(possible_switches, channel)
+        return possible_switches
+
+    def balance_fingerprint(self, teams, gametype):
+        previous_red_team, previous_blue_team = self.previous_teams
+        return (
+            gametype,
+            self.configured_rating_provider_name(),
+            self.ratings_version,
+            self.minimum_suggestion_parameters(),
+            self.last_action,
+            tuple(sorted(previous_red_team)),
+            tuple(sorted(previous_blue_team)),
+            # the cached suggestions hold the players themselves, so a player who reconnected with another client id
+            # must not be served the suggestions calculated for the previous connection
+            tuple(sorted((player.id, player.steam_id) for player in teams["red"])),
+            tuple(sorted((player.id, player.steam_id) for player in teams["blue"])),
+        )
+
+    @minqlx.next_frame
+    def schedule_balance_precomputation(self):
+        if self.game is None:
+            return
+
+        gametype = self.game.type_short
+        if gametype not in SUPPORTED_GAMETYPES:
+            return
+
+        if self.configured_rating_provider_name() not in self.ratings:
+            return
+
+        teams = self.teams()
+        if len(teams["red"]) == 0 or len(teams["blue"]) == 0:
+            return
+
+        fingerprint = self.balance_fingerprint(teams, gametype)
+        if fingerprint in self.precomputed_balance or fingerprint == self.precomputing_fingerprint:
+            return
+
+        self.precomputing_fingerprint = fingerprint
+        self.precompute_balance(teams, gametype, fingerprint, self.game.state != "in_progress")
+
+    @minqlx.thread
+    def precompute_balance(self, teams, gametype, fingerprint, include_rebalance):
+        try:
+            suggestions = self.filtered_suggestions(teams, gametype)
+
+            rebalanced_teams = None
+            steam_ids = [player.steam_id for player in teams["red"] + teams["blue"]]
+            if include_rebalance and len(steam_ids) % 2 == 0:
+                rebalanced_teams = self.find_balanced_teams(steam_ids)
+
+            # ratings or scores changed while calculating, a newer precomputation will be triggered by that change
+            if self.balance_fingerprint(teams, gametype) != fingerprint:
+                return
+
+            self.precomputed_balance.put(fingerprint, PrecomputedBalance(suggestions, rebalanced_teams))
+        finally:
+            if self.precomputing_fingerprint == fingerprint:
+                self.precomputing_fingerprint = None
 
     def filtered_suggestions(self, teams, gametype):
         configured_rating_provider_name = self.configured_rating_provider_name()
@@ -1654,38 +1785,33 @@ class balancetwo(Plugin):
 
     def cmd_nokick(self, player, msg, channel):
         def dontkick(_steam_id):
-            if _steam_id not in self.kickthreads:
+            if _steam_id not in self.kick_scheduler:
                 return
 
-            _kickthread = self.kickthreads[_steam_id]
-
             _resolved_player = self.player(_steam_id)
             if _resolved_player is None:
                 return
 
-            _kickthread.stop()
-
-            del self.kickthreads[_steam_id]
+            if not self.kick_scheduler.cancel(_steam_id):
+                return
 
             _resolved_player.unmute()
 
             channel.reply(f"^7An admin has prevented {_resolved_player.name}^7 from being kicked.")
 
-        if self.kickthreads is None or len(self.kickthreads) == 0:
+        scheduled_steam_ids = self.kick_scheduler.scheduled_steam_ids()
+        if len(scheduled_steam_ids) == 0:
             player.tell("^6Psst^7: There are no people being kicked right now.")
             return minqlx.RET_STOP_ALL
 
-        if len(self.kickthreads) == 1:
-            steam_id = next(iter(self.kickthreads))
+        if len(scheduled_steam_ids) == 1:
+            steam_id = scheduled_steam_ids[0]
             dontkick(steam_id)
             self.exceptions.add(steam_id)
             return minqlx.RET_NONE
 
         _scheduled_players = []
-        for steam_id, kickthread in self.kickthreads.items():
-            if not kickthread.is_alive():
-                continue
-
+        for steam_id in scheduled_steam_ids:
             _player = self.player(steam_id)
             if _player is None:
                 continue
@@ -1861,21 +1987,13 @@ class balancetwo(Plugin):
         self.informed_players = []
         self.previous_ratings = self.ratings
         self.ratings = {}
-        self.fetch_and_diff_ratings(mapname)
-        self.clean_up_kickthreads()
-
-    @minqlx.thread
-    def clean_up_kickthreads(self):
-        dead_threads = []
-        for steam_id, thread in self.kickthreads.items():
-            if not thread.is_alive():
-                dead_threads.append(steam_id)
-
-        for dead_thread in dead_threads:
-            del self.kickthreads[dead_thread]
+        self.ratings_version = next(self.ratings_version_counter)
+        self.precomputed_balance.clear()
+        cancelled_kicks = self.kick_scheduler.cancel_all()
+        self.fetch_and_diff_ratings(mapname, recheck_steam_ids=cancelled_kicks)
 
     @minqlx.thread
-    def fetch_and_diff_ratings(self, mapname):
+    def fetch_and_diff_ratings(self, mapname, *, recheck_steam_ids=None):
         async def _fetch_and_diff_ratings():
             rating_providers_fetched = []
             async_requests = []
@@ -1920,6 +2038,11 @@ class balancetwo(Plugin):
         asyncio.run(_fetch_and_diff_ratings())
         asyncio.run(fetch_ratings_from_newmap(mapname))
 
+        if recheck_steam_ids:
+            self.schedule_kick_for_players_outside_rating_limits(
+                [steam_id for steam_id in recheck_steam_ids if self.player(steam_id) is not None]
+            )
+
     def handle_player_connect(self, player):
         @minqlx.thread
         def fetch_player_elos(_steam_id):
@@ -1936,6 +2059,9 @@ class balancetwo(Plugin):
             if connect_check is not None:
                 return connect_check
 
+        for rating_provider in list(self.ratings.values()):
+            rating_provider.mark_connected(player.steam_id)
+
         self.record_join_times(player.steam_id)
         fetch_player_elos(player.steam_id)
         return None
@@ -2096,7 +2222,7 @@ class balancetwo(Plugin):
             if self.is_player_within_configured_rating_limit(steam_id):
                 continue
 
-            if steam_id not in self.kickthreads or not self.kickthreads[steam_id].is_alive():
+            if steam_id not in self.kick_scheduler:
                 new_steam_ids_to_kick.append(steam_id)
 
         if len(new_steam_ids_to_kick) == 0:
@@ -2141,9 +2267,7 @@ class balancetwo(Plugin):
                 )
                 continue
 
-            t = KickThread(steam_id, kickmsg)
-            t.start()
-            self.kickthreads[steam_id] = t
+            self.kick_scheduler.schedule(steam_id, kickmsg)
 
     def has_exception_to_play(self, steam_id):
         if steam_id in self.exceptions:
@@ -2152,6 +2276,8 @@ class balancetwo(Plugin):
         return self.db is not None and self.db.get_flag(steam_id, "balancetwo:ratinglimit_exception", default=False)
 
     def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
+
         if self.last_new_player_id == player.steam_id:
             self.last_new_player_id = None
 
@@ -2164,6 +2290,19 @@ class balancetwo(Plugin):
         if player.steam_id in self.join_attempts:
             del self.join_attempts[player.steam_id]
 
+        self.kick_scheduler.cancel(player.steam_id)
+
+        for rating_provider in list(self.ratings.values()):
+            rating_provider.mark_disconnected(player.steam_id)
+            if rating_provider.evict_disconnected(self.ratings_eviction_time) > 0:
+                self.ratings_version = next(self.ratings_version_counter)
+
+        self.schedule_balance_precomputation()
+
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
+
     def handle_team_switch_attempt(self, player, old, new):
         if not self.game:
             return minqlx.RET_NONE
@@ -2405,6 +2544,8 @@ class balancetwo(Plugin):
         if not player:
             return
 
+        self.schedule_balance_precomputation()
+
         if new_team not in ["red", "blue", "any"]:
             return
 
@@ -2649,6 +2790,9 @@ class balancetwo(Plugin):
 
         return [(player, moved_to) for player in sorted_team[:amount_players_moved]]
 
+    def handle_round_end(self, _data):
+        self.schedule_balance_precomputation()
+
     def handle_game_end(self, data):
         if not self.game or bool(data["ABORTED"]):
             return
@@ -2726,17 +2870,217 @@ class balancetwo(Plugin):
         return returned
 
 
+class AliasGraph:
+    """
+    Resolves the steam ids that connected from the same IPs as a player by walking the bipartite graph of steam ids
+    and IPs stored in the database.
+
+    All players resolved together are walked breadth first at the same time, with one pipelined round trip for the IPs
+    and one for the steam ids per hop. Resolved steam ids are cached for a short time.
+    """
+
+    __slots__ = ("max_hops", "max_nodes", "ttl", "_resolved", "_lock")
+
+    def __init__(self, *, max_hops=1, max_nodes=256, ttl=60):
+        self.max_hops = max(max_hops, 1)
+        self.max_nodes = max_nodes
+        self.ttl = ttl
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def used_steam_ids_for(self, db, steam_id):
+        return self.used_steam_ids_for_all(db, [steam_id])[steam_id]
+
+    def used_steam_ids_for_all(self, db, steam_ids):
+        now = time.monotonic()
+        resolved = {}
+        with self._lock:
+            for steam_id in steam_ids:
+                if steam_id in self._resolved and self._resolved[steam_id][0] > now:
+                    resolved[steam_id] = list(self._resolved[steam_id][1])
+
+        unresolved = [steam_id for steam_id in dict.fromkeys(steam_ids) if steam_id not in resolved]
+        if len(unresolved) == 0:
+            return resolved
+
+        components = self.traverse(db, unresolved)
+        with self._lock:
+            for steam_id, component in components.items():
+                self._resolved[steam_id] = (now + self.ttl, component)
+                resolved[steam_id] = list(component)
+
+            expired = [steam_id for steam_id, (expires, _) in self._resolved.items() if expires <= now]
+            for steam_id in expired:
+                del self._resolved[steam_id]
+
+        return resolved
+
+    def traverse(self, db, steam_ids):
+        ips_of: dict[int, set[str]] = {}
+        steam_ids_of: dict[str, set[int]] = {}
+        components: dict[int, tuple[set[int], set[str], set[int]]] = {
+            steam_id: ({steam_id}, set(), {steam_id}) for steam_id in steam_ids
+        }
+
+        for _ in range(self.max_hops):
+            frontier = set()
+            for _steam_ids, _, steam_id_frontier in components.values():
+                frontier |= steam_id_frontier
+            if len(frontier) == 0:
+                break
+
+            unfetched_steam_ids = list(frontier - ips_of.keys())
+            fetched_ips = self._fetch_members(
+                db, [PLAYER_BASE.format(steam_id) + ":ips" for steam_id in unfetched_steam_ids]
+            )
+            ips_of.update(zip(unfetched_steam_ids, fetched_ips))
+
+            ip_frontiers = {}
+            for steam_id, (_steam_ids, _ips, steam_id_frontier) in components.items():
+                ip_frontiers[steam_id] = {
+                    ip for _steam_id in steam_id_frontier for ip in ips_of[_steam_id] if ip not in _ips
+                }
+            ip_frontier = set().union(*ip_frontiers.values())
+            unfetched_ips = list(ip_frontier - steam_ids_of.keys())
+            fetched_steam_ids = self._fetch_members(db, [IPS_BASE + f":{ip}" for ip in unfetched_ips])
+            for ip, members in zip(unfetched_ips, fetched_steam_ids):
+                steam_ids_of[ip] = {int(member) for member in members}
+
+            for steam_id, (_steam_ids, _ips, steam_id_frontier) in components.items():
+                steam_id_frontier.clear()
+                for ip in ip_frontiers[steam_id]:
+                    if len(_steam_ids) + len(_ips) >= self.max_nodes:
+                        break
+                    _ips.add(ip)
+                    for _steam_id in steam_ids_of[ip]:
+                        if _steam_id in _steam_ids or len(_steam_ids) + len(_ips) >= self.max_nodes:
+                            continue
+                        _steam_ids.add(_steam_id)
+                        steam_id_frontier.add(_steam_id)
+
+        return {steam_id: tuple(_steam_ids) for steam_id, (_steam_ids, _, _) in components.items()}
+
+    @staticmethod
+    def _fetch_members(db, keys):
+        if len(keys) == 0:
+            return []
+
+        pipeline = db.pipeline(transaction=False)
+        for key in keys:
+            pipeline.smembers(key)
+        return pipeline.execute()
+
+    def invalidate(self, steam_id=None):
+        with self._lock:
+            if steam_id is None:
+                self._resolved.clear()
+                return
+
+            self._resolved.pop(steam_id, None)
+
+
 FILTERED_OUT_GAMETYPE_RESPONSES = ["steamid"]
 
 
+class PooledRetryClient:
+    """
+    Long-lived, connection-pooled http client shared by the skill rating providers.
+
+    All requests are issued from one background event loop, so that the underlying aiohttp session with its keep-alive
+    connections and dns cache survives the short-lived event loops created by asyncio.run throughout the plugin.
+    """
+
+    __slots__ = (
+        "limit_per_host",
+        "keepalive_timeout",
+        "retry_options",
+        "timeout",
+        "_lock",
+        "_loop",
+        "_thread",
+        "_client",
+    )
+
+    def __init__(self, *, limit_per_host=4, keepalive_timeout=60, retry_options=None, timeout=None):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.retry_options = retry_options or ExponentialRetry(
+            attempts=3,
+            factor=0.1,
+            statuses={500, 502, 504},
+            exceptions={aiohttp.ClientResponseError, aiohttp.ClientPayloadError},
+        )
+        self.timeout = timeout or ClientTimeout(total=5, connect=3, sock_connect=3, sock_read=5)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    def _running_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="balancetwo-http", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _get_json(self, url, headers):
+        if self._client is None:
+            self._client = RetryClient(
+                raise_for_status=False,
+                retry_options=self.retry_options,
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+            )
+
+        async with self._client.get(url, headers=headers) as result:
+            if result.status != 200:
+                return None
+            return await result.json()
+
+    async def get_json(self, url, *, headers=None):
+        future = asyncio.run_coroutine_threadsafe(self._get_json(url, headers), self._running_loop())
+        return await asyncio.wrap_future(future)
+
+    async def _close_client(self):
+        if self._client is None:
+            return
+
+        await self._client.close()
+        self._client = None
+
+    def close(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if loop is None:
+            return
+
+        with contextlib.suppress(Exception):
+            asyncio.run_coroutine_threadsafe(self._close_client(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+
+
+RATINGS_CLIENT = PooledRetryClient()
+
+
 class SkillRatingProvider:
-    __slots__ = ("name", "url_base", "balance_api", "timeout")
+    __slots__ = ("name", "url_base", "balance_api", "timeout", "client")
 
-    def __init__(self, name, url_base, balance_api, timeout=7):
+    def __init__(self, name, url_base, balance_api, timeout=7, client=None):
         self.name = name
         self.url_base = url_base
         self.balance_api = balance_api
         self.timeout = timeout
+        self.client = client if client is not None else RATINGS_CLIENT
 
     async def fetch_elos(self, steam_ids, headers=None):
         if len(steam_ids) == 0:
@@ -2744,20 +3088,7 @@ class SkillRatingProvider:
 
         formatted_steam_ids = "+".join([str(steam_id) for steam_id in steam_ids])
         request_url = f"{self.url_base}{self.balance_api}/{formatted_steam_ids}"
-        retry_options = ExponentialRetry(
-            attempts=3,
-            factor=0.1,
-            statuses={500, 502, 504},
-            exceptions={aiohttp.ClientResponseError, aiohttp.ClientPayloadError},
-        )
-        async with RetryClient(
-            raise_for_status=False,
-            retry_options=retry_options,
-            timeout=ClientTimeout(total=5, connect=3, sock_connect=3, sock_read=5),
-        ) as retry_client, retry_client.get(request_url, headers=headers) as result:
-            if result.status != 200:
-                return None
-            return await result.json()
+        return await self.client.get_json(request_url, headers=headers)
 
 
 TRUSKILLS = SkillRatingProvider("Truskill", "http://stats.houseofquake.com/", "elo/map_based")
@@ -2766,55 +3097,35 @@ B_ELO = SkillRatingProvider("B-Elo", "http://qlstats.net/", "elo_b", timeout=15)
 
 
 class RatingProvider:
-    __slots__ = ("jsons",)
+    """
+    Ratings of a skill rating provider, indexed by steam id.
+
+    Every appended response is folded into the per-player index, with later responses replacing earlier ones for the
+    same player. Players marked as disconnected can be evicted after a while to keep memory bounded.
+    """
+
+    __slots__ = ("player_infos", "disconnected_since")
 
-    def __init__(self, json):
-        self.jsons = [json]
+    def __init__(self, json=None):
+        self.player_infos = {}
+        self.disconnected_since = {}
+        self.append_ratings(json)
 
     def __iter__(self):
         return iter(self.rated_steam_ids())
 
     def __contains__(self, item):
-        if not isinstance(item, int) and not isinstance(item, str):
+        steam_id = self._steam_id_for(item)
+        if steam_id is None:
             return False
 
-        steam_id = item
-        if isinstance(item, str):
-            try:
-                steam_id = int(item)
-            except ValueError:
-                return False
-
-        for json_rating in self.jsons:
-            if "playerinfo" not in json_rating:
-                continue
-
-            if str(steam_id) in json_rating["playerinfo"]:
-                return True
-
-        return False
+        return steam_id in self.player_infos
 
     def __getitem__(self, item):
         if item not in self:
             raise TypeError
 
-        steam_id = item
-        if isinstance(item, str):
-            try:
-                steam_id = int(item)
-            except ValueError as e:
-                raise TypeError from e
-
-        for json_rating in reversed(self.jsons):
-            if "playerinfo" not in json_rating:
-                continue
-
-            if str(steam_id) not in json_rating["playerinfo"]:
-                continue
-
-            return PlayerRating(json_rating["playerinfo"][str(steam_id)])
-
-        return None
+        return PlayerRating(self.player_infos[self._steam_id_for(item)])
 
     def __sub__(self, other):
         returned = {}
@@ -2844,12 +3155,52 @@ class RatingProvider:
 
         return returned
 
+    @staticmethod
+    def _steam_id_for(item):
+        if not isinstance(item, (int, str)):
+            return None
+
+        if isinstance(item, int):
+            return item
+
+        try:
+            return int(item)
+        except ValueError:
+            return None
+
     @staticmethod
     def from_json(json_response):
         return RatingProvider(json_response)
 
     def append_ratings(self, json_response):
-        self.jsons.append(json_response)
+        if json_response is None or "playerinfo" not in json_response:
+            return
+
+        for steam_id, player_info in json_response["playerinfo"].items():
+            self.player_infos[int(steam_id)] = player_info
+
+    def mark_connected(self, steam_id):
+        self.disconnected_since.pop(steam_id, None)
+
+    def mark_disconnected(self, steam_id, timestamp=None):
+        if steam_id not in self.player_infos:
+            return
+
+        self.disconnected_since[steam_id] = timestamp if timestamp is not None else time.monotonic()
+
+    def evict_disconnected(self, max_age, now=None):
+        current_time = now if now is not None else time.monotonic()
+        evicted_steam_ids = [
+            steam_id
+            for steam_id, disconnected_since in self.disconnected_since.items()
+            if current_time - disconnected_since >= max_age
+        ]
+
+        for steam_id in evicted_steam_ids:
+            del self.disconnected_since[steam_id]
+            self.player_infos.pop(steam_id, None)
+
+        return len(evicted_steam_ids)
 
     def player_data_for(self, steam_id):
         if steam_id not in self:
@@ -2906,14 +3257,7 @@ class RatingProvider:
         return player_data.privacy
 
     def rated_steam_ids(self):
-        returned = []  # type: ignore
-        for json_rating in self.jsons:
-            if "playerinfo" not in json_rating:
-                continue
-
-            returned = returned + [int(steam_id) for steam_id in json_rating["playerinfo"]]
-
-        return list(set(returned))
+        return list(self.player_infos)
 
     def format_elos(self, steam_id):
         result = ""
@@ -3113,65 +3457,163 @@ class Suggestion:
         return self.red_player.score + self.blue_player.score
 
 
-class KickThread(threading.Thread):
-    __slots__ = ("steam_id", "kickmsg", "go")
+class ScheduledKick:
+    __slots__ = ("steam_id", "kickmsg", "stage", "event")
 
     def __init__(self, steam_id, kickmsg):
-        threading.Thread.__init__(self)
         self.steam_id = steam_id
         self.kickmsg = kickmsg
-        self.go = True
+        self.stage = 0
+        self.event = None
 
-    def try_msg(self):
-        time.sleep(5)
-        player = Plugin.player(self.steam_id)
-        if not player:
-            return
 
-        if not self.go:
-            return
+class KickScheduler:
+    """
+    Drives the staged muting, announcing, and kicking of players outside the rating limits.
 
-        Plugin.msg(f"^7Sorry, {player.name} {self.kickmsg}, so you'll be ^6kicked ^7shortly...")
+    Each stage is an event in minqlx' frame task scheduler, so pending kicks run on the main thread without any thread
+    of their own, and can be inspected or cancelled until their final stage ran.
+    """
 
-    def try_mute(self):
-        @minqlx.next_frame
-        def execute(_player):
-            with contextlib.suppress(ValueError):
-                _player.mute()
+    __slots__ = ("scheduler", "pending", "_lock")
 
-        time.sleep(5)
-        player = Plugin.player(self.steam_id)
-        if not player:
-            return
+    STAGES = (("mute", 5), ("msg", 5), ("kick", 30))
+
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler if scheduler is not None else minqlx.frame_tasks
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, steam_id):
+        with self._lock:
+            return steam_id in self.pending
+
+    def __len__(self):
+        with self._lock:
+            return len(self.pending)
+
+    def scheduled_steam_ids(self):
+        with self._lock:
+            return list(self.pending)
+
+    def pending_actions(self):
+        now = self.scheduler.timefunc()
+        with self._lock:
+            return [
+                (steam_id, self.STAGES[scheduled.stage][0], max(scheduled.event.time - now, 0.0))
+                for steam_id, scheduled in self.pending.items()
+                if scheduled.event is not None
+            ]
+
+    def schedule(self, steam_id, kickmsg):
+        with self._lock:
+            if steam_id in self.pending:
+                return False
+
+            scheduled = ScheduledKick(steam_id, kickmsg)
+            self.pending[steam_id] = scheduled
+            self._enter_stage(scheduled)
+            return True
+
+    def cancel(self, steam_id):
+        with self._lock:
+            scheduled = self.pending.pop(steam_id, None)
+            if scheduled is None:
+                return False
 
-        if not self.go:
+            self._cancel_event(scheduled)
+            return True
+
+    def cancel_all(self):
+        with self._lock:
+            cancelled = list(self.pending.values())
+            self.pending.clear()
+
+            for scheduled in cancelled:
+                self._cancel_event(scheduled)
+
+        return [scheduled.steam_id for scheduled in cancelled]
+
+    def _enter_stage(self, scheduled):
+        _, delay = self.STAGES[scheduled.stage]
+        scheduled.event = self.scheduler.enter(delay, 1, self._run_stage, (scheduled,))
+
+    def _cancel_event(self, scheduled):
+        if scheduled.event is None:
             return
 
-        execute(player)
+        with contextlib.suppress(ValueError):
+            self.scheduler.cancel(scheduled.event)
+        scheduled.event = None
 
-    def try_kick(self):
-        @minqlx.next_frame
-        def execute(_player):
-            with contextlib.suppress(ValueError):
-                _player.kick(f"^1GOT KICKED!^7 {self.kickmsg}")
+    def _run_stage(self, scheduled):
+        with self._lock:
+            if scheduled.steam_id not in self.pending or self.pending[scheduled.steam_id] is not scheduled:
+                return
+
+            action, _ = self.STAGES[scheduled.stage]
+            scheduled.stage += 1
+            if scheduled.stage < len(self.STAGES):
+                self._enter_stage(scheduled)
+            else:
+                scheduled.event = None
+                del self.pending[scheduled.steam_id]
 
-        time.sleep(30)
-        player = Plugin.player(self.steam_id)
+        player = Plugin.player(scheduled.steam_id)
         if not player:
             return
 
-        if not self.go:
-            return
+        if action == "mute":
+            with contextlib.suppress(ValueError):
+                player.mute()
+        elif action == "msg":
+            Plugin.msg(f"^7Sorry, {player.name} {scheduled.kickmsg}, so you'll be ^6kicked ^7shortly...")
+        elif action == "kick":
+            with contextlib.suppress(ValueError):
+                player.kick(f"^1GOT KICKED!^7 {scheduled.kickmsg}")
 
-        execute(player)
 
-    def run(self):
-        self.try_mute()
-        self.try_msg()
-        self.try_kick()
+class PrecomputedBalance:
+    __slots__ = ("suggestions", "teams")
+
+    def __init__(self, suggestions, teams=None):
+        self.suggestions = suggestions
+        self.teams = teams
+
+
+class FingerprintCache:
+    """
+    Small cache of precomputed balance results, keyed by a fingerprint of all their inputs.
+
+    Since every input is part of the key, a cached entry is only ever served for the exact same team composition,
+    ratings and suggestion parameters it was calculated from. The least recently stored entries are dropped first.
+    """
+
+    __slots__ = ("maxsize", "_entries", "_lock")
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, fingerprint):
+        with self._lock:
+            return fingerprint in self._entries
+
+    def get(self, fingerprint):
+        with self._lock:
+            return self._entries.get(fingerprint)
+
+    def put(self, fingerprint, value):
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+            self._entries[fingerprint] = value
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
 
-    def stop(self):
-        self.go = False
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
 class PlayerMovedToSpecError(Exception):
@@ -1,11 +1,18 @@
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+import redis
 
 import minqlx
 from minqlx import Plugin
 from minqlx.database import Redis
 
 BDAY_KEY = "minqlx:players:{0}:bday"
+# sorted set of all players with a registered birthday, scored by the birthday's day of the year
+BDAY_INDEX_KEY = "minqlx:bdays"
 _name_key = "minqlx:players:{}:last_used_name"
+NAME_CACHE_SIZE = 1024
 
 # redis db key where we store all meaningful longmapnames
 LONG_MAP_NAMES_KEY = "minqlx:maps:longnames"
@@ -35,15 +42,22 @@ class bday(Plugin):
             permission=2,
             usage="[player or steam_id] [dd.mm.]",
         )
+        self.add_command("backfillbdays", self.cmd_backfill_bdays, permission=5)
 
         self.add_hook("player_loaded", self.handle_player_connected)
         self.add_hook("game_end", self.handle_game_end)
         self.add_hook("map", self.handle_map)
         self.add_hook("team_switch", self.handle_team_switch)
+        self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
 
         self.number_of_bday_maps = self.get_cvar("qlx_bday_mapscount", int) or 1
         self.bmap_factory = self.get_cvar("qlx_bday_factory") or "ca"
         self.pending_bday_confirmations = {}
+        self.todays_birthdays = None
+        self.todays_birthdays_date = None
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
 
     def cmd_bday(self, player, msg, _channel):
         if self.db is None:
@@ -95,7 +109,7 @@ class bday(Plugin):
             return
 
         _bday = self.pending_bday_confirmations[player.steam_id]
-        self.db[BDAY_KEY.format(player.steam_id)] = _bday
+        self.store_birthday(player.steam_id, _bday)
         del self.pending_bday_confirmations[player.steam_id]
         player.tell(f"^7Your birthday was stored as ^6{_bday}^7.")
 
@@ -155,9 +169,36 @@ class bday(Plugin):
             return minqlx.RET_NONE
 
         admin.tell(f"^6{player_name}'s birthday stored as ^6{_bday.day}.{_bday.month}.")
-        self.db[BDAY_KEY.format(player_sid)] = f"{_bday.day}.{_bday.month}."
+        self.store_birthday(player_sid, f"{_bday.day}.{_bday.month}.")
         return minqlx.RET_NONE
 
+    def store_birthday(self, steam_id, birthday):
+        if self.db is None:
+            return
+
+        pipeline = self.db.pipeline()
+        pipeline.set(BDAY_KEY.format(steam_id), birthday)
+        self.add_to_birthday_index(pipeline, {str(steam_id): self.day_of_year(birthday)})
+        pipeline.execute()
+        self.todays_birthdays = None
+
+    # noinspection PyMethodMayBeStatic
+    def add_to_birthday_index(self, pipeline, scored_steam_ids):
+        if redis.VERSION >= (3,):
+            # noinspection PyTypeChecker
+            pipeline.zadd(BDAY_INDEX_KEY, scored_steam_ids)
+        else:
+            # noinspection PyTypeChecker
+            pipeline.zadd(BDAY_INDEX_KEY, **scored_steam_ids)
+
+    # noinspection PyMethodMayBeStatic
+    def day_of_year(self, birthday):
+        if isinstance(birthday, str):
+            day, month = birthday.split(".")[:2]
+            birthday = date(2000, int(month), int(day))
+        # 2000 was a leap year, so birthdays on February 29th get a stable score as well
+        return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
     def identify_target(self, player, target):
         if isinstance(target, minqlx.Player):
             return target.name, target.steam_id
@@ -176,20 +217,47 @@ class bday(Plugin):
         return player.name, player.steam_id
 
     def resolve_player_name(self, item):
-        if isinstance(item, str) and not item.isdigit():
-            return item
-
-        steam_id = int(item)
-
-        player = self.player(steam_id)
-
-        if player is not None:
-            return player.name
-
-        if self.db is not None and self.db.exists(_name_key.format(steam_id)):
-            return self.db.get(_name_key.format(steam_id))
-
-        return item
+        return self.lookup_player_names([item]).get(item) or item
+
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([_name_key.format(steam_id) for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
+
+        return resolved_names
+
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     def find_target_player_or_list_alternatives(self, player, target):
         # Tell a player which players matched
@@ -260,27 +328,24 @@ class bday(Plugin):
             return
 
         today = datetime.now()
-        birthday_keys = self.db.scan_iter(BDAY_KEY.format("*"))
-        min_delta = 367
-        min_player_sid = None
-        for birthday_key in birthday_keys:
-            birthdate = datetime.strptime(self.db[birthday_key], "%d.%m.")
-            next_birthdate = self.next_birthdate(birthdate)
-            delta = next_birthdate - today
-
-            if delta.days < min_delta:
-                min_delta = delta.days + 1
-                min_player_sid = birthday_key.replace("minqlx:players:", "").replace(":bday", "")
-
-            if today.day == birthdate.day and today.month == birthdate.month:
-                min_delta = 0
-                min_player_sid = birthday_key.replace("minqlx:players:", "").replace(":bday", "")
-
-        if min_player_sid is None:
+        todays_score = self.day_of_year(today)
+        next_birthdays = self.db.zrangebyscore(BDAY_INDEX_KEY, todays_score, "+inf", start=0, num=1, withscores=True)
+        if len(next_birthdays) == 0:
+            next_birthdays = self.db.zrangebyscore(BDAY_INDEX_KEY, "-inf", "+inf", start=0, num=1, withscores=True)
+
+        if len(next_birthdays) == 0:
             return
 
-        player_name = self.resolve_player_name(int(min_player_sid))
+        min_player_sid, score = next_birthdays[0]
         player_bday = self.db[BDAY_KEY.format(min_player_sid)]
+        if player_bday is None:
+            return
+
+        min_delta = 0
+        if int(score) != todays_score:
+            min_delta = (self.next_birthdate(datetime.strptime(player_bday, "%d.%m.")) - today).days + 1
+
+        player_name = self.resolve_player_name(int(min_player_sid))
 
         if min_delta == 0:
             channel.reply(f"Next birthday: {player_name}^7 has her/his birthday today! ({player_bday}) Happy Birthday!")
@@ -356,6 +421,13 @@ class bday(Plugin):
 
         self.play_birthday_song()
 
+    def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
+
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
+
     def play_birthday_song(self):
         if "karaoke" in self.plugins:
             # noinspection PyProtectedMember
@@ -369,16 +441,59 @@ class bday(Plugin):
         self.play_sound("sound/karaoke4/happybirthday.ogg")
 
     def has_birthday_today(self, player):
+        return player.steam_id in self.birthdays_today()
+
+    def birthdays_today(self):
         if self.db is None:
-            return False
+            return set()
 
-        if not self.has_birthday_set(player):
-            return False
+        today = date.today()
+        if self.todays_birthdays is not None and self.todays_birthdays_date == today:
+            return self.todays_birthdays
 
-        birthday = datetime.strptime(self.db[BDAY_KEY.format(player.steam_id)], "%d.%m.")
-        today = datetime.now()
+        todays_score = self.day_of_year(today)
+        self.todays_birthdays = {
+            int(steam_id) for steam_id in self.db.zrangebyscore(BDAY_INDEX_KEY, todays_score, todays_score)
+        }
+        self.todays_birthdays_date = today
+        return self.todays_birthdays
+
+    def cmd_backfill_bdays(self, _player, _msg, channel):
+        reply_channel = self.identify_reply_channel(channel)
+
+        self.backfill_birthday_index(reply_channel)
+
+    @minqlx.thread
+    def backfill_birthday_index(self, channel):
+        if self.db is None:
+            return
 
-        return birthday.day == today.day and birthday.month == today.month
+        key_prefix, key_postfix = BDAY_KEY.split("{0}")
+        steam_ids = []
+        for key in self.db.scan_iter(match=BDAY_KEY.format("*")):
+            identifier = key[len(key_prefix) : -len(key_postfix)]
+            if identifier.isdigit():
+                steam_ids.append(identifier)
+
+        scored_steam_ids = {}
+        if len(steam_ids) > 0:
+            birthdays = self.db.mget([BDAY_KEY.format(steam_id) for steam_id in steam_ids])
+            for steam_id, birthday in zip(steam_ids, birthdays):
+                if birthday is None:
+                    continue
+                try:
+                    scored_steam_ids[steam_id] = self.day_of_year(birthday)
+                except ValueError:
+                    continue
+
+        pipeline = self.db.pipeline()
+        pipeline.delete(BDAY_INDEX_KEY)
+        if len(scored_steam_ids) > 0:
+            self.add_to_birthday_index(pipeline, scored_steam_ids)
+        pipeline.execute()
+        self.todays_birthdays = None
+
+        channel.reply(f"^7Indexed the birthdays of ^6{len(scored_steam_ids)}^7 players.")
 
     def has_birthday_set(self, player):
         if self.db is None:
@@ -7,6 +7,10 @@ You are free to modify this plugin to your own one.
 """
 
 import asyncio
+import contextlib
+import threading
+import time
+from collections import OrderedDict
 
 import aiohttp
 from aiohttp import ClientTimeout
@@ -23,6 +27,7 @@ from minqlx.database import Redis
 
 PLAYER_BASE = "minqlx:players:{0}"
 IPS_BASE = "minqlx:ips"
+NAME_CACHE_SIZE = 1024
 
 
 def requests_retry_session(
@@ -30,6 +35,7 @@ def requests_retry_session(
     backoff_factor=0.1,
     status_forcelist=(500, 502, 504),
     session=None,
+    pool_maxsize=4,
 ):
     session = session or Session()
     retry = Retry(
@@ -39,7 +45,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -77,6 +83,10 @@ class elocheck(Plugin):
     * qlx_elocheckShowSteamids (default: "0") Also lists the steam ids of the players checked
     * qlx_elocheckUseTruskillbn (default "0") Use truskill numbers normalized to qlstats elo values
         (around 1500 rather than 25.0)
+    * qlx_elocheckAliasHops (default: "1") How many hops from a player over shared IPs to other steam ids are
+        followed when looking for aliases.
+    * qlx_elocheckAliasNodeLimit (default: "256") Maximum amount of steam ids and IPs visited per alias lookup.
+    * qlx_elocheckAliasCacheTime (default: "60") Time in seconds alias lookups are cached.
     """
 
     database = Redis
@@ -85,6 +95,7 @@ class elocheck(Plugin):
         "reply_channel",
         "show_steam_ids",
         "use_truskill_bn",
+        "alias_graph",
         "balance_api",
         "previous_gametype",
         "previous_map",
@@ -92,6 +103,9 @@ class elocheck(Plugin):
         "ratings",
         "rating_diffs",
         "informed_players",
+        "http_session",
+        "name_cache",
+        "name_cache_lock",
     )
 
     def __init__(self):
@@ -101,12 +115,20 @@ class elocheck(Plugin):
         self.set_cvar_once("qlx_elocheckReplyChannel", "public")
         self.set_cvar_once("qlx_elocheckShowSteamids", "0")
         self.set_cvar_once("qlx_elocheckUseTruskillbn", "0")
+        self.set_cvar_once("qlx_elocheckAliasHops", "1")
+        self.set_cvar_once("qlx_elocheckAliasNodeLimit", "256")
+        self.set_cvar_once("qlx_elocheckAliasCacheTime", "60")
 
         self.reply_channel = self.get_cvar("qlx_elocheckReplyChannel") or "public"
         if self.reply_channel != "private":
             self.reply_channel = "public"
         self.show_steam_ids = self.get_cvar("qlx_elocheckShowSteamids", bool) or False
         self.use_truskill_bn = self.get_cvar("qlx_elocheckUseTruskillbn", bool) or False
+        self.alias_graph = AliasGraph(
+            max_hops=self.get_cvar("qlx_elocheckAliasHops", int) or 1,
+            max_nodes=self.get_cvar("qlx_elocheckAliasNodeLimit", int) or 256,
+            ttl=self.get_cvar("qlx_elocheckAliasCacheTime", int) or 60,
+        )
 
         elocheck_permission_level = self.get_cvar("qlx_elocheckPermission", int) or 0
 
@@ -124,10 +146,13 @@ class elocheck(Plugin):
         )
         self.add_command("eloupdates", self.cmd_switch_elo_changes_notifications, usage="<0/1>")
 
+        self.add_hook("unload", self.handle_plugin_unload)
         self.add_hook("map", self.handle_map_change)
         self.add_hook("player_connect", self.handle_player_connect, priority=minqlx.PRI_LOWEST)
         self.add_hook("team_switch", self.handle_team_switch)
         self.add_hook("game_end", self.handle_game_end)
+        self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
 
         self.balance_api = self.get_cvar("qlx_balanceApi") or "elo"
 
@@ -136,9 +161,26 @@ class elocheck(Plugin):
         self.previous_ratings = {}
         self.ratings = {}
         self.rating_diffs = {}
+        self.http_session = requests_retry_session()
         self.fetch_elos_from_all_players()
 
         self.informed_players = []
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
+
+    def handle_plugin_unload(self, plugin):
+        if plugin != self.__class__.__name__:
+            return
+
+        self.http_session.close()
+        RATINGS_CLIENT.close()
+
+    def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
+
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
 
     def get_truskill_provider(self):
         if self.use_truskill_bn:
@@ -470,26 +512,17 @@ class elocheck(Plugin):
         return identify_reply_channel(channel).reply
 
     def used_steam_ids_for(self, steam_id):
-        if not self.db or not self.db.exists(PLAYER_BASE.format(steam_id) + ":ips"):
+        if not self.db:
             return [steam_id]
 
-        ips = self.db.smembers(PLAYER_BASE.format(steam_id) + ":ips")
-
-        used_steam_ids: set[str] = set()
-        for ip in ips:
-            if not self.db.exists(IPS_BASE + f":{ip}"):
-                continue
-
-            used_steam_ids = used_steam_ids | self.db.smembers(IPS_BASE + f":{ip}")
-
-        return [int(_steam_id) for _steam_id in used_steam_ids]
+        return self.alias_graph.used_steam_ids_for(self.db, steam_id)
 
     def fetch_aliases(self, steam_ids):
         formatted_steam_ids = "+".join([str(steam_id) for steam_id in steam_ids])
         url_template = f"{A_ELO.url_base}aliases/{formatted_steam_ids}.json"
 
         try:
-            result = requests_retry_session().get(url_template, timeout=A_ELO.timeout)
+            result = self.http_session.get(url_template, timeout=A_ELO.timeout)
         except RequestException as exception:
             self.logger.debug(f"request exception: {exception}")
             return {}
@@ -578,14 +611,47 @@ class elocheck(Plugin):
         return result
 
     def resolve_player_name(self, steam_id):
-        player = self.player(steam_id)
-        if player is not None:
-            return remove_trailing_color_code(player.name)
+        return remove_trailing_color_code(self.lookup_player_names([steam_id]).get(steam_id) or "unknown")
+
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([PLAYER_BASE.format(steam_id) + ":last_used_name" for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
 
-        if self.db and self.db.exists(PLAYER_BASE.format(steam_id) + ":last_used_name"):
-            return remove_trailing_color_code(self.db[PLAYER_BASE.format(steam_id) + ":last_used_name"])
+        return resolved_names
 
-        return "unknown"
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     def cmd_aliases(self, player, msg, channel):
         if len(msg) != 2:
@@ -664,17 +730,217 @@ class elocheck(Plugin):
         return minqlx.RET_STOP_ALL
 
 
+class AliasGraph:
+    """
+    Resolves the steam ids that connected from the same IPs as a player by walking the bipartite graph of steam ids
+    and IPs stored in the database.
+
+    All players resolved together are walked breadth first at the same time, with one pipelined round trip for the IPs
+    and one for the steam ids per hop. Resolved steam ids are cached for a short time.
+    """
+
+    __slots__ = ("max_hops", "max_nodes", "ttl", "_resolved", "_lock")
+
+    def __init__(self, *, max_hops=1, max_nodes=256, ttl=60):
+        self.max_hops = max(max_hops, 1)
+        self.max_nodes = max_nodes
+        self.ttl = ttl
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def used_steam_ids_for(self, db, steam_id):
+        return self.used_steam_ids_for_all(db, [steam_id])[steam_id]
+
+    def used_steam_ids_for_all(self, db, steam_ids):
+        now = time.monotonic()
+        resolved = {}
+        with self._lock:
+            for steam_id in steam_ids:
+                if steam_id in self._resolved and self._resolved[steam_id][0] > now:
+                    resolved[steam_id] = list(self._resolved[steam_id][1])
+
+        unresolved = [steam_id for steam_id in dict.fromkeys(steam_ids) if steam_id not in resolved]
+        if len(unresolved) == 0:
+            return resolved
+
+        components = self.traverse(db, unresolved)
+        with self._lock:
+            for steam_id, component in components.items():
+                self._resolved[steam_id] = (now + self.ttl, component)
+                resolved[steam_id] = list(component)
+
+            expired = [steam_id for steam_id, (expires, _) in self._resolved.items() if expires <= now]
+            for steam_id in expired:
+                del self._resolved[steam_id]
+
+        return resolved
+
+    def traverse(self, db, steam_ids):
+        ips_of: dict[int, set[str]] = {}
+        steam_ids_of: dict[str, set[int]] = {}
+        components: dict[int, tuple[set[int], set[str], set[int]]] = {
+            steam_id: ({steam_id}, set(), {steam_id}) for steam_id in steam_ids
+        }
+
+        for _ in range(self.max_hops):
+            frontier = set()
+            for _steam_ids, _, steam_id_frontier in components.values():
+                frontier |= steam_id_frontier
+            if len(frontier) == 0:
+                break
+
+            unfetched_steam_ids = list(frontier - ips_of.keys())
+            fetched_ips = self._fetch_members(
+                db, [PLAYER_BASE.format(steam_id) + ":ips" for steam_id in unfetched_steam_ids]
+            )
+            ips_of.update(zip(unfetched_steam_ids, fetched_ips))
+
+            ip_frontiers = {}
+            for steam_id, (_steam_ids, _ips, steam_id_frontier) in components.items():
+                ip_frontiers[steam_id] = {
+                    ip for _steam_id in steam_id_frontier for ip in ips_of[_steam_id] if ip not in _ips
+                }
+            ip_frontier = set().union(*ip_frontiers.values())
+            unfetched_ips = list(ip_frontier - steam_ids_of.keys())
+            fetched_steam_ids = self._fetch_members(db, [IPS_BASE + f":{ip}" for ip in unfetched_ips])
+            for ip, members in zip(unfetched_ips, fetched_steam_ids):
+                steam_ids_of[ip] = {int(member) for member in members}
+
+            for steam_id, (_steam_ids, _ips, steam_id_frontier) in components.items():
+                steam_id_frontier.clear()
+                for ip in ip_frontiers[steam_id]:
+                    if len(_steam_ids) + len(_ips) >= self.max_nodes:
+                        break
+                    _ips.add(ip)
+                    for _steam_id in steam_ids_of[ip]:
+                        if _steam_id in _steam_ids or len(_steam_ids) + len(_ips) >= self.max_nodes:
+                            continue
+                        _steam_ids.add(_steam_id)
+                        steam_id_frontier.add(_steam_id)
+
+        return {steam_id: tuple(_steam_ids) for steam_id, (_steam_ids, _, _) in components.items()}
+
+    @staticmethod
+    def _fetch_members(db, keys):
+        if len(keys) == 0:
+            return []
+
+        pipeline = db.pipeline(transaction=False)
+        for key in keys:
+            pipeline.smembers(key)
+        return pipeline.execute()
+
+    def invalidate(self, steam_id=None):
+        with self._lock:
+            if steam_id is None:
+                self._resolved.clear()
+                return
+
+            self._resolved.pop(steam_id, None)
+
+
 FILTERED_OUT_GAMETYPE_RESPONSES = ["steamid"]
 
 
+class PooledRetryClient:
+    """
+    Long-lived, connection-pooled http client shared by the skill rating providers.
+
+    All requests are issued from one background event loop, so that the underlying aiohttp session with its keep-alive
+    connections and dns cache survives the short-lived event loops created by asyncio.run throughout the plugin.
+    """
+
+    __slots__ = (
+        "limit_per_host",
+        "keepalive_timeout",
+        "retry_options",
+        "timeout",
+        "_lock",
+        "_loop",
+        "_thread",
+        "_client",
+    )
+
+    def __init__(self, *, limit_per_host=4, keepalive_timeout=60, retry_options=None, timeout=None):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.retry_options = retry_options or ExponentialRetry(
+            attempts=3,
+            factor=0.1,
+            statuses={500, 502, 504},
+            exceptions={aiohttp.ClientResponseError, aiohttp.ClientPayloadError},
+        )
+        self.timeout = timeout or ClientTimeout(total=5, connect=3, sock_connect=3, sock_read=5)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    def _running_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="elocheck-http", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _get_json(self, url, headers):
+        if self._client is None:
+            self._client = RetryClient(
+                raise_for_status=False,
+                retry_options=self.retry_options,
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+            )
+
+        async with self._client.get(url, headers=headers) as result:
+            if result.status != 200:
+                return None
+            return await result.json()
+
+    async def get_json(self, url, *, headers=None):
+        future = asyncio.run_coroutine_threadsafe(self._get_json(url, headers), self._running_loop())
+        return await asyncio.wrap_future(future)
+
+    async def _close_client(self):
+        if self._client is None:
+            return
+
+        await self._client.close()
+        self._client = None
+
+    def close(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if loop is None:
+            return
+
+        with contextlib.suppress(Exception):
+            asyncio.run_coroutine_threadsafe(self._close_client(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+
+
+RATINGS_CLIENT = PooledRetryClient()
+
+
 class SkillRatingProvider:
-    __slots__ = ("name", "url_base", "balance_api", "timeout")
+    __slots__ = ("name", "url_base", "balance_api", "timeout", "client")
 
-    def __init__(self, name, url_base, balance_api, timeout=7):
+    def __init__(self, name, url_base, balance_api, timeout=7, client=None):
         self.name = name
         self.url_base = url_base
         self.balance_api = balance_api
         self.timeout = timeout
+        self.client = client if client is not None else RATINGS_CLIENT
 
     async def fetch_elos(self, steam_ids, *, headers=None):
         if len(steam_ids) == 0:
@@ -682,20 +948,7 @@ class SkillRatingProvider:
 
         formatted_steam_ids = "+".join([str(steam_id) for steam_id in steam_ids])
         request_url = f"{self.url_base}{self.balance_api}/{formatted_steam_ids}"
-        retry_options = ExponentialRetry(
-            attempts=3,
-            factor=0.1,
-            statuses={500, 502, 504},
-            exceptions={aiohttp.ClientResponseError, aiohttp.ClientPayloadError},
-        )
-        async with RetryClient(
-            raise_for_status=False,
-            retry_options=retry_options,
-            timeout=ClientTimeout(total=5, connect=3, sock_connect=3, sock_read=5),
-        ) as retry_client, retry_client.get(request_url, headers=headers) as result:
-            if result.status != 200:
-                return None
-            return await result.json()
+        return await self.client.get_json(request_url, headers=headers)
 
 
 TRUSKILLS = SkillRatingProvider("Truskill", "http://stats.houseofquake.com/", "elo/map_based")
@@ -284,7 +284,7 @@ class openai_bot(Plugin):
             discord_plugin = Plugin._loaded_plugins["mydiscordbot"]
             # noinspection PyUnresolvedReferences
             discord_plugin.discord.relay_message(
-                Plugin.clean_text(f"**{self.bot_clanprefix}{self.bot_name}**: {message}")
+                Plugin.clean_text(f"**{self.bot_clanprefix}{self.bot_name}**: {message}"), interactive=True
             )
 
     def _ql_cleaned_up(self, message):
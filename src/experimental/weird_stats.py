@@ -1,5 +1,8 @@
 import random
 import math
+import threading
+from array import array
+from collections import OrderedDict
 
 from typing import NamedTuple
 import itertools
@@ -15,16 +18,6 @@ import minqlx
 from minqlx import Plugin, Player
 
 
-class Position(NamedTuple):
-    x: int
-    y: int
-    z: int
-
-
-def calculate_distance(previous, current):
-    return math.sqrt((current.x - previous.x) ** 2 + (current.y - previous.y) ** 2 + (current.z - previous.z) ** 2)
-
-
 def format_float(value):
     return f"{value:,.02f}".replace(",", ";").replace(".", ",").replace(";", ".")
 
@@ -479,110 +472,160 @@ class PlayerStatsEntry:
             self.stats_data.append(stats_entry)
 
 
-def filter_stats_for_max_value(stats, func):
-    if len(stats) == 0:
-        return []
-    max_value = max(stats, key=func)
-    return list(filter(lambda stats_entry: func(stats_entry) == func(max_value), stats))
+class StatsLeaderboards:
+    """
+    Keeps track of the leading players for each stat announced at the end of a match.
+
+    The stats of each PLAYER_STATS event are added to the player's running totals as they come in, and only the
+    leaderboards of stats that changed are updated, so announcing a stat only reads its current leaders.
+    """
+
+    __slots__ = ("names", "arrival", "totals", "leaderboards")
+
+    def __init__(self):
+        self.names = {}
+        self.arrival = {}
+        self.totals = {}
+        self.leaderboards = {}
+
+    def add(self, player_stats):
+        steam_id = player_stats.steam_id
+        if steam_id not in self.arrival:
+            self.arrival[steam_id] = len(self.arrival)
+            self.totals[steam_id] = {}
+        self.names[steam_id] = player_stats.name
+
+        totals = self.totals[steam_id]
+        changed_stats: dict[tuple[str, ...], int] = {}
+        for weapon, weapon_stats in zip(Weapons._fields, player_stats.weapons):
+            for weapon_stat in WeaponStats._fields[1:]:
+                changed_stats[("weapons", weapon, weapon_stat)] = getattr(weapon_stats, weapon_stat)
+        for medal_stat, medal_value in zip(Medals._fields, player_stats.medals):
+            changed_stats[("medals", medal_stat)] = medal_value
+        for pickup_stat, pickup_value in zip(Pickups._fields, player_stats.pickups):
+            changed_stats[("pickups", pickup_stat)] = pickup_value
+
+        for stat, value in changed_stats.items():
+            totals[stat] = totals.get(stat, 0) + value
+
+        for weapon in Weapons._fields:
+            changed_stats[("weapons", weapon, "accuracy")] = 0
+            hits, shots = totals[("weapons", weapon, "hits")], totals[("weapons", weapon, "shots")]
+            totals[("weapons", weapon, "accuracy")] = WeaponStats(weapon, 0, 0, 0, hits, 0, 0, shots, 0).accuracy
+
+        for stat in changed_stats:
+            self._update_leaderboard(stat, steam_id, totals[stat])
+
+    def _update_leaderboard(self, stat, steam_id, value):
+        if stat not in self.leaderboards or value > self.leaderboards[stat][0]:
+            self.leaderboards[stat] = (value, {steam_id})
+            return
+
+        leading_value, leading_steam_ids = self.leaderboards[stat]
+        if value == leading_value:
+            leading_steam_ids.add(steam_id)
+            return
+
+        if steam_id not in leading_steam_ids:
+            return
+
+        # only derived stats like accuracies drop, so re-determining the leaders should be rare
+        leading_value = max(totals[stat] for totals in self.totals.values())
+        self.leaderboards[stat] = (
+            leading_value,
+            {_steam_id for _steam_id, totals in self.totals.items() if totals[stat] == leading_value},
+        )
 
+    def leaders(self, *stat):
+        if stat not in self.leaderboards:
+            return 0, []
 
-def most_weapon_hits_announcement(stats):
+        leading_value, leading_steam_ids = self.leaderboards[stat]
+        ordered_steam_ids = sorted(leading_steam_ids, key=lambda steam_id: self.arrival[steam_id])
+        return leading_value, [self.names[steam_id] for steam_id in ordered_steam_ids]
+
+
+def most_weapon_hits_announcement(leaderboards):
     returned = ""
 
-    for announcement, filter_func in [
-        ("Gauntleteer", lambda stats_entry: stats_entry.weapons.gauntlet.hits),
-        ("Machinist", lambda stats_entry: stats_entry.weapons.machinegun.hits),
-        ("Shotgunner", lambda stats_entry: stats_entry.weapons.shotgun.hits),
-        ("Nader", lambda stats_entry: stats_entry.weapons.grenade_launcher.hits),
-        ("Rocketeer", lambda stats_entry: stats_entry.weapons.rocket_launcher.hits),
-        ("Shafter", lambda stats_entry: stats_entry.weapons.lightninggun.hits),
-        ("Railer", lambda stats_entry: stats_entry.weapons.railgun.hits),
-        ("Plasmagunner", lambda stats_entry: stats_entry.weapons.plasmagun.hits),
-        ("Heavy Machinist", lambda stats_entry: stats_entry.weapons.hmg.hits),
-        ("BFGer", lambda stats_entry: stats_entry.weapons.bfg.hits),
-        ("Nailer", lambda stats_entry: stats_entry.weapons.nailgun.hits),
-        ("Miner", lambda stats_entry: stats_entry.weapons.proximity_mine_launcher.hits),
-        ("Chainer", lambda stats_entry: stats_entry.weapons.chaingun.hits),
-        ("Grappler", lambda stats_entry: stats_entry.weapons.other.hits),
+    for announcement, weapon in [
+        ("Gauntleteer", "gauntlet"),
+        ("Machinist", "machinegun"),
+        ("Shotgunner", "shotgun"),
+        ("Nader", "grenade_launcher"),
+        ("Rocketeer", "rocket_launcher"),
+        ("Shafter", "lightninggun"),
+        ("Railer", "railgun"),
+        ("Plasmagunner", "plasmagun"),
+        ("Heavy Machinist", "hmg"),
+        ("BFGer", "bfg"),
+        ("Nailer", "nailgun"),
+        ("Miner", "proximity_mine_launcher"),
+        ("Chainer", "chaingun"),
+        ("Grappler", "other"),
     ]:
-        most_effective_players = filter_stats_for_max_value(stats, filter_func)
-        if len(most_effective_players) > 0 and filter_func(most_effective_players[0]) > 0:
-            most_effective_player_names = "^7, ".join([_stats.name for _stats in most_effective_players])
+        most_hits, most_effective_players = leaderboards.leaders("weapons", weapon, "hits")
+        if len(most_effective_players) > 0 and most_hits > 0:
+            most_effective_player_names = "^7, ".join(most_effective_players)
             if len(most_effective_players) == 1:
-                returned += (
-                    f"^5{announcement}^7: {most_effective_player_names}^7 "
-                    f"(^5{format_int(filter_func(most_effective_players[0]))}^7 hits) "
-                )
+                returned += f"^5{announcement}^7: {most_effective_player_names}^7 (^5{format_int(most_hits)}^7 hits) "
             else:
-                returned += (
-                    f"^5{announcement}s^7: {most_effective_player_names}^7 "
-                    f"(^5{format_int(filter_func(most_effective_players[0]))}^7 hits) "
-                )
+                returned += f"^5{announcement}s^7: {most_effective_player_names}^7 (^5{format_int(most_hits)}^7 hits) "
     if len(returned.strip()) == 0:
         return None
 
     return f"  Players with most hits per weapon: {returned}"
 
 
-def most_accurate_railbitches_announcement(stats):
-    railbitches = filter_stats_for_max_value(stats, lambda stats_entry: stats_entry.weapons.railgun.accuracy)
+def most_accurate_railbitches_announcement(leaderboards):
+    accuracy, railbitches = leaderboards.leaders("weapons", "railgun", "accuracy")
     if len(railbitches) == 0:
         return None
 
-    if railbitches[0].weapons.railgun.accuracy < 0.01:
+    if accuracy < 0.01:
         return None
 
     if len(railbitches) == 1:
-        return (
-            f"  ^5Railbitch award^7: {railbitches[0].name}^7 "
-            f"(^5{railbitches[0].weapons.railgun.accuracy:.02f}^7 percent accuracy)"
-        )
+        return f"  ^5Railbitch award^7: {railbitches[0]}^7 (^5{accuracy:.02f}^7 percent accuracy)"
 
-    railbitch_player_names = "^7, ".join([stats.name for stats in railbitches])
-    return (
-        f"  ^5Railbitch awards^7: {railbitch_player_names}^7 "
-        f"(^5{railbitches[0].weapons.railgun.accuracy:.02f}^7 percent accuracy)"
-    )
+    railbitch_player_names = "^7, ".join(railbitches)
+    return f"  ^5Railbitch awards^7: {railbitch_player_names}^7 (^5{accuracy:.02f}^7 percent accuracy)"
 
 
-def longest_shaftlamers_announcement(stats):
-    shaftlamers = filter_stats_for_max_value(stats, lambda stats_entry: stats_entry.weapons.lightninggun.time)
+def longest_shaftlamers_announcement(leaderboards):
+    shaft_time, shaftlamers = leaderboards.leaders("weapons", "lightninggun", "time")
     if len(shaftlamers) == 0:
         return None
 
-    if shaftlamers[0].weapons.lightninggun.time <= 0:
+    if shaft_time <= 0:
         return None
 
     if len(shaftlamers) == 1:
-        return (
-            f"  ^5Shaftlamer award^7: {shaftlamers[0].name}^7 (^5{shaftlamers[0].weapons.lightninggun.time}^7 seconds)"
-        )
+        return f"  ^5Shaftlamer award^7: {shaftlamers[0]}^7 (^5{shaft_time}^7 seconds)"
 
-    shaftlamer_player_names = "^7, ".join([stats.name for stats in shaftlamers])
+    shaftlamer_player_names = "^7, ".join(shaftlamers)
 
-    return (
-        f"  ^5Shaftlamer awards^7: {shaftlamer_player_names}^7 (^5{shaftlamers[0].weapons.lightninggun.time}^7 seconds)"
-    )
+    return f"  ^5Shaftlamer awards^7: {shaftlamer_player_names}^7 (^5{shaft_time}^7 seconds)"
 
 
-def most_honorable_haste_pickup_announcement(stats):
-    hasters = filter_stats_for_max_value(stats, lambda stats_entry: stats_entry.pickups.haste)
+def most_honorable_haste_pickup_announcement(leaderboards):
+    haste_pickups, hasters = leaderboards.leaders("pickups", "haste")
     if len(hasters) == 0:
         return None
 
-    if hasters[0].pickups.haste <= 0:
+    if haste_pickups <= 0:
         return None
 
     if len(hasters) == 1:
-        return f"  ^5Haste honor award^7: {hasters[0].name}^7 (^5{hasters[0].pickups.haste}^7 pickups)"
+        return f"  ^5Haste honor award^7: {hasters[0]}^7 (^5{haste_pickups}^7 pickups)"
 
-    haste_player_names = "^7, ".join([stats.name for stats in hasters])
-    return f"  ^5Haste honor awards^7: {haste_player_names}^7 (^5{hasters[0].pickups.haste}^7 pickups)"
+    haste_player_names = "^7, ".join(hasters)
+    return f"  ^5Haste honor awards^7: {haste_player_names}^7 (^5{haste_pickups}^7 pickups)"
 
 
-def weird_facts(stats):
-    medal_facts = random_medal_facts(stats)
-    weapon_facts = random_weapon_stats(stats)
+def weird_facts(leaderboards):
+    medal_facts = random_medal_facts(leaderboards)
+    weapon_facts = random_weapon_stats(leaderboards)
 
     conjunctions = [random_conjunction() for _ in range(len(medal_facts) + len(weapon_facts) - 1)]
     conjuncted_facts = itertools.chain.from_iterable(
@@ -620,14 +663,14 @@ def random_conjunction():
     return next(conjunction_iter)
 
 
-def random_medal_facts(stats, *, count=1):
+def random_medal_facts(leaderboards, *, count=1):
     returned = []
 
     medalstats = list(Medals._fields)
     random.shuffle(medalstats)
 
     for medalstat in medalstats:
-        formatted_fact = formatted_medal_fact(stats, medalstat)
+        formatted_fact = formatted_medal_fact(leaderboards, medalstat)
         if formatted_fact is not None and len(formatted_fact) > 0:
             returned.append(formatted_fact)
         if len(returned) == count:
@@ -636,21 +679,15 @@ def random_medal_facts(stats, *, count=1):
     return returned
 
 
-def formatted_medal_fact(stats, medal_stat):
-    most_medaled_stats = filter_stats_for_max_value(stats, lambda stats_entry: getattr(stats_entry.medals, medal_stat))
+def formatted_medal_fact(leaderboards, medal_stat):
+    medal_stat_value, most_medaled_players = leaderboards.leaders("medals", medal_stat)
 
-    if len(most_medaled_stats) > 0:
-        medal_stat_value: int = getattr(most_medaled_stats[0].medals, medal_stat)
-        if medal_stat_value > 0:
-            if len(most_medaled_stats) == 1:
-                player_names = most_medaled_stats[0].name
-            else:
-                player_names = (
-                    "^7, ".join([stats.name for stats in most_medaled_stats[:-1]])
-                    + "^7 and "
-                    + most_medaled_stats[-1].name
-                )
-            return f"{player_names} received ^5{medal_stat_value} {medal_stat} medals^7"
+    if len(most_medaled_players) > 0 and medal_stat_value > 0:
+        if len(most_medaled_players) == 1:
+            player_names = most_medaled_players[0]
+        else:
+            player_names = "^7, ".join(most_medaled_players[:-1]) + "^7 and " + most_medaled_players[-1]
+        return f"{player_names} received ^5{medal_stat_value} {medal_stat} medals^7"
 
     return ""
 
@@ -908,14 +945,14 @@ def format_weapon_fact(weapon_stat, player_names, weapon_name, stats_amount):
     )
 
 
-def random_weapon_stats(stats, *, count=3):
+def random_weapon_stats(leaderboards, *, count=3):
     returned = []
 
     weaponstats = [field for field in WeaponStats._fields if field not in ["name"]]
     randomized_weapon_stats = list(itertools.product(Weapons._fields, weaponstats))
     random.shuffle(randomized_weapon_stats)
     for weapon, weapon_fact in randomized_weapon_stats:
-        formatted_fact = formatted_weapon_fact(stats, weapon, weapon_fact)
+        formatted_fact = formatted_weapon_fact(leaderboards, weapon, weapon_fact)
         if formatted_weapon_fact is not None and len(formatted_fact) > 0:
             returned.append(formatted_fact)
 
@@ -925,22 +962,14 @@ def random_weapon_stats(stats, *, count=3):
     return returned
 
 
-def formatted_weapon_fact(stats, weapon, weapon_fact):
-    most_weaponed_stats = filter_stats_for_max_value(
-        stats,
-        lambda stats_entry: getattr(getattr(stats_entry.weapons, weapon), weapon_fact),
-    )
+def formatted_weapon_fact(leaderboards, weapon, weapon_fact):
+    stats_amount, most_weaponed_players = leaderboards.leaders("weapons", weapon, weapon_fact)
 
-    if len(most_weaponed_stats) > 0:
-        if len(most_weaponed_stats) == 1:
-            player_names = most_weaponed_stats[0].name
+    if len(most_weaponed_players) > 0:
+        if len(most_weaponed_players) == 1:
+            player_names = most_weaponed_players[0]
         else:
-            player_names = (
-                "^7, ".join([stats.name for stats in most_weaponed_stats[:-1]])
-                + "^7 and "
-                + most_weaponed_stats[-1].name
-            )
-        stats_amount = getattr(getattr(most_weaponed_stats[0].weapons, weapon), weapon_fact)
+            player_names = "^7, ".join(most_weaponed_players[:-1]) + "^7 and " + most_weaponed_players[-1]
         if stats_amount > 0:
             return format_weapon_fact(
                 weapon_fact,
@@ -952,10 +981,82 @@ def formatted_weapon_fact(stats, weapon, weapon_fact):
     return ""
 
 
+class MovementSampler:
+    """
+    Samples the positions of the alive players on the red and blue team every sample_rate frames.
+
+    Positions are kept in an array preallocated for all client ids, and fetched with a single player_state call per
+    player and sample. The distances moved since the previous sample are calculated for all tracked players in one
+    pass. Moves longer than teleport_distance, i.e. teleporters, are dropped.
+    """
+
+    __slots__ = ("sample_rate", "teleport_distance", "frame_count", "positions", "steam_ids")
+
+    def __init__(self, *, sample_rate=1, teleport_distance=800.0, max_clients=64):
+        self.sample_rate = max(sample_rate, 1)
+        self.teleport_distance = teleport_distance
+        self.frame_count = 0
+        self.positions = array("d", bytes(3 * max_clients * array("d").itemsize))
+        self.steam_ids = [None] * max_clients
+
+    def reset(self):
+        self.frame_count = 0
+        self.steam_ids = [None] * len(self.steam_ids)
+
+    def tick(self):
+        self.frame_count += 1
+        if self.frame_count < self.sample_rate:
+            return []
+
+        self.frame_count = 0
+        return self.sample()
+
+    def sample(self):
+        steam_ids = self.steam_ids
+        positions = self.positions
+
+        sampled_clients = []
+        sampled_positions = []
+        tracked_steam_ids = []
+        previous_positions = []
+        current_positions = []
+        for client_id, info in enumerate(minqlx.players_info()):
+            if not info or info.team not in (minqlx.TEAM_RED, minqlx.TEAM_BLUE):
+                steam_ids[client_id] = None
+                continue
+
+            state = minqlx.player_state(client_id)
+            if state is None or not state.is_alive:
+                steam_ids[client_id] = None
+                continue
+
+            if steam_ids[client_id] == info.steam_id:
+                tracked_steam_ids.append(info.steam_id)
+                previous_positions.append(positions[3 * client_id : 3 * client_id + 3])
+                current_positions.append(state.position)
+
+            steam_ids[client_id] = info.steam_id
+            sampled_clients.append(client_id)
+            sampled_positions.append(state.position)
+
+        for client_id, position in zip(sampled_clients, sampled_positions):
+            positions[3 * client_id], positions[3 * client_id + 1], positions[3 * client_id + 2] = position
+
+        moved_distances = map(math.dist, previous_positions, current_positions)
+        return [
+            (steam_id, moved_distance)
+            for steam_id, moved_distance in zip(tracked_steam_ids, moved_distances)
+            if moved_distance < self.teleport_distance
+        ]
+
+
 LAST_USED_NAME_KEY = "minqlx:players:{}:last_used_name"
 PLAYER_TOP_SPEEDS = "minqlx:players:{}:topspeed"
 MAP_TOP_SPEEDS = "minqlx:maps:{}:topspeed"
 MAP_SPEED_LOG = "minqlx:maps:{}:speedlog"
+MAP_SPEED_STATS = "minqlx:maps:{}:speedstats"
+MAP_AVERAGE_SPEEDS = "minqlx:maps:averagespeeds"
+NAME_CACHE_SIZE = 1024
 
 
 # noinspection PyPep8Naming
@@ -968,6 +1069,7 @@ class weird_stats(Plugin):
         self.set_cvar_once("qlx_weirdstats_fastestmaps_display_ingame", "10")
         self.set_cvar_once("qlx_weirdstats_fastestmaps_display_warmup", "30")
         self.set_cvar_once("qlx_weirdstats_openai_announce_stats", "1")
+        self.set_cvar_once("qlx_weirdstats_movement_sample_rate", "1")
 
         self.stats_play_time_fraction = self.get_cvar("qlx_weirdstats_playtime_fraction", float) or 0.75
         self.stats_top_display = self.get_cvar("qlx_weirdstats_topdisplay", int) or 3
@@ -977,6 +1079,9 @@ class weird_stats(Plugin):
         self.fastestmaps_display_warmup = self.get_cvar("qlx_weirdstats_fastestmaps_display_warmup", int) or 30
         cvar_value = self.get_cvar("qlx_weirdstats_openai_announce_stats", bool)
         self.openai_announce_stats = True if cvar_value is None else cvar_value
+        self.movement_sampler = MovementSampler(
+            sample_rate=self.get_cvar("qlx_weirdstats_movement_sample_rate", int) or 1
+        )
 
         self.game_start_time = None
         self.join_times = {}  # type: ignore
@@ -991,19 +1096,22 @@ class weird_stats(Plugin):
         self.round_start_datetime = None
         self.fastest_death = -1, -1
         self.alive_times = {}  # type: ignore
-        self.previous_positions = {}  # type: ignore
         self.travelled_distances = {}  # type: ignore
 
         self.player_stats = {}  # type: ignore
+        self.stats_leaderboards = StatsLeaderboards()
         self.playerstats_announcements = [
             most_accurate_railbitches_announcement,
             longest_shaftlamers_announcement,
             most_honorable_haste_pickup_announcement,
             weird_facts,
         ]
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
 
         self.add_hook("team_switch", self.handle_team_switch)
         self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
         self.add_hook("frame", self.handle_frame)
         self.add_hook("game_countdown", self.handle_game_countdown)
         self.add_hook("game_start", self.handle_game_start)
@@ -1018,6 +1126,7 @@ class weird_stats(Plugin):
         self.add_command("topspeeds", self.cmd_player_top_speeds, usage="[NAME]")
         self.add_command("maptopspeeds", self.cmd_map_top_speeds, usage="[NAME]")
         self.add_command(("fastestmaps", "slowestmaps"), self.cmd_fastest_maps)
+        self.add_command("migratespeedlogs", self.cmd_migrate_speed_logs, permission=5)
 
     def handle_team_switch(self, player, old_team, new_team):
         if not player:
@@ -1046,33 +1155,22 @@ class weird_stats(Plugin):
         self.join_times[player.steam_id] = datetime.now()
 
     def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
+
         if player.steam_id in self.join_times:
             del self.join_times[player.steam_id]
 
-    def handle_frame(self):
-        teams = self.teams()
-        for player in teams["red"] + teams["blue"]:
-            if not player.is_alive:
-                if player.steam_id in self.previous_positions:
-                    del self.previous_positions[player.steam_id]
-                continue
-
-            distance = self.travelled_distances.get(player.steam_id, 0.0)
-            moved_distance = self.calculate_player_distance(player)
-
-            if self.in_round and moved_distance < 800.0:
-                self.travelled_distances[player.steam_id] = distance + moved_distance
-
-            self.previous_positions[player.steam_id] = Position(*player.position())
-
-    def calculate_player_distance(self, player):
-        if not player.is_alive:
-            return 0.0
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
 
-        if player.steam_id not in self.previous_positions:
-            return 0.0
+    def handle_frame(self):
+        moved_distances = self.movement_sampler.tick()
+        if not self.in_round:
+            return
 
-        return calculate_distance(self.previous_positions[player.steam_id], Position(*player.position()))
+        for steam_id, moved_distance in moved_distances:
+            self.travelled_distances[steam_id] = self.travelled_distances.get(steam_id, 0.0) + moved_distance
 
     def handle_game_countdown(self):
         self.reinitialize_game()
@@ -1088,7 +1186,8 @@ class weird_stats(Plugin):
         self.match_end_announced = False
         self.round_start_datetime = None
         self.player_stats = {}
-        self.previous_positions = {}
+        self.stats_leaderboards = StatsLeaderboards()
+        self.movement_sampler.reset()
         self.travelled_distances = {}
         self.fastest_death = -1, -1
 
@@ -1104,10 +1203,8 @@ class weird_stats(Plugin):
         self.match_end_announced = False
         self.round_start_datetime = datetime.now()
 
-        teams = self.teams()
-        self.previous_positions = {
-            player.steam_id: Position(*player.position()) for player in teams["red"] + teams["blue"]
-        }
+        self.movement_sampler.reset()
+        self.movement_sampler.sample()
 
     def handle_death(self, victim, killer, data):
         self.record_means_of_death(victim, killer, data["MOD"])
@@ -1184,6 +1281,8 @@ class weird_stats(Plugin):
         if player_stats.warmup:
             return
 
+        self.stats_leaderboards.add(player_stats)
+
         if player_stats.steam_id not in self.player_stats:
             self.player_stats[player_stats.steam_id] = player_stats
         else:
@@ -1211,9 +1310,7 @@ class weird_stats(Plugin):
         most_environmental_deaths_announcement = self.environmental_deaths(
             self.means_of_death, ["void", "lava", "acid", "drowning", "squished"]
         )
-        stats_announcements = [
-            announcer(list(self.player_stats.values())) for announcer in self.playerstats_announcements
-        ]
+        stats_announcements = [announcer(self.stats_leaderboards) for announcer in self.playerstats_announcements]
 
         if len(player_speed_announcements) > 0:
             announcements = [
@@ -1434,13 +1531,7 @@ class weird_stats(Plugin):
             if deaths == filtered_means_of_death[most_environmental_deaths]
         ]
 
-        most_environmental_deaths_names = []
-        for steam_id in most_entrironmental_deaths_steam_ids:
-            player = self.resolve_player_name(steam_id)
-            if player is None:
-                most_environmental_deaths_names.append(str(steam_id))
-            else:
-                most_environmental_deaths_names.append(player)
+        most_environmental_deaths_names = self.resolve_player_names(most_entrironmental_deaths_steam_ids)
 
         formatted_names = "^7, ".join(most_environmental_deaths_names)
 
@@ -1471,7 +1562,36 @@ class weird_stats(Plugin):
                     self.db.zadd(PLAYER_TOP_SPEEDS.format(steam_id), speed, mapname)
                     # noinspection PyTypeChecker
                     self.db.zadd(MAP_TOP_SPEEDS.format(mapname), speed, steam_id)
-            self.db.rpush(MAP_SPEED_LOG.format(mapname), speed)
+
+        self.record_map_speed_statistics(mapname, speeds.values())
+
+    def record_map_speed_statistics(self, mapname, speeds, *, replaced_speed_log=None):
+        if self.db is None:
+            return
+
+        speeds = [float(speed) for speed in speeds]
+        if len(speeds) == 0 and replaced_speed_log is None:
+            return
+
+        pipeline = self.db.pipeline(transaction=True)
+        pipeline.hincrby(MAP_SPEED_STATS.format(mapname), "count", len(speeds))
+        pipeline.hincrbyfloat(MAP_SPEED_STATS.format(mapname), "sum", sum(speeds))
+        pipeline.hincrbyfloat(MAP_SPEED_STATS.format(mapname), "sumsq", sum(speed * speed for speed in speeds))
+        if replaced_speed_log is not None:
+            pipeline.delete(replaced_speed_log)
+        count, speed_sum, _ = pipeline.execute()[:3]
+
+        if int(count) == 0:
+            return
+
+        average_speed = float(speed_sum) / int(count)
+        # noinspection PyUnresolvedReferences
+        if redis.VERSION >= (3,):
+            # noinspection PyTypeChecker
+            self.db.zadd(MAP_AVERAGE_SPEEDS, {mapname: average_speed})
+        else:
+            # noinspection PyTypeChecker
+            self.db.zadd(MAP_AVERAGE_SPEEDS, average_speed, mapname)
 
     def record_personal_speed(self, mapname, steam_id, speed):
         if self.db is None:
@@ -1594,20 +1714,51 @@ class weird_stats(Plugin):
         return target_players.pop()
 
     def resolve_player_name(self, item):
-        if isinstance(item, str) and not item.isdigit():
-            return item
-
-        steam_id = int(item)
-
-        player = self.player(steam_id)
-
-        if player is not None:
-            return player.name
+        return self.lookup_player_names([item]).get(item) or str(item)
+
+    def resolve_player_names(self, items):
+        resolved_names = self.lookup_player_names(items)
+        return [resolved_names.get(item) or str(item) for item in items]
+
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([LAST_USED_NAME_KEY.format(steam_id) for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
 
-        if self.db is not None and self.db.exists(LAST_USED_NAME_KEY.format(steam_id)):
-            return self.db.get(LAST_USED_NAME_KEY.format(steam_id))
+        return resolved_names
 
-        return str(item)
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     @minqlx.thread
     def collect_and_report_player_top_speeds(self, channel, steam_id):
@@ -1658,11 +1809,10 @@ class weird_stats(Plugin):
             channel.reply(f"^7No records found for map ^6{mapname}^7.")
             return
 
+        top_speeds = map_speed_statistics[0:10]
+        player_names = self.resolve_player_names([steam_id for steam_id, _speed in top_speeds])
         formatted_speeds = "^7] [".join(
-            [
-                f"{self.resolve_player_name(steam_id)}-^5{speed:.2f} km/h"
-                for steam_id, speed in map_speed_statistics[0:10]
-            ]
+            [f"{player_name}-^5{speed:.2f} km/h" for player_name, (_steam_id, speed) in zip(player_names, top_speeds)]
         )
         channel.reply(f"^7All-time top 10 speeds for ^6{mapname}^7: ")
         channel.reply(f"^7[{formatted_speeds}^7].")
@@ -1677,41 +1827,54 @@ class weird_stats(Plugin):
         if self.db is None:
             return
 
-        all_avg_speeds = {}
-        for map_speed_key in self.db.keys(MAP_SPEED_LOG.format("*")):
-            template_prefix_index = len(MAP_SPEED_LOG.split("{", maxsplit=1)[0])
-            template_postfix_index = len(MAP_SPEED_LOG.split("}", maxsplit=1)[1])
-            mapname = map_speed_key[template_prefix_index:-template_postfix_index]
-            raw_map_speeds = self.db.lrange(MAP_SPEED_LOG.format(mapname), 0, -1)
-            if len(raw_map_speeds) == 0:
-                continue
-
-            map_speeds = [float(speed) for speed in raw_map_speeds]
-            all_avg_speeds[mapname] = statistics.mean(map_speeds)
-
-        if len(all_avg_speeds) == 0:
-            channel.reply("^7No records yet. Please play more matches!")
-            return
-
         if not self.game or self.game.state != "warmup":
             upper_limit = self.fastestmaps_display_ingame
         else:
             upper_limit = self.fastestmaps_display_warmup
 
-        sorted_mapnames = sorted(all_avg_speeds, key=all_avg_speeds.get, reverse=True)  # type: ignore
+        pipeline = self.db.pipeline(transaction=False)
+        pipeline.zrevrange(MAP_AVERAGE_SPEEDS, 0, upper_limit - 1, withscores=True)
+        pipeline.zrange(MAP_AVERAGE_SPEEDS, 0, upper_limit - 1, withscores=True)
+        fastest_maps, slowest_maps = pipeline.execute()
+
+        if len(fastest_maps) == 0:
+            channel.reply("^7No records yet. Please play more matches!")
+            return
+
         formatted_speeds = "^7] [".join(
-            [f"^6{mapname}-^5{all_avg_speeds[mapname]:.2f} km/h^7" for mapname in sorted_mapnames[0:upper_limit]]
+            [f"^6{mapname}-^5{float(avg_speed):.2f} km/h^7" for mapname, avg_speed in fastest_maps]
         )
         channel.reply(f"Top {upper_limit} fastest maps by average player speed:")
         channel.reply(f"^7[{formatted_speeds}^7].")
 
-        sorted_mapnames.reverse()
         formatted_speeds = "^7] [".join(
-            [f"^6{mapname}-^5{all_avg_speeds[mapname]:.2f} km/h^7" for mapname in sorted_mapnames[0:upper_limit]]
+            [f"^6{mapname}-^5{float(avg_speed):.2f} km/h^7" for mapname, avg_speed in slowest_maps]
         )
         channel.reply(f"Top {upper_limit} slowest maps by average player speed:")
         channel.reply(f"^7[{formatted_speeds}^7].")
 
+    def cmd_migrate_speed_logs(self, _player, _msg, channel):
+        reply_channel = self.identify_reply_channel(channel)
+
+        self.migrate_speed_logs(reply_channel)
+
+    @minqlx.thread
+    def migrate_speed_logs(self, channel):
+        if self.db is None:
+            return
+
+        template_prefix_index = len(MAP_SPEED_LOG.split("{", maxsplit=1)[0])
+        template_postfix_index = len(MAP_SPEED_LOG.split("}", maxsplit=1)[1])
+
+        migrated_maps = 0
+        for map_speed_key in list(self.db.scan_iter(match=MAP_SPEED_LOG.format("*"))):
+            mapname = map_speed_key[template_prefix_index:-template_postfix_index]
+            raw_map_speeds = self.db.lrange(map_speed_key, 0, -1)
+            self.record_map_speed_statistics(mapname, raw_map_speeds, replaced_speed_log=map_speed_key)
+            migrated_maps += 1
+
+        channel.reply(f"^7Migrated the speed logs of ^6{migrated_maps}^7 maps into the map speed statistics.")
+
     def map_speed_log(self, mapname):
         if self.db is None:
             return []
@@ -1,12 +1,17 @@
-from collections import Counter
+import time
+import threading
+from collections import Counter, OrderedDict
 
+import redis
 
 import minqlx
-from minqlx import Plugin, NonexistentPlayerError
+from minqlx import Plugin
 
 COLLECTED_SOULZ_KEY = "minqlx:players:{}:soulz"
 REAPERZ_KEY = "minqlx:players:{}:reaperz"
+SOULZ_BALANCE_KEY = "minqlx:players:{}:soulzbalance"
 _name_key = "minqlx:players:{}:last_used_name"
+NAME_CACHE_SIZE = 1024
 
 SPECIAL_KILLERS = [
     "lava",
@@ -30,26 +35,69 @@ class frag_stats(Plugin):
 
         self.set_cvar_once("qlx_fragstats_toplimit", "10")
 
+        self.set_cvar_once("qlx_fragstats_flushinterval", "60")
+
         self.toplimit = self.get_cvar("qlx_fragstats_toplimit", int) or 10
+        self.flush_interval = self.get_cvar("qlx_fragstats_flushinterval", int) or 60
 
         self.add_hook("player_disconnect", self.handle_player_disconnect)
+        self.add_hook("userinfo", self.handle_userinfo)
         self.add_hook("game_countdown", self.handle_game_countdown)
         self.add_hook("death", self.handle_death)
+        self.add_hook("game_end", self.handle_game_end)
+        self.add_hook("map", self.handle_map_change)
+        self.add_hook("unload", self.handle_plugin_unload)
+        self.add_hook("frame", self.handle_frame)
 
         self.add_command("mapsoulz", self.cmd_mapsoulz)
         self.add_command("mapreaperz", self.cmd_mapreaperz)
         self.add_command(("soulz", "reaperz", "soulzbalance", "fragbalance"), self.cmd_soulzbalance)
+        self.add_command("backfillsoulzbalance", self.cmd_backfill_soulzbalance, permission=5)
+        self.add_command("fragstatssize", self.cmd_fragstats_size, permission=5)
 
         self.frag_log = []
+        self.pending_frags: Counter[tuple[str, str]] = Counter()
+        self.pending_lock = threading.Lock()
+        self.flush_lock = threading.RLock()
+        self.last_flush = time.monotonic()
+        self.name_cache: OrderedDict[int, str] = OrderedDict()
+        self.name_cache_lock = threading.Lock()
 
     def handle_player_disconnect(self, player, _reason):
+        self.forget_player_name(player.steam_id)
         if self.db is None:
             return
         self.db.set(_name_key.format(player.steam_id), player.name)
 
+    def handle_userinfo(self, player, changed):
+        if "name" in changed:
+            self.forget_player_name(player.steam_id)
+
     def handle_game_countdown(self):
         self.frag_log = []
 
+    def handle_game_end(self, _data):
+        self.persist_pending_frags()
+
+    def handle_map_change(self, _mapname, _factory):
+        self.persist_pending_frags()
+
+    def handle_plugin_unload(self, plugin):
+        if plugin != self.__class__.__name__:
+            return
+
+        self.flush_pending_frags()
+
+    def handle_frame(self):
+        if time.monotonic() - self.last_flush < self.flush_interval:
+            return
+
+        self.last_flush = time.monotonic()
+        if len(self.pending_frags) == 0:
+            return
+
+        self.persist_pending_frags()
+
     def handle_death(self, victim, killer, data):
         if not self.game or self.game.state != "in_progress":
             return
@@ -72,11 +120,72 @@ class frag_stats(Plugin):
     def record_frag(self, recorded_killer, victim):
         self.frag_log.append((recorded_killer, victim))
 
+        with self.pending_lock:
+            self.pending_frags[(str(recorded_killer), str(victim))] += 1
+
+    @minqlx.thread
+    def persist_pending_frags(self):
+        self.flush_pending_frags()
+
+    def flush_pending_frags(self):
         if self.db is None:
             return
 
-        self.db.zincrby(COLLECTED_SOULZ_KEY.format(recorded_killer), value=str(victim), amount=1)
-        self.db.zincrby(REAPERZ_KEY.format(victim), value=str(recorded_killer), amount=1)
+        with self.flush_lock:
+            with self.pending_lock:
+                pending_frags = self.pending_frags
+                self.pending_frags = Counter()
+            self.last_flush = time.monotonic()
+
+            if len(pending_frags) == 0:
+                return
+
+            pipeline = self.db.pipeline(transaction=False)
+            for (killer, victim), frag_count in pending_frags.items():
+                pipeline.zincrby(COLLECTED_SOULZ_KEY.format(killer), value=victim, amount=frag_count)
+                pipeline.zincrby(REAPERZ_KEY.format(victim), value=killer, amount=frag_count)
+                if killer in SPECIAL_KILLERS or victim in SPECIAL_KILLERS:
+                    continue
+                pipeline.zincrby(SOULZ_BALANCE_KEY.format(killer), value=victim, amount=frag_count)
+                pipeline.zincrby(SOULZ_BALANCE_KEY.format(victim), value=killer, amount=-frag_count)
+
+            try:
+                pipeline.execute()
+            except Exception:
+                with self.pending_lock:
+                    self.pending_frags.update(pending_frags)
+                raise
+
+    def pending_soulz_of(self, fragger_identifier):
+        with self.pending_lock:
+            return Counter(
+                {
+                    victim: frag_count
+                    for (killer, victim), frag_count in self.pending_frags.items()
+                    if killer == str(fragger_identifier)
+                }
+            )
+
+    def pending_reaperz_of(self, fragged_identifier):
+        with self.pending_lock:
+            return Counter(
+                {
+                    killer: frag_count
+                    for (killer, victim), frag_count in self.pending_frags.items()
+                    if victim == str(fragged_identifier)
+                }
+            )
+
+    def pending_soulz_balance_of(self, fragger_identifier):
+        pending_balances: dict[str, int] = {}
+        for victim, frag_count in self.pending_soulz_of(fragger_identifier).items():
+            pending_balances[victim] = pending_balances.get(victim, 0) + frag_count
+        for killer, frag_count in self.pending_reaperz_of(fragger_identifier).items():
+            pending_balances[killer] = pending_balances.get(killer, 0) - frag_count
+
+        for special_killer in SPECIAL_KILLERS:
+            pending_balances.pop(special_killer, None)
+        return pending_balances
 
     # noinspection PyMethodMayBeStatic
     def determine_killer(self, killer, means_of_death):
@@ -183,27 +292,53 @@ class frag_stats(Plugin):
         if len(entries) == 0:
             return []
         if isinstance(entries[0], tuple):
-            return {self.resolve_player_name(steam_id): int(value) for steam_id, value in entries}
-        return [self.resolve_player_name(item) for item in entries]
+            resolved_names = self.lookup_player_names([steam_id for steam_id, _value in entries])
+            return {resolved_names.get(steam_id) or str(steam_id): int(value) for steam_id, value in entries}
+        resolved_names = self.lookup_player_names(entries)
+        return [resolved_names.get(item) or str(item) for item in entries]
 
     def resolve_player_name(self, item):
-        if not str(item).isdigit():
-            return str(item)
-
-        steam_id = int(item)
-
-        try:
-            player = self.player(steam_id)
-        except NonexistentPlayerError:
-            player = None
-
-        if player is not None:
-            return player.name
-
-        if self.db is not None and self.db.exists(_name_key.format(steam_id)):
-            return self.db.get(_name_key.format(steam_id))
-
-        return str(item)
+        return self.lookup_player_names([item]).get(item) or str(item)
+
+    def lookup_player_names(self, identifiers):
+        resolved_names = {}
+        unresolved_identifiers: dict[int, list] = {}
+        for identifier in identifiers:
+            if not str(identifier).isdigit():
+                resolved_names[identifier] = identifier
+                continue
+            unresolved_identifiers.setdefault(int(identifier), []).append(identifier)
+
+        for player in self.players():
+            for identifier in unresolved_identifiers.pop(player.steam_id, []):
+                resolved_names[identifier] = player.name
+
+        with self.name_cache_lock:
+            for steam_id in [steam_id for steam_id in unresolved_identifiers if steam_id in self.name_cache]:
+                self.name_cache.move_to_end(steam_id)
+                for identifier in unresolved_identifiers.pop(steam_id):
+                    resolved_names[identifier] = self.name_cache[steam_id]
+
+        if len(unresolved_identifiers) == 0 or self.db is None:
+            return resolved_names
+
+        steam_ids = list(unresolved_identifiers)
+        names = self.db.mget([_name_key.format(steam_id) for steam_id in steam_ids])
+        with self.name_cache_lock:
+            for steam_id, name in zip(steam_ids, names):
+                if name is None:
+                    continue
+                self.name_cache[steam_id] = name
+                for identifier in unresolved_identifiers[steam_id]:
+                    resolved_names[identifier] = name
+            while len(self.name_cache) > NAME_CACHE_SIZE:
+                self.name_cache.popitem(last=False)
+
+        return resolved_names
+
+    def forget_player_name(self, steam_id):
+        with self.name_cache_lock:
+            self.name_cache.pop(steam_id, None)
 
     def find_target_player_or_list_alternatives(self, player, target):
         # Tell a player which players matched
@@ -242,31 +377,53 @@ class frag_stats(Plugin):
         # By now there can only be one person left
         return target_players.pop()
 
-    def overall_frag_statistics_for(self, fragger_identifier):
-        if self.db is None:
-            return Counter([])
-        player_fragged_log = self.db.zrevrangebyscore(
-            COLLECTED_SOULZ_KEY.format(fragger_identifier),
-            "+INF",
-            "-INF",
-            withscores=True,
+    def top_soulz_balances_for(self, fragger_identifier, limit):
+        if self.db is None or limit <= 0:
+            return [], []
+
+        balance_key = SOULZ_BALANCE_KEY.format(fragger_identifier)
+        with self.flush_lock:
+            pending_balances = self.pending_soulz_balance_of(fragger_identifier)
+            # Pending frags may move up to len(pending_balances) opponents across the persisted top ranks.
+            fetch_limit = limit + len(pending_balances)
+
+            pipeline = self.db.pipeline(transaction=False)
+            pipeline.zrevrange(balance_key, 0, fetch_limit - 1, withscores=True)
+            pipeline.zrange(balance_key, 0, fetch_limit - 1, withscores=True)
+            for opponent in pending_balances:
+                pipeline.zscore(balance_key, opponent)
+            best_balances, worst_balances, *persisted_pending_balances = pipeline.execute()
+
+        balances = {str(opponent): int(balance) for opponent, balance in best_balances + worst_balances}
+        for (opponent, pending_balance), persisted_balance in zip(pending_balances.items(), persisted_pending_balances):
+            balances[opponent] = int(persisted_balance or 0) + pending_balance
+
+        return (
+            sorted(balances.items(), key=lambda item: (item[1], item[0]), reverse=True)[:limit],
+            sorted(balances.items(), key=lambda item: (item[1], item[0]))[:limit],
         )
 
-        resolved_fragged_log = self.resolve_player_names(player_fragged_log)
-        return Counter(resolved_fragged_log)
+    def head_to_head_frag_counts(self, fragger_identifier, opponents):
+        if self.db is None or len(opponents) == 0:
+            return {}
 
-    def overall_fraggers_of(self, fragger_identifier):
-        if self.db is None:
-            return Counter([])
-        player_fragger_log = self.db.zrevrangebyscore(
-            REAPERZ_KEY.format(fragger_identifier),
-            "+INF",
-            "-INF",
-            withscores=True,
-        )
+        with self.flush_lock:
+            pipeline = self.db.pipeline(transaction=False)
+            for opponent in opponents:
+                pipeline.zscore(COLLECTED_SOULZ_KEY.format(fragger_identifier), opponent)
+                pipeline.zscore(REAPERZ_KEY.format(fragger_identifier), opponent)
+            persisted_frag_counts = pipeline.execute()
 
-        resolved_fragger_log = self.resolve_player_names(player_fragger_log)
-        return Counter(resolved_fragger_log)
+            pending_soulz = self.pending_soulz_of(fragger_identifier)
+            pending_reaperz = self.pending_reaperz_of(fragger_identifier)
+
+        return {
+            opponent: (
+                int(persisted_frag_counts[2 * index] or 0) + pending_soulz[opponent],
+                int(persisted_frag_counts[2 * index + 1] or 0) + pending_reaperz[opponent],
+            )
+            for index, opponent in enumerate(opponents)
+        }
 
     # noinspection PyMethodMayBeStatic
     def identify_reply_channel(self, channel):
@@ -295,35 +452,29 @@ class frag_stats(Plugin):
         if fragger_identifier is None:
             return
 
-        fragged_statistics = self.overall_frag_statistics_for(fragger_identifier)
-        reaper_statistics = self.overall_fraggers_of(fragger_identifier)
+        best_balances, worst_balances = self.top_soulz_balances_for(fragger_identifier, self.toplimit // 2)
 
-        soulz_statistics = fragged_statistics.copy()
-        soulz_statistics.subtract(reaper_statistics)
-        reaped_statistics = reaper_statistics.copy()
-        reaped_statistics.subtract(fragged_statistics)
-
-        for reaper in SPECIAL_KILLERS:
-            del soulz_statistics[reaper]
-            del reaped_statistics[reaper]
-
-        if len(soulz_statistics) == 0:
+        if len(best_balances) == 0:
             reply_channel.reply(
                 f"{fragger_name}^7 didn't reap any soulz, and {fragger_name}^7's soul wasn't reaped, yet."
             )
             return
 
+        opponents = list(dict.fromkeys(opponent for opponent, _balance in best_balances + worst_balances))
+        frag_counts = self.head_to_head_frag_counts(fragger_identifier, opponents)
+        opponent_names = self.lookup_player_names(opponents)
+
         formatted_souls = ", ".join(
-            f"{self.resolve_player_name(victim)}^7({self.color_coded_balance_diff(soulz_statistics[victim])})"
-            f"({fragged_statistics[victim]}/{reaper_statistics[victim]})"
-            for victim, kill_count in soulz_statistics.most_common(self.toplimit // 2)
+            f"{opponent_names.get(opponent) or opponent}^7({self.color_coded_balance_diff(balance)})"
+            f"({frag_counts[opponent][0]}/{frag_counts[opponent][1]})"
+            for opponent, balance in best_balances
         )
         reply_channel.reply(f"Best {self.toplimit // 2} soul balance for {fragger_name}^7: {formatted_souls}")
 
         formatted_reapers = ", ".join(
-            f"{self.resolve_player_name(victim)}^7({self.color_coded_balance_diff(soulz_statistics[victim])})"
-            f"({fragged_statistics[victim]}/{reaper_statistics[victim]})"
-            for victim, kill_count in reaped_statistics.most_common(self.toplimit // 2)
+            f"{opponent_names.get(opponent) or opponent}^7({self.color_coded_balance_diff(balance)})"
+            f"({frag_counts[opponent][0]}/{frag_counts[opponent][1]})"
+            for opponent, balance in worst_balances
         )
         reply_channel.reply(f"Worst {self.toplimit // 2} soul balance for {fragger_name}^7: {formatted_reapers}")
 
@@ -337,10 +488,14 @@ class frag_stats(Plugin):
         if opponent_name is None and opponent_identifier is None:
             return
 
-        soulz = self.db.zscore(COLLECTED_SOULZ_KEY.format(fragger_identifier), opponent_identifier)
-        soulz = int(soulz) if soulz is not None else 0
-        reapz = self.db.zscore(REAPERZ_KEY.format(fragger_identifier), opponent_identifier)
-        reapz = int(reapz) if reapz is not None else 0
+        with self.flush_lock:
+            soulz = self.db.zscore(COLLECTED_SOULZ_KEY.format(fragger_identifier), opponent_identifier)
+            soulz = int(soulz) if soulz is not None else 0
+            reapz = self.db.zscore(REAPERZ_KEY.format(fragger_identifier), opponent_identifier)
+            reapz = int(reapz) if reapz is not None else 0
+
+            soulz += self.pending_soulz_of(fragger_identifier)[str(opponent_identifier)]
+            reapz += self.pending_reaperz_of(fragger_identifier)[str(opponent_identifier)]
 
         if soulz > reapz:
             reply_message = (
@@ -355,6 +510,92 @@ class frag_stats(Plugin):
 
         reply_channel.reply(reply_message)
 
+    def cmd_backfill_soulzbalance(self, _player, _msg, channel):
+        reply_channel = self.identify_reply_channel(channel)
+
+        self.backfill_soulz_balances(reply_channel)
+
+    @minqlx.thread
+    def backfill_soulz_balances(self, channel):
+        if self.db is None:
+            return
+
+        self.flush_pending_frags()
+
+        steam_ids = set()
+        for key_template in (COLLECTED_SOULZ_KEY, REAPERZ_KEY):
+            key_prefix, key_postfix = key_template.split("{}")
+            for key in self.db.scan_iter(match=key_template.format("*")):
+                identifier = key[len(key_prefix) : -len(key_postfix)]
+                if identifier.isdigit():
+                    steam_ids.add(identifier)
+
+        for steam_id in steam_ids:
+            self.backfill_soulz_balance_for(steam_id)
+
+        channel.reply(f"^7Backfilled the soul balances of ^6{len(steam_ids)}^7 players.")
+
+    def backfill_soulz_balance_for(self, steam_id):
+        if self.db is None:
+            return
+
+        with self.flush_lock:
+            pipeline = self.db.pipeline(transaction=False)
+            pipeline.zrange(COLLECTED_SOULZ_KEY.format(steam_id), 0, -1, withscores=True)
+            pipeline.zrange(REAPERZ_KEY.format(steam_id), 0, -1, withscores=True)
+            collected_soulz, reaperz = pipeline.execute()
+
+            balances: dict[str, int] = {}
+            for victim, frag_count in collected_soulz:
+                balances[victim] = balances.get(victim, 0) + int(frag_count)
+            for killer, frag_count in reaperz:
+                balances[killer] = balances.get(killer, 0) - int(frag_count)
+            for special_killer in SPECIAL_KILLERS:
+                balances.pop(special_killer, None)
+
+            pipeline = self.db.pipeline()
+            pipeline.delete(SOULZ_BALANCE_KEY.format(steam_id))
+            if len(balances) > 0:
+                if redis.VERSION >= (3,):
+                    # noinspection PyTypeChecker
+                    pipeline.zadd(SOULZ_BALANCE_KEY.format(steam_id), balances)
+                else:
+                    # noinspection PyTypeChecker
+                    pipeline.zadd(SOULZ_BALANCE_KEY.format(steam_id), **balances)
+            pipeline.execute()
+
+    def cmd_fragstats_size(self, _player, _msg, channel):
+        reply_channel = self.identify_reply_channel(channel)
+
+        self.report_fragstats_size(reply_channel)
+
+    @minqlx.thread
+    def report_fragstats_size(self, channel):
+        if self.db is None:
+            return
+
+        formatted_sizes = []
+        for label, key_template in (
+            ("soulz", COLLECTED_SOULZ_KEY),
+            ("reaperz", REAPERZ_KEY),
+            ("soulzbalance", SOULZ_BALANCE_KEY),
+        ):
+            keys = list(self.db.scan_iter(match=key_template.format("*"), count=1000))
+
+            pipeline = self.db.pipeline(transaction=False)
+            for key in keys:
+                pipeline.zcard(key)
+                pipeline.memory_usage(key)
+            key_statistics = pipeline.execute() if len(keys) > 0 else []
+
+            entries = sum(int(entry_count or 0) for entry_count in key_statistics[0::2])
+            memory_usage = sum(int(key_memory or 0) for key_memory in key_statistics[1::2])
+            formatted_sizes.append(
+                f"^6{label}^7: ^6{len(keys)}^7 keys, ^6{entries}^7 entries, ^6{memory_usage / 1024:.1f}^7 KiB"
+            )
+
+        channel.reply(f"^7Frag stats storage: {', '.join(formatted_sizes)}")
+
     # noinspection PyMethodMayBeStatic
     def color_coded_balance_diff(self, balance_diff):
         if balance_diff < 0:
@@ -20,6 +20,7 @@ def requests_retry_session(
     backoff_factor=0.1,
     status_forcelist=(500, 502, 504),
     session=None,
+    pool_maxsize=4,
 ):
     session = session or Session()
     retry = Retry(
@@ -29,7 +30,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -93,7 +94,10 @@ class merciful_elo_limit(Plugin):
 
         # Collection of threads looking up elo of players {steam_id: thread }
         self.connectthreads = {}
+        # Connection pool shared by all the lookup threads
+        self.http_session = requests_retry_session(retries=10)
 
+        self.add_hook("unload", self.handle_plugin_unload)
         self.add_hook("map", self.handle_map_change)
         self.add_hook("player_connect", self.handle_player_connect, priority=minqlx.PRI_HIGHEST)
         self.add_hook("player_loaded", self.handle_player_loaded, priority=minqlx.PRI_HIGHEST)
@@ -103,6 +107,12 @@ class merciful_elo_limit(Plugin):
         self.add_command("mercis", self.cmd_mercis, permission=1)
         self.add_command("merci", self.cmd_merci, permission=2, usage="[player]")
 
+    def handle_plugin_unload(self, plugin):
+        if plugin != self.__class__.__name__:
+            return
+
+        self.http_session.close()
+
     def handle_map_change(self, _mapname, _factory):
         self.tracked_player_sids = set()
         self.announced_player_elos = set()
@@ -120,7 +130,7 @@ class merciful_elo_limit(Plugin):
 
         # If want to block, check for a lookup thread. Else create one
         if player.steam_id not in self.connectthreads:
-            ct = ConnectThread(player.steam_id, self.get_cvar("qlx_balanceApi"))
+            ct = ConnectThread(player.steam_id, self.get_cvar("qlx_balanceApi"), session=self.http_session)
             self.connectthreads[player.steam_id] = ct
             ct.start()
             self.remove_thread(player.steam_id)  # remove it after a while
@@ -456,10 +466,11 @@ class merciful_elo_limit(Plugin):
 
 
 class ConnectThread(threading.Thread):
-    def __init__(self, steam_id, balance_api):
+    def __init__(self, steam_id, balance_api, *, session=None):
         super().__init__(name="merciful")
         self._balance_api = balance_api
         self._steam_id = steam_id
+        self._session = session
         self._elo = None
         self._is_parsed = threading.Event()
 
@@ -478,7 +489,8 @@ class ConnectThread(threading.Thread):
         url = f"http://qlstats.net/{self._balance_api}/{self._steam_id}"
         logger = minqlx.get_logger("merciful_elo_limit")
         try:
-            result = requests_retry_session(retries=10).get(url, timeout=15)
+            session = self._session if self._session is not None else requests_retry_session(retries=10)
+            result = session.get(url, timeout=15)
         except RequestException as exception:
             logger.debug(f"request exception: {exception}")
             return
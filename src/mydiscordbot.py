@@ -14,11 +14,21 @@ You need to install discord.py in your python installation, i.e. python3 -m pip
 
 import re
 import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import queue
+import shutil
 import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from functools import lru_cache
+from itertools import count
 
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # noinspection PyPackageRequirements
 import discord
@@ -37,6 +47,32 @@ from minqlx import Plugin
 
 plugin_version = "v2.0.1"
 
+DISCORD_MESSAGE_LIMIT = 2000
+COMMAND_TREE_HASH_FILE = "minqlx_discord_command_tree.hash"
+
+# these regular expressions will make sure that the "@user" or "#channel" has at least three characters, and is either
+# prefixed by a space or at the beginning of the string
+USER_MENTION_PATTERN = re.compile("(?:^| )@([^ ]{3,})")
+CHANNEL_MENTION_PATTERN = re.compile("(?:^| )#([^ ]{3,})")
+MENTION_PATTERN = re.compile("(?:^| )([@#])([^ ]{3,})")
+COLOR_TAG_PATTERN = re.compile(r"\^\d")
+DEFAULT_REGEX_FLAGS = re.compile("").flags
+# discord.py 2.4 started passing the command tree to the application commands' to_dict, earlier versions take no
+# arguments
+COMMAND_TO_DICT_TAKES_TREE = "tree" in inspect.signature(discord.app_commands.Command.to_dict).parameters
+
+
+@lru_cache(maxsize=1024)
+def escaped_player_name(name):
+    """
+    Removes the color tags from a player's name just like :attr:`minqlx.Player.clean_name` does, and escapes the result
+    for discord's markdown. The results are cached, since the same few names are relayed over and over again.
+
+    :param: name: the player's name including its color tags
+    :return: the cleaned and escaped name
+    """
+    return discord.utils.escape_markdown(COLOR_TAG_PATTERN.sub("", name))
+
 
 # noinspection PyPep8Naming
 class mydiscordbot(Plugin):
@@ -84,6 +120,9 @@ class mydiscordbot(Plugin):
     messages sent towards the triggered channels
     * qlx_discordLogToSeparateLogfile (default: "0") enables extended logging for the discord library (logs to
     minqlx_discord.log in the homepath)
+    * qlx_discordLogBufferSize (default: "10000") the number of extended log records buffered for writing before further
+    records are dropped
+    * qlx_discordCompressRotatedLogs (default: "0") gzip the rotated extended log files
     * qlx_discord_extensions (default: "") discord extensions to load after initializing
     """
 
@@ -106,10 +145,18 @@ class mydiscordbot(Plugin):
         Plugin.set_cvar_once("qlx_discordReplaceMentionsForRelayedMessages", "1")
         Plugin.set_cvar_once("qlx_discordReplaceMentionsForTriggeredMessages", "1")
         Plugin.set_cvar_once("qlx_discordLogToSeparateLogfile", "0")
+        Plugin.set_cvar_once("qlx_discordLogBufferSize", "10000")
+        Plugin.set_cvar_once("qlx_discordCompressRotatedLogs", "0")
         Plugin.set_cvar_once("qlx_discord_extensions", "")
 
         # get the actual cvar values from the server
         self.discord_message_filters = Plugin.get_cvar("qlx_discordQuakeRelayMessageFilters", set) or set()
+        self.message_filters = mydiscordbot.compile_message_filters(self.discord_message_filters)
+
+        # snapshots of the game state taken on the game thread, so that the discord bot never accesses the game
+        self.game_state = GameStatePublisher()
+        # messages relayed from discord into the Quake Live chat, sent together on the game thread
+        self.quake_chat = QuakeChatRelay()
 
         # adding general plugin hooks
         self.add_hook("unload", self.handle_plugin_unload)
@@ -129,18 +176,25 @@ class mydiscordbot(Plugin):
             priority=minqlx.PRI_LOWEST,
         )
         self.add_hook("game_end", self.handle_game_countdown_or_end, priority=minqlx.PRI_LOWEST)
+        self.add_hook("frame", self.handle_frame)
+        self.add_hook("new_game", self.handle_game_state_change)
+        self.add_hook("map", self.handle_game_state_change)
+        self.add_hook("player_loaded", self.handle_game_state_change)
+        self.add_hook("player_disconnect", self.handle_game_state_change)
+        self.add_hook("team_switch", self.handle_game_state_change)
+        self.add_hook("round_end", self.handle_game_state_change)
 
         self.add_command("discord", self.cmd_discord, usage="<message>")
         self.add_command(
             "discordbot",
             self.cmd_discordbot,
             permission=1,
-            usage="[status]|connect|disconnect|reconnect",
+            usage="[status]|connect|disconnect|reconnect|sync",
         )
 
         # initialize the discord bot and its interactions on the discord server
         if discord_client is None:
-            self.discord = SimpleAsyncDiscord(self.version_information(), self.logger)
+            self.discord = SimpleAsyncDiscord(self.version_information(), self.logger, quake_chat=self.quake_chat)
         else:
             self.discord = discord_client
         self.logger.info("Connecting to Discord...")
@@ -160,19 +214,20 @@ class mydiscordbot(Plugin):
         """
         if plugin == self.__class__.__name__:
             self.discord.stop()
+            self.discord.remove_extended_logger()
 
     @staticmethod
     def game_status_information(game):
         """
         Generate the text for the topic set on discord channels.
 
-        :param: game: the game to derive the status information from
+        :param: game: the snapshot of the game to derive the status information from
 
         :return: the topic that represents the current game state.
         """
         ginfo = mydiscordbot.get_game_info(game)
 
-        num_players = len(Plugin.players())
+        num_players = len(game.players)
         max_players = game.maxclients
 
         maptitle = game.map_title if game.map_title else game.map
@@ -206,15 +261,17 @@ class mydiscordbot(Plugin):
         return "Warmup"
 
     @staticmethod
-    def player_data():
+    def player_data(game):
         """
         Formats the top 5 scorers connected to the server in a string. The return value may be used for status messages
         and used in topics to indicate reveal more data about the server and its current game.
 
+        :param: game: the snapshot of the game to take the players from
+
         :return: string of the current top5 scorers with the scores and connection time to the server
         """
         player_data = ""
-        teams = Plugin.teams()
+        teams = game.teams()
         if len(teams["red"]) > 0:
             player_data += f"\n**R:** {mydiscordbot.team_data(teams['red'])}"
         if len(teams["blue"]) > 0:
@@ -240,10 +297,51 @@ class mydiscordbot(Plugin):
 
         team_data = ""
         for player in players_by_score:
-            team_data += f"**{discord.utils.escape_markdown(player.clean_name)}**({player.score}) "
+            team_data += f"**{escaped_player_name(player.name)}**({player.score}) "
 
         return team_data
 
+    @staticmethod
+    def compile_message_filters(message_filters):
+        """
+        Compiles the configured message filters once, combined into a single regular expression where possible, so
+        that relayed messages are not matched against each filter separately.
+
+        Invalid filters are logged and skipped.
+
+        :param: message_filters: the regular expressions for messages that should not be sent to discord
+        :return: the compiled regular expressions
+        """
+        if len(message_filters) == 0:
+            return ()
+
+        combinable_filters = []
+        separate_filters = []
+        for message_filter in sorted(message_filters):
+            try:
+                compiled_filter = re.compile(message_filter)
+            except re.error as e:
+                minqlx.get_logger("mydiscordbot").warning(
+                    f"Skipping invalid message filter {message_filter!r} from qlx_discordQuakeRelayMessageFilters: {e}"
+                )
+                continue
+
+            # global flags would apply to all the combined filters (and only raise an error from Python 3.11 on), and
+            # references to groups, i.e. backreferences or conditional groups, would point to the wrong groups, so such
+            # filters are matched one by one
+            if compiled_filter.flags != DEFAULT_REGEX_FLAGS or compiled_filter.groups > 0:
+                separate_filters.append(compiled_filter)
+            else:
+                combinable_filters.append(compiled_filter)
+
+        if len(combinable_filters) <= 1:
+            return (*combinable_filters, *separate_filters)
+
+        return (
+            re.compile("|".join(f"(?:{compiled_filter.pattern})" for compiled_filter in combinable_filters)),
+            *separate_filters,
+        )
+
     def is_filtered_message(self, msg):
         """
         Checks whether the given message should be filtered and not be sent to discord.
@@ -251,12 +349,7 @@ class mydiscordbot(Plugin):
         :param: msg: the message to check whether it should be filtered
         :return: whether the message should not be relayed to discord
         """
-        for message_filter in self.discord_message_filters:
-            matcher = re.compile(message_filter)
-            if matcher.match(msg):
-                return True
-
-        return False
+        return any(message_filter.match(msg) for message_filter in self.message_filters)
 
     def handle_ql_chat(self, player, msg, channel):
         """
@@ -292,7 +385,7 @@ class mydiscordbot(Plugin):
 
         :param: player: the player that connected
         """
-        content = f"_{discord.utils.escape_markdown(player.clean_name)} connected._"
+        content = f"_{escaped_player_name(player.name)} connected._"
         self.discord.relay_message(content)
 
     @minqlx.delay(3)
@@ -308,7 +401,7 @@ class mydiscordbot(Plugin):
             reason_str = f"{reason}."
         else:
             reason_str = f"was kicked ({discord.utils.escape_markdown(Plugin.clean_text(reason))})."
-        content = f"_{discord.utils.escape_markdown(player.clean_name)} {reason_str}_"
+        content = f"_{escaped_player_name(player.name)} {reason_str}_"
         self.discord.relay_message(content)
 
     def handle_map(self, mapname, _factory):
@@ -330,7 +423,7 @@ class mydiscordbot(Plugin):
         :param: vote: the vote itself, i.e. map change, kick player, etc.
         :param: args: any arguments of the vote, i.e. map name, which player to kick, etc.
         """
-        caller_name = discord.utils.escape_markdown(caller.clean_name) if caller else "The server"
+        caller_name = escaped_player_name(caller.name) if caller else "The server"
         content = f"_{caller_name} called a vote: {vote} {discord.utils.escape_markdown(Plugin.clean_text(args))}_"
 
         self.discord.relay_message(content)
@@ -349,17 +442,32 @@ class mydiscordbot(Plugin):
 
         self.discord.relay_message(content)
 
+    def handle_frame(self):
+        """
+        Handler called every frame on the game thread. Publishes a new snapshot of the game state when the current one
+        is outdated, and sends the messages relayed from discord since the last frame to the Quake Live chat.
+        """
+        self.game_state.refresh()
+        self.quake_chat.flush()
+
+    def handle_game_state_change(self, *_args, **_kwargs):
+        """
+        Handler called whenever something changed that shows up in the game status, i.e. the map, the players, or
+        their teams. The snapshot of the game state is then refreshed on the next frame.
+        """
+        self.game_state.mark_dirty()
+
     @minqlx.delay(1)
     def handle_game_countdown_or_end(self, *_args, **_kwargs):
         """
         Handler called when the game is in countdown, i.e. about to start. This function mainly updates the topics of
         the relay channels and the triggered channels (when configured), and sends a message to all relay channels.
         """
-        game = self.game
+        game = self.game_state.publish()
         if game is None:
             return
         topic = mydiscordbot.game_status_information(game)
-        top5_players = mydiscordbot.player_data()
+        top5_players = mydiscordbot.player_data(game)
 
         self.discord.relay_message(f"{topic}{top5_players}")
 
@@ -381,13 +489,14 @@ class mydiscordbot(Plugin):
 
     def cmd_discordbot(self, _player, msg, channel):
         """
-        Handler for reconnecting the discord bot to discord in case it gets disconnected.
+        Handler for reconnecting the discord bot to discord in case it gets disconnected, or forcing a sync of its
+        application commands.
 
         :param: _player: the player that send to the trigger
         :param: msg: the original message the player sent (includes the trigger)
         :param: channel: the channel the message came through, i.e. team chat, general chat, etc.
         """
-        if len(msg) > 2 or (len(msg) == 2 and msg[1] not in ["status", "connect", "disconnect", "reconnect"]):
+        if len(msg) > 2 or (len(msg) == 2 and msg[1] not in ["status", "connect", "disconnect", "reconnect", "sync"]):
             return minqlx.RET_USAGE
 
         if len(msg) == 2 and msg[1] == "connect":
@@ -409,6 +518,15 @@ class mydiscordbot(Plugin):
             self.connect_discord()
             return minqlx.RET_NONE
 
+        if len(msg) == 2 and msg[1] == "sync":
+            if not self.discord.is_discord_logged_in():
+                channel.reply("Discord client not connected.")
+                return minqlx.RET_NONE
+            self.logger.info("Forcing application command tree sync...")
+            channel.reply("Syncing application commands with Discord...")
+            self.discord.resync_command_tree()
+            return minqlx.RET_NONE
+
         channel.reply(self.discord.status())
         return minqlx.RET_NONE
 
@@ -444,23 +562,616 @@ class MinqlxHelpCommand(DefaultHelpCommand):
         pass
 
 
+class BatchedLogWriter(QueueListener):
+    """
+    Queue listener that writes the records of a :class:`QueuedLogHandler` from its own thread to a rotating file
+    handler. All records queued so far are written at once with a single flush, and the file is rotated between
+    batches.
+    """
+
+    def __init__(self, records, file_handler, *, batch_size=100):
+        """
+        Constructor for the batched log writer.
+
+        :param: records: the queue the log records are taken from
+        :param: file_handler: the rotating file handler the records are written to
+        :param: batch_size: (default: 100) the maximum number of records written at once
+        """
+        super().__init__(records, file_handler)
+        self.records = records
+        self.file_handler = file_handler
+        self.batch_size = batch_size
+        self.stopping = False
+
+        self.written_records = 0
+        self.written_batches = 0
+        self.dropped_records = 0
+        self.reported_dropped_records = 0
+
+    def dequeue(self, block):
+        """
+        Collects all records queued so far into a batch. None is queued when the listener is stopped: the records
+        before it are handed out as a batch first, and None with the next call, which ends the writer thread.
+        """
+        if self.stopping:
+            return None
+
+        batch = [self.records.get(block)]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self.records.get_nowait())
+            except queue.Empty:
+                break
+
+        if batch[-1] is None:
+            batch.pop()
+            if len(batch) == 0:
+                return None
+            self.stopping = True
+        return batch
+
+    def enqueue_sentinel(self):
+        # the queue is bounded, so wait for the writer to make room instead of failing when it is full
+        self.records.put(None)
+
+    def handle(self, batch):
+        """
+        Writes a batch of records to the log file with a single flush, rotating the file beforehand if needed.
+
+        :param: batch: the log records to write
+        """
+        handler = self.file_handler
+        lines = []
+        for record in batch:
+            # noinspection PyBroadException
+            try:
+                lines.append(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+        dropped_records = self.dropped_records
+        if dropped_records > self.reported_dropped_records:
+            lines.append(f"{dropped_records - self.reported_dropped_records} log records dropped{handler.terminator}")
+            self.reported_dropped_records = dropped_records
+        text = "".join(lines)
+
+        handler.acquire()
+        try:
+            if handler.maxBytes > 0 and handler.stream.tell() + len(text) >= handler.maxBytes:
+                handler.doRollover()
+            handler.stream.write(text)
+            handler.stream.flush()
+        except OSError:
+            handler.handleError(batch[-1])
+        finally:
+            handler.release()
+
+        self.written_records += len(batch)
+        self.written_batches += 1
+
+
+class QueuedLogHandler(QueueHandler):
+    """
+    Log handler that hands the log records to a :class:`BatchedLogWriter` thread, so that logging from the bot's event
+    loop never blocks on disk.
+
+    The records are formatted into their final message when they are queued, so the writer never looks at arguments
+    that changed in the meantime. When the writer falls behind by more than the buffer size, further records are
+    dropped and counted, and the number of dropped records is noted in the log file once the writer catches up.
+    """
+
+    def __init__(self, file_handler, *, max_buffer=10000, batch_size=100):
+        """
+        Constructor for the queued log handler.
+
+        :param: file_handler: the rotating file handler the writer thread writes the records to
+        :param: max_buffer: (default: 10000) the number of records buffered before further records are dropped
+        :param: batch_size: (default: 100) the maximum number of records written at once
+        """
+        self.records: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=max_buffer)
+        super().__init__(self.records)
+        self.file_handler = file_handler
+        self.writer = BatchedLogWriter(self.records, file_handler, batch_size=batch_size)
+        self.writer.start()
+        self.writing = True
+
+    def enqueue(self, record):
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            self.writer.dropped_records += 1
+
+    @staticmethod
+    def gzip_namer(name):
+        return f"{name}.gz"
+
+    @staticmethod
+    def gzip_rotator(source, dest):
+        with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
+        os.remove(source)
+
+    def close(self):
+        """
+        Writes the records still buffered, stops the writer thread, and closes the file handler.
+        """
+        if self.writing:
+            self.writing = False
+            self.writer.stop()
+        self.file_handler.close()
+        super().close()
+
+    def metrics(self):
+        """
+        :return: the number of buffered, written, and dropped log records
+        """
+        return {
+            "backlog": self.records.qsize(),
+            "written_records": self.writer.written_records,
+            "written_batches": self.writer.written_batches,
+            "dropped_records": self.writer.dropped_records,
+        }
+
+
+class OutboundMessageQueue:
+    """
+    Per-channel queue for messages sent from Quake Live towards discord.
+
+    Messages arriving for a channel within a short window are merged into as few discord messages as the message size
+    limit permits, interactive messages are delivered ahead of bulk relay messages, and every channel is throttled
+    proactively to discord's message rate limit, so that relaying busy servers does not run into 429 responses.
+    """
+
+    def __init__(self, logger, *, coalesce_window=0.5, rate_limit=5, rate_limit_period=5.0, max_backlog=250):
+        """
+        Constructor for the outbound message queue.
+
+        :param: logger: the logger used for logging delivery problems
+        :param: coalesce_window: (default: 0.5) seconds to wait for further messages before sending to a channel
+        :param: rate_limit: (default: 5) the number of messages discord accepts per channel within the period
+        :param: rate_limit_period: (default: 5.0) the period in seconds the rate limit applies to
+        :param: max_backlog: (default: 250) the number of relay messages queued per channel before the oldest ones are
+        dropped
+        """
+        self.logger = logger
+        self.coalesce_window = coalesce_window
+        self.rate_limit = rate_limit
+        self.rate_limit_period = rate_limit_period
+        self.max_backlog = max_backlog
+
+        self.lock = threading.Lock()
+        self.queued_messages = {}
+        self.rate_limit_buckets = {}
+        self.delivery_tasks = {}
+
+        self.sent_messages = 0
+        self.sent_batches = 0
+        self.dropped_messages = 0
+        self.throttled_batches = 0
+
+    def enqueue(self, loop, channel, content, *, interactive=False):
+        """
+        Queue a message for a discord channel. This may be called from any thread.
+
+        :param: loop: the event loop of the discord bot the message will be delivered in
+        :param: channel: the discord channel to send the message to
+        :param: content: the content of the message
+        :param: interactive: (default: False) whether the message is a reply to a player's request rather than a relay
+        """
+        with self.lock:
+            interactive_messages, relay_messages = self.queued_messages.setdefault(channel.id, (deque(), deque()))
+            if interactive:
+                interactive_messages.append(content)
+            else:
+                relay_messages.append(content)
+                if len(relay_messages) > self.max_backlog:
+                    relay_messages.popleft()
+                    self.dropped_messages += 1
+
+        loop.call_soon_threadsafe(self.schedule_delivery, loop, channel)
+
+    def schedule_delivery(self, loop, channel):
+        delivery_task = self.delivery_tasks.get(channel.id)
+        if delivery_task is not None and not delivery_task.done():
+            return
+
+        self.delivery_tasks[channel.id] = loop.create_task(self.deliver(channel))
+
+    async def deliver(self, channel):
+        await asyncio.sleep(self.coalesce_window)
+
+        while True:
+            batch = self.next_batch(channel.id)
+            if len(batch) == 0:
+                return
+
+            if not await self.send_batch(channel, batch):
+                with self.lock:
+                    self.dropped_messages += len(batch)
+                continue
+
+            self.sent_messages += len(batch)
+            self.sent_batches += 1
+
+    async def send_batch(self, channel, batch, *, retries=1):
+        """
+        Sends a batch of messages to a discord channel. Batches rejected due to rate limits or discord server errors
+        are retried.
+
+        :param: channel: the discord channel to send the messages to
+        :param: batch: the messages to send as a single discord message
+        :param: retries: (default: 1) how often to retry after a rate limit or server error
+        :return: whether the batch was delivered
+        """
+        for attempt in range(retries + 1):
+            await self.wait_for_rate_limit(channel.id)
+            try:
+                await channel.send(
+                    "\n".join(batch),
+                    allowed_mentions=AllowedMentions(everyone=False, users=True, roles=True),
+                )
+                return True
+            except discord.HTTPException as e:
+                if attempt < retries and (e.status == 429 or e.status >= 500):
+                    continue
+                self.logger.warning(f"Could not deliver {len(batch)} message(s) to discord channel {channel.id}: {e}")
+                return False
+
+        return False
+
+    def next_batch(self, channel_id):
+        with self.lock:
+            if channel_id not in self.queued_messages:
+                return []
+
+            batch: list[str] = []
+            batch_length = 0
+            for messages in self.queued_messages[channel_id]:
+                while len(messages) > 0:
+                    message_length = len(messages[0]) if len(batch) == 0 else len(messages[0]) + 1
+                    if len(batch) > 0 and batch_length + message_length > DISCORD_MESSAGE_LIMIT:
+                        return batch
+                    batch.append(messages.popleft())
+                    batch_length += message_length
+
+            return batch
+
+    async def wait_for_rate_limit(self, channel_id):
+        now = time.monotonic()
+        tokens, last_refill = self.rate_limit_buckets.get(channel_id, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - last_refill) * self.rate_limit / self.rate_limit_period)
+        if tokens < 1:
+            self.throttled_batches += 1
+            await asyncio.sleep((1 - tokens) * self.rate_limit_period / self.rate_limit)
+            tokens = 1
+            now = time.monotonic()
+
+        self.rate_limit_buckets[channel_id] = (tokens - 1, now)
+
+    async def drain(self):
+        """
+        Waits until all messages queued so far have been delivered.
+        """
+        while True:
+            pending_deliveries = [task for task in self.delivery_tasks.values() if not task.done()]
+            if len(pending_deliveries) == 0:
+                return
+            await asyncio.gather(*pending_deliveries)
+
+    def backlog(self):
+        with self.lock:
+            return sum(
+                len(interactive_messages) + len(relay_messages)
+                for interactive_messages, relay_messages in self.queued_messages.values()
+            )
+
+    def metrics(self):
+        return {
+            "backlog": self.backlog(),
+            "sent_messages": self.sent_messages,
+            "sent_batches": self.sent_batches,
+            "dropped_messages": self.dropped_messages,
+            "throttled_batches": self.throttled_batches,
+        }
+
+
+class MentionIndex:
+    """
+    Index of discord members or channels by their lowercase names, and by the trigrams of those names for substring
+    matches, so that @user and #channel mentions can be resolved without going through all the members or channels of
+    the connected guilds for every relayed message.
+
+    Lookups return the matching items in the order they were added to the index, just like the order discord.py lists
+    them in.
+    """
+
+    def __init__(self, names_of):
+        """
+        Constructor for the mention index.
+
+        :param: names_of: function returning the names an item can be mentioned by, i.e. the name and the nick of a
+        member. None entries are skipped.
+        """
+        self.names_of = names_of
+        self.lock = threading.RLock()
+        self.items = {}
+        self.names = {}
+        self.positions = {}
+        self.next_position = count()
+        self.name_lookups: defaultdict[int, defaultdict[str, set]] = defaultdict(lambda: defaultdict(set))
+        self.trigrams = defaultdict(set)
+
+    @classmethod
+    def from_list(cls, names_of, items):
+        """
+        Builds an index for a plain list of items. The items are keyed by their position in the list, since such lists
+        may hold several items with the same id.
+        """
+        index = cls(names_of)
+        for position, item in enumerate(items):
+            index.add(item, key=position)
+        return index
+
+    @staticmethod
+    def member_names(member):
+        return member.name, member.nick
+
+    @staticmethod
+    def channel_names(channel):
+        return (channel.name,)
+
+    @staticmethod
+    def key_of(item):
+        guild = getattr(item, "guild", None)
+        return guild.id if guild is not None else None, item.id
+
+    @staticmethod
+    def trigrams_of(*names):
+        return {name[index : index + 3] for name in names if name is not None for index in range(len(name) - 2)}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def add(self, item, key=None):
+        if key is None:
+            key = self.key_of(item)
+
+        with self.lock:
+            self._unindex(key)
+            if key not in self.positions:
+                self.positions[key] = next(self.next_position)
+            self.items[key] = item
+
+            names = tuple(name.lower() if name is not None else None for name in self.names_of(item))
+            self.names[key] = names
+            for field, name in enumerate(names):
+                if name is not None:
+                    self.name_lookups[field][name].add(key)
+            for trigram in self.trigrams_of(*names):
+                self.trigrams[trigram].add(key)
+
+    def remove(self, item, key=None):
+        if key is None:
+            key = self.key_of(item)
+
+        with self.lock:
+            self._unindex(key)
+            self.items.pop(key, None)
+            self.positions.pop(key, None)
+
+    def _unindex(self, key):
+        names = self.names.pop(key, None)
+        if names is None:
+            return
+
+        for field, name in enumerate(names):
+            if name is not None:
+                self.name_lookups[field][name].discard(key)
+                if len(self.name_lookups[field][name]) == 0:
+                    del self.name_lookups[field][name]
+        for trigram in self.trigrams_of(*names):
+            self.trigrams[trigram].discard(key)
+            if len(self.trigrams[trigram]) == 0:
+                del self.trigrams[trigram]
+
+    def named(self, match, field=0):
+        """
+        :return: all items whose name in the given field matches the given match case-insensitively
+        """
+        with self.lock:
+            return self._ordered(self.name_lookups[field].get(match.lower(), set()))
+
+    def containing(self, match):
+        """
+        :return: all items with any of their names containing the given match case-insensitively
+        """
+        lowered_match = match.lower()
+        with self.lock:
+            match_trigrams = self.trigrams_of(lowered_match)
+            if len(match_trigrams) == 0:
+                candidates = set(self.items)
+            else:
+                candidates = set.intersection(
+                    *sorted((self.trigrams.get(trigram, set()) for trigram in match_trigrams), key=len)
+                )
+
+            return self._ordered(
+                key for key in candidates if any(name is not None and lowered_match in name for name in self.names[key])
+            )
+
+    def _ordered(self, keys):
+        return [self.items[key] for key in sorted(keys, key=self.positions.__getitem__)]
+
+
+class PlayerSnapshot(namedtuple("PlayerSnapshot", ["id", "steam_id", "name", "clean_name", "team", "score"])):
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, player):
+        return cls(player.id, player.steam_id, player.name, player.clean_name, player.team, player.score)
+
+
+class GameSnapshot(
+    namedtuple(
+        "GameSnapshot",
+        [
+            "map",
+            "map_title",
+            "type",
+            "type_short",
+            "state",
+            "roundlimit",
+            "red_score",
+            "blue_score",
+            "maxclients",
+            "players",
+        ],
+    )
+):
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, game, players):
+        return cls(
+            game.map,
+            game.map_title,
+            game.type,
+            game.type_short,
+            game.state,
+            game.roundlimit,
+            game.red_score,
+            game.blue_score,
+            game.maxclients,
+            tuple(PlayerSnapshot.of(player) for player in players),
+        )
+
+    def teams(self):
+        """
+        Get a dictionary with the teams as keys and the snapshots of their players as values.
+        """
+        res = {team_value: [] for team_value in minqlx.TEAMS.values()}  # type: ignore
+
+        for player in self.players:
+            res[player.team].append(player)
+
+        return res
+
+
+class QuakeChatRelay:
+    """
+    Collects the messages relayed from discord into the Quake Live chat. Messages are queued from the discord bot's
+    thread and sent together from the plugin's frame hook, so that a busy relay channel does not schedule a separate
+    task with its own server commands for every single message.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = []
+
+    def add(self, msg):
+        """
+        Queues a message for the Quake Live chat. Safe to call from any thread.
+
+        :param: msg: the message to send to the Quake Live chat
+        """
+        with self.lock:
+            self.messages.append(msg)
+
+    def flush(self):
+        """
+        Sends all queued messages to the Quake Live chat at once. Called every frame from the game thread.
+        """
+        with self.lock:
+            if len(self.messages) == 0:
+                return
+            messages = self.messages
+            self.messages = []
+
+        # the chat channel joins the lines into as few server commands as possible. Resetting the color makes every
+        # message look just like it would have been sent on its own.
+        minqlx.CHAT_CHANNEL.reply("\n^7".join(messages))
+
+
+class GameStatePublisher:
+    """
+    Keeps the latest snapshot of the game state for the discord bot's thread. Snapshots are only ever taken on the
+    game thread from the plugin's frame hook, either on the next frame after something relevant happened, or at least
+    every ``max_age`` seconds to keep the scores current, but never more often than every ``min_interval`` seconds.
+    Readers on other threads simply use :attr:`snapshot`, which is replaced as a whole and never modified, so no
+    locking is needed. :attr:`version` is only bumped when a snapshot differs from the previous one, so readers may
+    cache whatever they derive from it per version.
+    """
+
+    def __init__(self, *, min_interval=0.5, max_age=5.0):
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self.snapshot = None
+        self.published_at = None
+        self.version = 0
+        self._dirty = True
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def refresh(self):
+        """
+        Publishes a new snapshot if the current one is outdated. Called every frame from the game thread.
+        """
+        if self.published_at is not None:
+            age = time.monotonic() - self.published_at
+            if age < self.min_interval:
+                return
+            if not self._dirty and age < self.max_age:
+                return
+
+        self.publish()
+
+    def publish(self):
+        """
+        Takes a new snapshot of the game state. Must only be called from the game thread.
+
+        :return: the new snapshot, or None if no game is running
+        """
+        self._dirty = False
+        try:
+            snapshot = GameSnapshot.of(minqlx.Game(), Plugin.players())
+        except minqlx.NonexistentGameError:
+            snapshot = None
+
+        self.published_at = time.monotonic()
+        # the version is bumped after replacing the snapshot, so readers that read the version before the snapshot
+        # never see a new version together with the old snapshot
+        changed = snapshot != self.snapshot
+        self.snapshot = snapshot
+        if changed:
+            self.version += 1
+        return snapshot
+
+
 class SimpleAsyncDiscord(threading.Thread):
     """
     SimpleAsyncDiscord client which is used to communicate to discord, and provides certain commands in the relay and
     triggered channels as well as private authentication to the bot to admin the server.
     """
 
-    def __init__(self, version_information, logger):
+    def __init__(self, version_information, logger, *, quake_chat=None):
         """
         Constructor for the SimpleAsyncDiscord client the discord bot runs in.
 
         :param: version_information: the plugin's version_information string
         :param: logger: the logger used for logging, usually passed through from the minqlx plugin.
+        :param: quake_chat: the relay for messages sent to the Quake Live chat, usually the one the minqlx plugin
+        sends from its frame hook.
         """
         super().__init__()
         self.version_information = version_information
         self.logger = logger
+        self.quake_chat = quake_chat if quake_chat is not None else QuakeChatRelay()
         self.discord = None
+        self.outbound_messages = OutboundMessageQueue(logger)
+        self.mention_index_lock = threading.Lock()
+        self.member_index = None
+        self.channel_index = None
 
         self.discord_bot_token = Plugin.get_cvar("qlx_discordBotToken") or ""
         self.discord_application_id = Plugin.get_cvar("qlx_discordApplicationId", str) or ""
@@ -486,12 +1197,18 @@ class SimpleAsyncDiscord(threading.Thread):
             Plugin.get_cvar("qlx_discordReplaceMentionsForTriggeredMessages", bool) or True
         )
 
+        self.extended_log_handlers = []
         extended_logging_enabled = Plugin.get_cvar("qlx_discordLogToSeparateLogfile", bool) or False
         if extended_logging_enabled:
-            self.setup_extended_logger()
+            self.extended_log_handlers = self.setup_extended_logger()
 
     @staticmethod
     def setup_extended_logger():
+        """
+        Sets up logging of the discord library to a separate logfile and to the console.
+
+        :return: the log handlers added to the discord logger
+        """
         discord_logger: logging.Logger = logging.getLogger("discord")
         discord_logger.setLevel(logging.DEBUG)
         # File
@@ -503,9 +1220,15 @@ class SimpleAsyncDiscord(threading.Thread):
             "%H:%M:%S",
         )
         file_handler = RotatingFileHandler(file_path, encoding="utf-8", maxBytes=maxlogsize, backupCount=maxlogs)
-        file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(file_fmt)
-        discord_logger.addHandler(file_handler)
+        if Plugin.get_cvar("qlx_discordCompressRotatedLogs", bool) or False:
+            file_handler.namer = QueuedLogHandler.gzip_namer
+            file_handler.rotator = QueuedLogHandler.gzip_rotator
+        # the file is written from a separate thread, so that the bot's event loop never waits for the disk
+        max_buffer = Plugin.get_cvar("qlx_discordLogBufferSize", int) or 10000
+        queued_handler = QueuedLogHandler(file_handler, max_buffer=max_buffer)
+        queued_handler.setLevel(logging.DEBUG)
+        discord_logger.addHandler(queued_handler)
         # Console
         console_fmt = logging.Formatter("[%(name)s.%(funcName)s] %(levelname)s: %(message)s", "%H:%M:%S")
         console_handler = logging.StreamHandler()
@@ -513,6 +1236,19 @@ class SimpleAsyncDiscord(threading.Thread):
         console_handler.setFormatter(console_fmt)
         discord_logger.addHandler(console_handler)
 
+        return [queued_handler, console_handler]
+
+    def remove_extended_logger(self):
+        """
+        Removes the log handlers of the extended logger from the discord logger and closes them, so that the buffered
+        log records are written, and the writer thread and the logfile do not outlive the plugin.
+        """
+        discord_logger = logging.getLogger("discord")
+        for handler in self.extended_log_handlers:
+            discord_logger.removeHandler(handler)
+            handler.close()
+        self.extended_log_handlers = []
+
     @staticmethod
     def int_set(string_set):
         int_set = set()  # type: ignore
@@ -533,10 +1269,35 @@ class SimpleAsyncDiscord(threading.Thread):
             return "No discord connection set up."
 
         if self.is_discord_logged_in():
-            return "Discord connection up and running."
+            metrics = self.outbound_messages.metrics()
+            status = (
+                f"Discord connection up and running. Outbound messages: {metrics['backlog']} queued, "
+                f"{metrics['sent_messages']} sent in {metrics['sent_batches']} batches, "
+                f"{metrics['dropped_messages']} dropped, {metrics['throttled_batches']} batches throttled."
+            )
+            return " ".join([status, *self.periodic_job_statuses()])
 
         return "Discord client not connected."
 
+    def periodic_job_statuses(self):
+        """
+        :return: a short status line for every loaded discord extension that runs a periodic job
+        """
+        if self.discord is None:
+            return []
+
+        statuses = []
+        for name, cog in self.discord.cogs.items():
+            job_metrics = getattr(cog, "job_metrics", None)
+            if job_metrics is None:
+                continue
+            metrics = job_metrics.metrics()
+            statuses.append(
+                f"{name}: {metrics['runs']} runs, {metrics['overruns']} overruns, "
+                f"{metrics['average_duration']:.2f}s on average."
+            )
+        return statuses
+
     def run(self):
         """
         Called when the SimpleAsyncDiscord thread is started. We will set up the bot here with the right commands, and
@@ -602,6 +1363,15 @@ class SimpleAsyncDiscord(threading.Thread):
         """
         discord_bot.add_listener(self.on_ready)
         discord_bot.add_listener(self.on_message)
+        discord_bot.add_listener(self.on_member_join)
+        discord_bot.add_listener(self.on_member_update)
+        discord_bot.add_listener(self.on_member_remove)
+        discord_bot.add_listener(self.on_user_update)
+        discord_bot.add_listener(self.on_guild_channel_create)
+        discord_bot.add_listener(self.on_guild_channel_update)
+        discord_bot.add_listener(self.on_guild_channel_delete)
+        discord_bot.add_listener(self.on_guild_join)
+        discord_bot.add_listener(self.on_guild_remove)
 
         if self.discord_version_enabled:
             discord_bot.add_command(
@@ -655,6 +1425,8 @@ class SimpleAsyncDiscord(threading.Thread):
         if self.discord is None:
             return
 
+        self.invalidate_mention_indexes()
+
         extensions = Plugin.get_cvar("qlx_discord_extensions", list) or []
         ready_actions = []
         for extension in extensions:
@@ -669,8 +1441,86 @@ class SimpleAsyncDiscord(threading.Thread):
 
         ready_actions.append(self.discord.change_presence(activity=discord.Game(name="Quake Live")))
         await asyncio.gather(*ready_actions)
+        await self.sync_command_tree()
+
+    def command_tree_hash(self):
+        """
+        :return: a stable hash of the global application commands currently registered on the bot's command tree
+        """
+        if self.discord is None:
+            return None
+
+        tree = self.discord.tree
+        commands = sorted(
+            (
+                command.to_dict(tree) if COMMAND_TO_DICT_TAKES_TREE else command.to_dict()
+                for command in tree.get_commands()
+            ),
+            key=lambda command: (command.get("type", 1), command["name"]),
+        )
+        payload = json.dumps(
+            {"application_id": str(self.discord_application_id), "commands": commands},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def command_tree_hash_path():
+        return os.path.join(minqlx.get_cvar("fs_homepath") or "", COMMAND_TREE_HASH_FILE)
+
+    def read_synced_command_tree(self):
+        """
+        :return: the hash of the last synced command tree and the seconds that sync took, or None for both if the
+        command tree was never synced before
+        """
+        try:
+            with open(self.command_tree_hash_path(), encoding="utf-8") as hash_file:
+                tree_hash, sync_duration = hash_file.read().split()
+                return tree_hash, float(sync_duration)
+        except (OSError, ValueError):
+            return None, None
+
+    def store_synced_command_tree(self, tree_hash, sync_duration):
+        try:
+            with open(self.command_tree_hash_path(), "w", encoding="utf-8") as hash_file:
+                hash_file.write(f"{tree_hash} {sync_duration:.3f}")
+        except OSError as e:
+            self.logger.warning(f"Could not store the application command tree hash: {e}")
+
+    async def sync_command_tree(self, *, force=False):
+        """
+        Syncs the application command tree with discord, unless the same commands were synced before, so that
+        reconnects do not eat up discord's rate limit for application commands.
+
+        :param: force: (default: False) sync the command tree even if it did not change
+        :return: whether the command tree was synced
+        """
+        if self.discord is None:
+            return False
+
+        tree_hash = self.command_tree_hash()
+        synced_tree_hash, sync_duration = self.read_synced_command_tree()
+        if not force and tree_hash == synced_tree_hash:
+            self.logger.info(
+                f"Application command tree unchanged, skipped syncing it (saved about {sync_duration:.2f}s)."
+            )
+            return False
+
+        started = time.perf_counter()
         await self.discord.tree.sync()
+        self.store_synced_command_tree(tree_hash, time.perf_counter() - started)
         self.logger.info("Application command tree synced!")
+        return True
+
+    def resync_command_tree(self):
+        """
+        Forces a sync of the application command tree from outside the bot's event loop.
+        """
+        if self.discord is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.sync_command_tree(force=True), loop=self.discord.loop)
 
     async def on_message(self, message):
         """
@@ -694,7 +1544,85 @@ class SimpleAsyncDiscord(threading.Thread):
             # noinspection PyTypeChecker
             content: str = message.clean_content
             if len(content) > 0:
-                minqlx.CHAT_CHANNEL.reply(self._format_message_to_quake(message.channel, message.author, content))
+                self.quake_chat.add(self._format_message_to_quake(message.channel, message.author, content))
+
+    def mentionable_members(self):
+        """
+        :return: the index of all discord members that may be mentioned, built from the bot's guilds on first use
+        """
+        with self.mention_index_lock:
+            if self.member_index is None:
+                self.member_index = MentionIndex(MentionIndex.member_names)
+                if self.discord is not None:
+                    for member in self.discord.get_all_members():
+                        self.member_index.add(member)
+            return self.member_index
+
+    def mentionable_channels(self):
+        """
+        :return: the index of all discord channels that may be mentioned, built from the bot's guilds on first use
+        """
+        with self.mention_index_lock:
+            if self.channel_index is None:
+                self.channel_index = MentionIndex(MentionIndex.channel_names)
+                if self.discord is not None:
+                    for channel in self.discord.get_all_channels():
+                        if SimpleAsyncDiscord.is_mentionable_channel(channel):
+                            self.channel_index.add(channel)
+            return self.channel_index
+
+    @staticmethod
+    def is_mentionable_channel(channel):
+        return channel.type in [ChannelType.text, ChannelType.voice, ChannelType.group]
+
+    def invalidate_mention_indexes(self):
+        with self.mention_index_lock:
+            self.member_index = None
+            self.channel_index = None
+
+    async def on_member_join(self, member):
+        if self.member_index is not None:
+            self.member_index.add(member)
+
+    async def on_member_update(self, _before, after):
+        if self.member_index is not None:
+            self.member_index.add(after)
+
+    async def on_member_remove(self, member):
+        if self.member_index is not None:
+            self.member_index.remove(member)
+
+    async def on_user_update(self, _before, after):
+        if self.discord is None or self.member_index is None:
+            return
+
+        for guild in self.discord.guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                self.member_index.add(member)
+
+    async def on_guild_channel_create(self, channel):
+        if self.channel_index is not None and SimpleAsyncDiscord.is_mentionable_channel(channel):
+            self.channel_index.add(channel)
+
+    async def on_guild_channel_update(self, _before, after):
+        if self.channel_index is None:
+            return
+
+        if SimpleAsyncDiscord.is_mentionable_channel(after):
+            self.channel_index.add(after)
+        else:
+            self.channel_index.remove(after)
+
+    async def on_guild_channel_delete(self, channel):
+        if self.channel_index is not None:
+            self.channel_index.remove(channel)
+
+    async def on_guild_join(self, _guild):
+        self.invalidate_mention_indexes()
+
+    async def on_guild_remove(self, _guild):
+        self.invalidate_mention_indexes()
 
     async def on_command_error(self, exception, ctx):
         """
@@ -716,26 +1644,47 @@ class SimpleAsyncDiscord(threading.Thread):
         if self.discord is None:
             return
 
-        asyncio.run_coroutine_threadsafe(
-            self.discord.change_presence(status=discord.Status.offline),
-            loop=self.discord.loop,
-        )
-        asyncio.run_coroutine_threadsafe(self.discord.close(), loop=self.discord.loop)
+        asyncio.run_coroutine_threadsafe(self.shutdown(), loop=self.discord.loop)
 
-    def relay_message(self, msg):
+    async def shutdown(self, *, drain_timeout=5.0):
+        """
+        Delivers the messages still queued for discord, i.e. the notices sent right before disconnecting, and closes
+        the discord client afterwards.
+
+        :param: drain_timeout: (default: 5.0) seconds to wait for queued messages before giving up on them
+        """
+        if self.discord is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.outbound_messages.drain(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Discarded {self.outbound_messages.backlog()} message(s) that could not be delivered to discord "
+                f"before disconnecting."
+            )
+
+        await self.discord.change_presence(status=discord.Status.offline)
+        await self.discord.close()
+
+    def relay_message(self, msg, *, interactive=False):
         """
         relay a message to the configured relay_channels
 
         :param: msg: the message to send to the relay channel
+        :param: interactive: (default: False) whether the message answers a player and should skip ahead of the relay
+        backlog
         """
-        self.send_to_discord_channels(self.discord_relay_channel_ids, msg)
+        self.send_to_discord_channels(self.discord_relay_channel_ids, msg, interactive=interactive)
 
-    def send_to_discord_channels(self, channel_ids, content):
+    def send_to_discord_channels(self, channel_ids, content, *, interactive=False):
         """
         Send a message to a set of channel_ids on discord provided.
 
         :param: channel_ids: the ids of the channels the message should be sent to.
         :param: content: the content of the message to send to the discord channels
+        :param: interactive: (default: False) whether the message answers a player and should skip ahead of the relay
+        backlog
         """
         if not self.discord or not self.is_discord_logged_in():
             return
@@ -743,20 +1692,14 @@ class SimpleAsyncDiscord(threading.Thread):
         if not channel_ids or len(channel_ids) == 0:
             return
 
-        # send the message in its own thread to avoid blocking of the server
+        # queue the message for the bot's event loop to avoid blocking of the server
         for channel_id in channel_ids:
             channel = self.discord.get_channel(int(channel_id))
 
             if channel is None or not isinstance(channel, discord.abc.Messageable):
                 continue
 
-            asyncio.run_coroutine_threadsafe(
-                channel.send(
-                    content,
-                    allowed_mentions=AllowedMentions(everyone=False, users=True, roles=True),
-                ),
-                loop=self.discord.loop,
-            )
+            self.outbound_messages.enqueue(self.discord.loop, channel, content, interactive=interactive)
 
     def relay_chat_message(self, player, channel, message):
         """
@@ -766,12 +1709,8 @@ class SimpleAsyncDiscord(threading.Thread):
         :param: channel: the channel the original message came through
         :param: message: the content of the message
         """
-        if self.discord_replace_relayed_mentions:
-            message = self.replace_user_mentions(message, player)
-            message = self.replace_channel_mentions(message, player)
-
-        content = (
-            f"**{discord.utils.escape_markdown(player.clean_name)}**{channel}: {discord.utils.escape_markdown(message)}"
+        content = self.translate_message(
+            player, message, channel=channel, replace_mentions=self.discord_replace_relayed_mentions
         )
 
         self.relay_message(content)
@@ -784,16 +1723,52 @@ class SimpleAsyncDiscord(threading.Thread):
         :param: channel: the channel the original message came through
         :param: message: the content of the message
         """
-        if self.discord_replace_relayed_mentions:
-            message = self.replace_user_mentions(message, player)
-            message = self.replace_channel_mentions(message, player)
-
-        content = (
-            f"**{discord.utils.escape_markdown(player.clean_name)}**{channel}: {discord.utils.escape_markdown(message)}"
+        content = self.translate_message(
+            player, message, channel=channel, replace_mentions=self.discord_replace_relayed_mentions
         )
 
         self.send_to_discord_channels(self.discord_relay_team_chat_channel_ids, content)
 
+    def translate_message(self, player, message, *, channel="", replace_mentions=True):
+        """
+        Translates a chat message from Quake Live into the message sent to discord.
+
+        :param: player: the player that originally sent the message
+        :param: message: the content of the message
+        :param: channel: (default: "") the channel the original message came through
+        :param: replace_mentions: (default: True) whether to replace @user and #channel mentions in the message
+        :return: the message with the player's name as it should be sent to discord
+        """
+        if replace_mentions:
+            message = self.replace_mentions(message, player)
+
+        return f"**{escaped_player_name(player.name)}**{channel}: {discord.utils.escape_markdown(message)}"
+
+    def replace_mentions(self, message, player=None):
+        """
+        replaces mentioned discord users and channels (indicated by @user-hint and #channel-hint) with real mentions,
+        finding both kinds of mentions in a single pass over the message
+
+        :param: message: the message to replace the mentions in
+        :param: player: (default: None) when several alternatives are found for the mentions used, this player is told
+        what the alternatives are. No replacements for the ambiguous substitutions will happen.
+
+        :return: the original message replaced by properly formatted user and channel mentions
+        """
+        if not self.discord or not self.is_discord_logged_in():
+            return message
+
+        user_matches = []
+        channel_matches = []
+        for sigil, match in MENTION_PATTERN.findall(message):
+            if sigil == "@":
+                user_matches.append(match)
+            else:
+                channel_matches.append(match)
+
+        returned_message = self.replace_matched_user_mentions(message, user_matches, player)
+        return self.replace_matched_channel_mentions(returned_message, channel_matches, player)
+
     def replace_user_mentions(self, message, player=None):
         """
         replaces a mentioned discord user (indicated by @user-hint with a real mention)
@@ -807,18 +1782,27 @@ class SimpleAsyncDiscord(threading.Thread):
         if not self.discord or not self.is_discord_logged_in():
             return message
 
-        returned_message = message
-        # this regular expression will make sure that the "@user" has at least three characters, and is either
-        # prefixed by a space or at the beginning of the string
-        matcher = re.compile("(?:^| )@([^ ]{3,})")
+        return self.replace_matched_user_mentions(message, USER_MENTION_PATTERN.findall(message), player)
+
+    def replace_matched_user_mentions(self, message, matches, player=None):
+        """
+        replaces the given user mentions found in the message with real mentions
 
-        member_list = list(self.discord.get_all_members())
-        matches = matcher.findall(returned_message)
+        :param: message: the message to replace the user mentions in
+        :param: matches: the user-hints of the mentions found in the message
+        :param: player: (default: None) the player told about ambiguous mentions
+
+        :return: the original message replaced by properly formatted user mentions
+        """
+        returned_message = message
+        if len(matches) == 0:
+            return returned_message
 
+        member_index = self.mentionable_members()
         for match in sorted(matches, key=lambda _match: len(str(_match)), reverse=True):
             if str(match) in ["all", "everyone", "here"]:
                 continue
-            member = SimpleAsyncDiscord.find_user_that_matches(str(match), member_list, player)
+            member = SimpleAsyncDiscord.find_user_that_matches(str(match), member_index, player)
             if member is not None:
                 returned_message = returned_message.replace(f"@{match}", member.mention)
 
@@ -834,29 +1818,30 @@ class SimpleAsyncDiscord(threading.Thread):
         find a user that matches the given match
 
         :param: match: the match to look for in the username and nick
-        :param: member_list: the list of members connected to the discord server
+        :param: member_list: the list or MentionIndex of members connected to the discord server
         :param: player: (default: None) when several alternatives are found for the mentions used, this player is told
         what the alternatives are. None is returned in that case.
 
         :return: the matching member, or None if none or more than one are found
         """
+        member_index = (
+            member_list
+            if isinstance(member_list, MentionIndex)
+            else MentionIndex.from_list(MentionIndex.member_names, member_list)
+        )
+
         # try a direct match for the whole name first
-        member = [user for user in member_list if user.name.lower() == match.lower()]
+        member = member_index.named(match)
         if len(member) == 1:
             return member[0]
 
         # then try a direct match at the user's nickname
-        member = [user for user in member_list if user.nick is not None and user.nick.lower() == match.lower()]
+        member = member_index.named(match, field=1)
         if len(member) == 1:
             return member[0]
 
         # if direct searches for the match fail, we try to match portions of the name or portions of the nick, if set
-        member = [
-            user
-            for user in member_list
-            if user.name.lower().find(match.lower()) != -1
-            or (user.nick is not None and user.nick.lower().find(match.lower()) != -1)
-        ]
+        member = member_index.containing(match)
         if len(member) == 1:
             return list(member)[0]
 
@@ -883,20 +1868,25 @@ class SimpleAsyncDiscord(threading.Thread):
         if not self.discord or not self.is_discord_logged_in():
             return message
 
-        returned_message = message
-        # this regular expression will make sure that the "#channel" has at least three characters, and is either
-        # prefixed by a space or at the beginning of the string
-        matcher = re.compile("(?:^| )#([^ ]{3,})")
+        return self.replace_matched_channel_mentions(message, CHANNEL_MENTION_PATTERN.findall(message), player)
 
-        channel_list = [
-            ch
-            for ch in self.discord.get_all_channels()
-            if ch.type in [ChannelType.text, ChannelType.voice, ChannelType.group]
-        ]
-        matches: list[re.Match[str]] = matcher.findall(returned_message)
+    def replace_matched_channel_mentions(self, message, matches, player=None):
+        """
+        replaces the given channel mentions found in the message with real mentions
 
+        :param: message: the message to replace the channel mentions in
+        :param: matches: the channel-hints of the mentions found in the message
+        :param: player: (default: None) the player told about ambiguous mentions
+
+        :return: the original message replaced by properly formatted channel mentions
+        """
+        returned_message = message
+        if len(matches) == 0:
+            return returned_message
+
+        channel_index = self.mentionable_channels()
         for match in sorted(matches, key=lambda _match: len(str(_match)), reverse=True):
-            channel = SimpleAsyncDiscord.find_channel_that_matches(str(match), channel_list, player)
+            channel = SimpleAsyncDiscord.find_channel_that_matches(str(match), channel_index, player)
             if channel is not None:
                 returned_message = returned_message.replace(f"#{match}", channel.mention)
 
@@ -912,24 +1902,31 @@ class SimpleAsyncDiscord(threading.Thread):
         find a channel that matches the given match
 
         :param: match: the match to look for in the channel name
-        :param: channel_list: the list of channels connected to the discord server
+        :param: channel_list: the list or MentionIndex of channels connected to the discord server
         :param: player: (default: None) when several alternatives are found for the mentions used, this player is told
         what the alternatives are. None is returned in that case.
 
         :return: the matching channel, or None if none or more than one are found
         """
+        channel_index = (
+            channel_list
+            if isinstance(channel_list, MentionIndex)
+            else MentionIndex.from_list(MentionIndex.channel_names, channel_list)
+        )
+
         # try a direct channel name match case-sensitive first
-        channel = [ch for ch in channel_list if ch.name == match]
+        case_insensitive_matches = channel_index.named(match)
+        channel = [ch for ch in case_insensitive_matches if ch.name == match]
         if len(channel) == 1:
             return channel[0]
 
         # then try a case-insensitive direct match with the channel name
-        channel = [ch for ch in channel_list if ch.name.lower() == match.lower()]
+        channel = case_insensitive_matches
         if len(channel) == 1:
             return channel[0]
 
         # then we try a match with portions of the channel name
-        channel = [ch for ch in channel_list if ch.name.lower().find(match.lower()) != -1]
+        channel = channel_index.containing(match)
         if len(channel) == 1:
             return channel[0]
 
@@ -953,27 +1950,14 @@ class SimpleAsyncDiscord(threading.Thread):
         if not self.discord_triggered_channel_ids:
             return
 
-        discord_message = message
-        if self.discord_replace_triggered_mentions:
-            discord_message = self.replace_user_mentions(discord_message, player)
-            discord_message = self.replace_channel_mentions(discord_message, player)
-
+        content = self.translate_message(player, message, replace_mentions=self.discord_replace_triggered_mentions)
         if (
             self.discord_triggered_channel_message_prefix is not None
             and self.discord_triggered_channel_message_prefix != ""
         ):
-            content = (
-                f"{self.discord_triggered_channel_message_prefix} "
-                f"**{discord.utils.escape_markdown(player.clean_name)}**: "
-                f"{discord.utils.escape_markdown(discord_message)}"
-            )
-        else:
-            content = (
-                f"**{discord.utils.escape_markdown(player.clean_name)}**: "
-                f"{discord.utils.escape_markdown(discord_message)}"
-            )
+            content = f"{self.discord_triggered_channel_message_prefix} {content}"
 
-        self.send_to_discord_channels(self.discord_triggered_channel_ids, content)
+        self.send_to_discord_channels(self.discord_triggered_channel_ids, content, interactive=True)
 
         triggered_channels = (
             []
@@ -18,6 +18,7 @@ def requests_retry_session(
     backoff_factor=0.1,
     status_forcelist=(500, 502, 504),
     session=None,
+    pool_maxsize=4,
 ):
     session = session or Session()
     retry = Retry(
@@ -27,7 +28,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -67,7 +68,10 @@ class qlstats_privacy_policy(Plugin):
 
         # Collection of threads looking up elo of players {steam_id: thread }
         self.connectthreads = {}
+        # Connection pool shared by all the lookup threads
+        self.http_session = requests_retry_session()
 
+        self.add_hook("unload", self.handle_plugin_unload)
         self.add_hook("player_connect", self.handle_player_connect, priority=minqlx.PRI_HIGHEST)
         self.add_hook("player_disconnect", self.handle_player_disconnect)
         self.add_hook("team_switch_attempt", self.handle_team_switch_attempt)
@@ -75,6 +79,12 @@ class qlstats_privacy_policy(Plugin):
         self.add_command(("except", "e"), self.cmd_policy_exception, permission=5, usage="<player>")
         self.add_command("privacy", self.cmd_switch_plugin, permission=1, usage="[status]")
 
+    def handle_plugin_unload(self, plugin):
+        if plugin != self.__class__.__name__:
+            return
+
+        self.http_session.close()
+
     def check_balance_plugin_loaded(self):
         return "balance" in self.plugins
 
@@ -118,7 +128,7 @@ class qlstats_privacy_policy(Plugin):
             return minqlx.RET_NONE
 
         if player.steam_id not in self.connectthreads:
-            ct = ConnectThread(player.steam_id)
+            ct = ConnectThread(player.steam_id, session=self.http_session)
             self.connectthreads[player.steam_id] = ct
             ct.start()
             self.remove_thread(player.steam_id)  # remove it after a while
@@ -356,14 +366,16 @@ class qlstats_privacy_policy(Plugin):
 
 
 class ConnectThread(Thread):
-    def __init__(self, steam_id):
+    def __init__(self, steam_id, *, session=None):
         super().__init__()
         self._steam_id = steam_id
+        self._session = session
         self._result = None
 
     def run(self):
         url = f"http://qlstats.net/elo/{self._steam_id}"
+        session = self._session if self._session is not None else requests_retry_session()
         try:
-            self._result = requests_retry_session().get(url, timeout=15)
+            self._result = session.get(url, timeout=15)
         except RequestException as exception:
             minqlx.get_logger("qlstats_privacy_policy").debug(f"request exception: {exception}")
@@ -0,0 +1,14 @@
+from typing import Any, Awaitable, Callable
+
+def relay_to_quake_chat(msg: str) -> None: ...
+
+class PeriodicJobMetrics:
+    interval: int
+    runs: int
+    overruns: int
+    last_duration: float
+    total_duration: float
+    def __init__(self, interval: int) -> None: ...
+    async def measure(self, job: Callable[..., Awaitable[Any]], *args: Any) -> None: ...
+    def record(self, duration: float) -> None: ...
+    def metrics(self) -> dict[str, int | float]: ...
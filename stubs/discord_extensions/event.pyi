@@ -1,13 +1,29 @@
 from typing import TYPE_CHECKING
 
-if TYPE_CHECKING:
-    from typing import NoReturn
+# noinspection PyPackageRequirements
+from discord.ext import tasks
+
+# noinspection PyPackageRequirements
+from discord.ext.commands import Cog
 
+if TYPE_CHECKING:
     # noinspection PyPackageRequirements
     from discord.ext.commands import Bot
 
+    from discord_extensions import PeriodicJobMetrics
+
 async def create_and_start_event(bot: Bot) -> None: ...
 async def end_event(bot: Bot) -> None: ...
-def check_playing_activity(bot: Bot) -> None: ...
+async def check_playing_activity(bot: Bot) -> None: ...
+
+class EventScheduler(Cog):
+    bot: Bot
+    check_interval: int
+    job_metrics: PeriodicJobMetrics
+    def __init__(self, bot: Bot) -> None: ...
+    async def cog_load(self) -> None: ...
+    async def cog_unload(self) -> None: ...
+    @tasks.loop(seconds=60)
+    async def playing_activity_check(self) -> None: ...
+
 async def setup(bot: Bot) -> None: ...
-def run_schedule() -> NoReturn: ...
@@ -11,10 +11,12 @@ if TYPE_CHECKING:
     from discord.ext.commands import Bot, Context
 
     from minqlx import Game, Player
+    from mydiscordbot import GameSnapshot, GameStatePublisher, PlayerSnapshot
 
-def get_game_info(game: Game) -> str: ...
-def player_data() -> str: ...
-def team_data(player_list: list[Player]) -> str: ...
+def get_game_info(game: Game | GameSnapshot) -> str: ...
+def player_data(game: GameSnapshot) -> str: ...
+def team_data(player_list: list[Player] | list[PlayerSnapshot]) -> str: ...
+def published_game_state() -> GameStatePublisher | None: ...
 def game_status_with_teams() -> str: ...
 def int_set(string_set: set[str] | None) -> set[int]: ...
 
@@ -24,7 +26,12 @@ class Status(Cog):
     discord_triggered_channel_message_prefix: str
     discord_relay_channel_ids: set[int]
     discord_triggered_channel_ids: set[int]
+    max_staleness: float
+    cached_status: str | None
+    cached_status_version: int | None
+    cached_status_at: float
     def __init__(self, bot: Bot) -> None: ...
+    def game_status(self) -> str: ...
     def is_message_in_relay_or_triggered_channel(self, ctx: Context) -> bool: ...
     async def trigger_status(self, ctx: Context, *_args: list, **_kwargs: dict) -> None: ...
     async def slash_trigger_status(self, interaction: Interaction) -> None: ...
@@ -1,4 +1,7 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Generic, Hashable, Iterator, TypeVar
+
+# noinspection PyPackageRequirements
+from discord.ext import tasks
 
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog
@@ -23,11 +26,33 @@ if TYPE_CHECKING:
     from minqlx import Player
     from minqlx.database import Redis
 
+    from discord_extensions import PeriodicJobMetrics
+
 DISCORD_MAP_SUBSCRIPTION_KEY: str
 DISCORD_PLAYER_SUBSCRIPTION_KEY: str
 DISCORD_MEMBER_SUBSCRIPTION_KEY: str
+DISCORD_MAP_SUBSCRIBERS_KEY: str
+DISCORD_PLAYER_SUBSCRIBERS_KEY: str
+DISCORD_MEMBER_SUBSCRIBERS_KEY: str
+DISCORD_SUBSCRIBERS_INDEXED_KEY: str
 LONG_MAP_NAMES_KEY: str
 LAST_USED_NAME_KEY: str
+NAME_LOOKUP_BATCH_SIZE: int
+
+K = TypeVar("K", bound=Hashable)
+
+class SubstringIndex(Generic[K]):
+    texts: dict[K, tuple[str, ...]]
+    trigrams: dict[str, set[K]]
+    _sorted_keys: list[K] | None
+    def __init__(self) -> None: ...
+    def __len__(self) -> int: ...
+    def __contains__(self, key: K) -> bool: ...
+    @staticmethod
+    def trigrams_of(*texts: str) -> set[str]: ...
+    def update(self, key: K, *texts: str) -> None: ...
+    def remove(self, key: K) -> None: ...
+    def search(self, query: str) -> Iterator[K]: ...
 
 class SubscriberCog(Cog):
     subscribe_group: app_commands.Group
@@ -37,11 +62,24 @@ class SubscriberCog(Cog):
     long_map_names_lookup: dict[str, str]
     installed_maps: list[str]
     formatted_installed_maps: dict[str, str]
+    map_index: SubstringIndex[str]
     known_players: dict[int, str]
+    player_index: SubstringIndex[int]
     last_notified_map: str | None
     notified_steam_ids: list[int]
+    check_interval: int
+    job_metrics: PeriodicJobMetrics
     def __init__(self, bot: Bot, db: Redis) -> None: ...
-    def gather_known_players(self) -> dict[int, str]: ...
+    async def cog_load(self) -> None: ...
+    async def cog_unload(self) -> None: ...
+    @tasks.loop(seconds=60)
+    async def subscription_check(self) -> None: ...
+    def index_installed_maps(self) -> None: ...
+    def gather_known_players(self) -> None: ...
+    def remember_players_from_db(self, steam_ids: list[int]) -> None: ...
+    def remember_player(self, steam_id: int, clean_name: str) -> None: ...
+    def build_subscriber_indexes(self) -> None: ...
+    def subscribers_of(self, subscribers_key: str, subscription: str | int) -> list[User]: ...
     async def subscribe_map(self, interaction: Interaction, mapname: str) -> None: ...
     async def _subscribe_map(self, interaction: Interaction, mapname: str) -> None: ...
     def subscribed_maps_of(self, user_id: int) -> list[str]: ...
@@ -52,7 +90,12 @@ class SubscriberCog(Cog):
     async def subscribe_player(self, interaction: Interaction, player: str) -> None: ...
     async def _subscribe_player(self, interaction: Interaction, player: str) -> None: ...
     def find_matching_players(self, player: str) -> list[int]: ...
+    def iter_matching_players(self, player: str) -> Iterator[int]: ...
     def formatted_last_used_name(self, steam_id: int) -> str: ...
+    def formatted_last_used_names(self, steam_ids: list[int]) -> dict[int, str]: ...
+    def formatted_known_player_name(self, steam_id: int) -> str: ...
+    @staticmethod
+    def formatted_name(name: str) -> str: ...
     def subscribed_players_of(self, user_id: int) -> list[int]: ...
     async def subscribe_player_autocomplete(
         self, interaction: Interaction, current: str
@@ -80,6 +123,4 @@ class SubscriberCog(Cog):
     ) -> Activity | Game | CustomActivity | Streaming | Spotify | None: ...
     async def on_presence_update(self, before: Member, after: Member) -> None: ...
 
-def check_subscriptions(cog: SubscriberCog) -> None: ...
 async def setup(bot: Bot) -> None: ...
-def run_schedule() -> None: ...
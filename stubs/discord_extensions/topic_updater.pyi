@@ -1,5 +1,8 @@
 from typing import TYPE_CHECKING
 
+# noinspection PyPackageRequirements
+from discord.ext import tasks
+
 # noinspection PyPackageRequirements
 from discord.ext.commands import Cog
 
@@ -8,10 +11,15 @@ if TYPE_CHECKING:
     from discord.ext.commands import Bot
 
     from minqlx import Game
+    from mydiscordbot import GameSnapshot, GameStatePublisher
+
+TOPIC_EDITS_PER_PERIOD: int
+TOPIC_EDIT_PERIOD: int
 
-def get_game_info(game: Game) -> str: ...
-def game_status_information(game: Game) -> str: ...
+def get_game_info(game: Game | GameSnapshot) -> str: ...
+def game_status_information(game: GameSnapshot) -> str: ...
 def int_set(string_set: set[str] | None) -> set[int]: ...
+def published_game_state() -> GameStatePublisher | None: ...
 
 class TopicUpdater(Cog):
     bot: Bot
@@ -20,11 +28,16 @@ class TopicUpdater(Cog):
     discord_update_triggered_channels_topic: bool
     discord_topic_update_interval: int
     discord_kept_topic_suffixes: dict[int, str]
+    topic_edit_buckets: dict[int, tuple[float, float]]
     def __init__(self, bot: Bot) -> None: ...
     async def cog_load(self) -> None: ...
-    def _topic_updater(self) -> None: ...
+    async def cog_unload(self) -> None: ...
+    @tasks.loop(seconds=305)
+    async def topic_updater(self) -> None: ...
+    def game_topic(self) -> str | None: ...
     def update_topics_on_relay_and_triggered_channels(self, topic: str) -> None: ...
     def set_topic_on_discord_channels(self, channel_ids: set[int], topic: str) -> None: ...
+    def take_topic_edit_token(self, channel_id: int) -> bool: ...
     def is_discord_logged_in(self) -> bool: ...
     def update_topic_on_channels_and_keep_channel_suffix(self, channel_ids: set[int], topic: str) -> None: ...
 
@@ -1,19 +1,25 @@
+import threading
 from typing import TYPE_CHECKING
 
 from minqlx import Plugin
 
 if TYPE_CHECKING:
+    from typing import Iterable
+    from collections import OrderedDict
+
     from minqlx import (
         AbstractChannel,
         Player,
         RoundEndData,
         StatsData,
         PlayerStatsStats,
+        UserInfoEventInput,
     )
 
 SteamId = int
 
 WEAPON_STATS_KEY: str
+NAME_CACHE_SIZE: int
 
 def identify_reply_channel(channel: AbstractChannel) -> AbstractChannel: ...
 
@@ -23,7 +29,11 @@ class asdf(Plugin):
     red_overall_damage: int
     blue_overall_damage: int
     min_ammo_rate: float
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
     def __init__(self) -> None: ...
+    def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def handle_player_spawn(self, player: Player) -> None: ...
     def adjust_ammo_for_player(self, player: Player) -> None: ...
     def handle_stats(self, stats: StatsData) -> None: ...
@@ -37,6 +47,8 @@ class asdf(Plugin):
     def weapon_stats_for(self, steam_id: SteamId) -> dict[str, WeaponStatsEntry]: ...
     def identify_target(self, player: Player, target: SteamId | str | Player) -> tuple[str | None, SteamId | None]: ...
     def resolve_player_name(self, item: SteamId | str) -> str: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: SteamId) -> None: ...
     def find_target_player_or_list_alternatives(self, player: Player, target: int | str) -> Player | None: ...
 
 class Weapon:
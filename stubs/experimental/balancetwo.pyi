@@ -13,16 +13,23 @@ if TYPE_CHECKING:
         Iterable,
         Mapping,
         Awaitable,
+        Hashable,
     )
+    from collections import OrderedDict
     from datetime import datetime
+    from asyncio import AbstractEventLoop
+    import sched
+    from aiohttp import ClientTimeout
+    from aiohttp_retry import RetryClient, ExponentialRetry
     from requests import Session
 
-    from minqlx import AbstractChannel, Player, GameEndData
+    from minqlx import AbstractChannel, Player, GameEndData, UserInfoEventInput
     from minqlx.database import Redis
 
 SteamId = int
 PLAYER_BASE: str
 IPS_BASE: str
+NAME_CACHE_SIZE: int
 SUPPORTED_GAMETYPES: Iterable[str]
 
 def requests_retry_session(
@@ -30,6 +37,7 @@ def requests_retry_session(
     backoff_factor: float = ...,
     status_forcelist: tuple[int, int, int] = ...,
     session: Session | None = ...,
+    pool_maxsize: int = ...,
 ) -> Session: ...
 def identify_reply_channel(channel: AbstractChannel) -> AbstractChannel: ...
 def remove_trailing_color_code(text: str) -> str: ...
@@ -63,10 +71,12 @@ class balancetwo(Plugin):
     auto_rebalance: bool
     reply_channel: str
     show_steam_ids: bool
+    ratings_eviction_time: int
+    alias_graph: AliasGraph
     allowed_privacy: list[str]
     max_num_join_attempts: int
     connectthreads: dict[str, ConnectThread]
-    kickthreads: dict[SteamId, KickThread]
+    kick_scheduler: KickScheduler
     exceptions: set[SteamId]
     jointimes: dict[SteamId, datetime]
     last_new_player_id: SteamId | None
@@ -76,7 +86,13 @@ class balancetwo(Plugin):
     previous_ratings: dict[str, RatingProvider]
     ratings: dict[str, RatingProvider]
     rating_diffs: dict[str, dict[SteamId, dict[str, float]]]
+    ratings_version_counter: Iterator[int]
+    ratings_version: int
+    precomputed_balance: FingerprintCache
+    precomputing_fingerprint: Hashable | None
     informed_players: list[SteamId]
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
     vetoed_switches: list[Suggestion]
     switched_players: list[SteamId]
     switch_suggestion: Suggestion | None
@@ -86,7 +102,9 @@ class balancetwo(Plugin):
     twovstwo_iter: Iterator[tuple[SteamId, SteamId]]
     privacy_checks_enabled: bool
     join_attempts: dict[SteamId, int]
+    http_session: Session
     def __init__(self) -> None: ...
+    def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
     def parse_rating_limit(self, cvar: str) -> dict[str, int | float]: ...
     def parse_suggestion_minimum(self, cvar: str) -> dict[str, int | float]: ...
     def fetch_elos_from_all_players(self) -> None: ...
@@ -113,6 +131,8 @@ class balancetwo(Plugin):
     ) -> str: ...
     def format_player_name(self, steam_id: SteamId) -> str: ...
     def resolve_player_name(self, steam_id: SteamId) -> str: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: SteamId) -> None: ...
     def cmd_aliases(self, player: Player, msg: list[str], channel: AbstractChannel) -> int | None: ...
     def do_aliases(self, player: Player, target: str, channel: AbstractChannel) -> None: ...
     def format_player_aliases(self, steam_id: SteamId, aliases: list[str]) -> str: ...
@@ -154,6 +174,12 @@ class balancetwo(Plugin):
     def collect_suggestions(
         self, teams: Mapping[str, list[Player]], gametype: str, channel: AbstractChannel
     ) -> None: ...
+    def unrepeated_suggestions(self, possible_switches: list[Suggestion]) -> list[Suggestion]: ...
+    def balance_fingerprint(self, teams: Mapping[str, list[Player]], gametype: str) -> Hashable: ...
+    def schedule_balance_precomputation(self) -> None: ...
+    def precompute_balance(
+        self, teams: Mapping[str, list[Player]], gametype: str, fingerprint: Hashable, include_rebalance: bool
+    ) -> None: ...
     def filtered_suggestions(self, teams: Mapping[str, list[Player]], gametype: str) -> list[Suggestion]: ...
     def satisfies_minimum_suggestion_parameters(self, suggestion: Suggestion, stddev_diff: float) -> bool: ...
     def minimum_suggestion_parameters(self) -> tuple[int | float, int | float]: ...
@@ -172,8 +198,7 @@ class balancetwo(Plugin):
     def cmd_add_exception(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int | None: ...
     def cmd_del_exception(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int | None: ...
     def handle_map_change(self, mapname: str, _factory: str) -> None: ...
-    def clean_up_kickthreads(self) -> None: ...
-    def fetch_and_diff_ratings(self, mapname: str) -> None: ...
+    def fetch_and_diff_ratings(self, mapname: str, *, recheck_steam_ids: list[SteamId] | None = ...) -> None: ...
     def handle_player_connect(self, player: Player) -> str | None: ...
     def check_player_ratings(self, steam_id: SteamId) -> str | None: ...
     def rating_provider_for(self, rating_provider_name: str) -> SkillRatingProvider | None: ...
@@ -183,6 +208,7 @@ class balancetwo(Plugin):
     def schedule_kick_for_players_outside_rating_limits(self, steam_ids: list[SteamId]) -> None: ...
     def has_exception_to_play(self, steam_id: SteamId) -> bool: ...
     def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def handle_team_switch_attempt(self, player: Player, old: str, new: str) -> int | None: ...
     def check_privacy_settings(self, player: Player) -> int | None: ...
     def is_player_with_allowed_privacy_settings(
@@ -206,18 +232,66 @@ class balancetwo(Plugin):
     def handle_round_start(self, _round_number: int) -> None: ...
     def balance_before_round_start(self) -> None: ...
     def find_player_movements_to_even_teams(self) -> list[tuple[Player, str]]: ...
+    def handle_round_end(self, _data: dict) -> None: ...
     def handle_game_end(self, data: GameEndData) -> None: ...
     def record_team_stats(self, gametype: str) -> None: ...
     def team_stats(self, team: list[Player], gametype: str) -> dict[SteamId, list[int | float]]: ...
 
+class AliasGraph:
+    max_hops: int
+    max_nodes: int
+    ttl: int
+    _resolved: dict[SteamId, tuple[float, tuple[SteamId, ...]]]
+    _lock: threading.Lock
+    def __init__(self, *, max_hops: int = ..., max_nodes: int = ..., ttl: int = ...) -> None: ...
+    def used_steam_ids_for(self, db: Redis, steam_id: SteamId) -> list[SteamId]: ...
+    def used_steam_ids_for_all(self, db: Redis, steam_ids: Iterable[SteamId]) -> dict[SteamId, list[SteamId]]: ...
+    def traverse(self, db: Redis, steam_ids: Iterable[SteamId]) -> dict[SteamId, tuple[SteamId, ...]]: ...
+    @staticmethod
+    def _fetch_members(db: Redis, keys: list[str]) -> list[set[str]]: ...
+    def invalidate(self, steam_id: SteamId | None = ...) -> None: ...
+
 FILTERED_OUT_GAMETYPE_RESPONSES: Iterable[str]
 
+class PooledRetryClient:
+    limit_per_host: int
+    keepalive_timeout: float
+    retry_options: ExponentialRetry
+    timeout: ClientTimeout
+    _lock: threading.Lock
+    _loop: AbstractEventLoop | None
+    _thread: threading.Thread | None
+    _client: RetryClient | None
+    def __init__(
+        self,
+        *,
+        limit_per_host: int = ...,
+        keepalive_timeout: float = ...,
+        retry_options: ExponentialRetry | None = ...,
+        timeout: ClientTimeout | None = ...,
+    ) -> None: ...
+    def _running_loop(self) -> AbstractEventLoop: ...
+    async def _get_json(self, url: str, headers: dict[str, str] | None) -> dict | None: ...
+    async def get_json(self, url: str, *, headers: dict[str, str] | None = ...) -> dict | None: ...
+    async def _close_client(self) -> None: ...
+    def close(self) -> None: ...
+
+RATINGS_CLIENT: PooledRetryClient
+
 class SkillRatingProvider:
     name: str
     url_base: str
     balance_api: str
     timeout: int
-    def __init__(self, name: str, url_base: str, balance_api: str, timeout: int = ...) -> None: ...
+    client: PooledRetryClient
+    def __init__(
+        self,
+        name: str,
+        url_base: str,
+        balance_api: str,
+        timeout: int = ...,
+        client: PooledRetryClient | None = ...,
+    ) -> None: ...
     async def fetch_elos(self, steam_ids: list[SteamId], *, headers: dict[str, str] | None = ...) -> dict | None: ...
 
 TRUSKILLS: SkillRatingProvider
@@ -225,15 +299,21 @@ A_ELO: SkillRatingProvider
 B_ELO: SkillRatingProvider
 
 class RatingProvider:
-    jsons: list[dict]
-    def __init__(self, json: dict) -> None: ...
+    player_infos: dict[SteamId, dict]
+    disconnected_since: dict[SteamId, float]
+    def __init__(self, json: dict | None = ...) -> None: ...
     def __iter__(self) -> Iterator[SteamId]: ...
     def __contains__(self, item: object) -> bool: ...
-    def __getitem__(self, item: object) -> object | dict | PlayerRating: ...
+    def __getitem__(self, item: object) -> PlayerRating: ...
     def __sub__(self, other: object) -> dict[SteamId, dict[str, float]]: ...
     @staticmethod
-    def from_json(json_response: dict) -> RatingProvider: ...
-    def append_ratings(self, json_response: dict) -> None: ...
+    def _steam_id_for(item: object) -> SteamId | None: ...
+    @staticmethod
+    def from_json(json_response: dict | None) -> RatingProvider: ...
+    def append_ratings(self, json_response: dict | None) -> None: ...
+    def mark_connected(self, steam_id: SteamId) -> None: ...
+    def mark_disconnected(self, steam_id: SteamId, timestamp: float | None = ...) -> None: ...
+    def evict_disconnected(self, max_age: float, now: float | None = ...) -> int: ...
     def player_data_for(self, steam_id: SteamId) -> dict | None: ...
     def gametype_data_for(self, steam_id: SteamId, gametype: str) -> dict: ...
     def rating_for(self, steam_id: SteamId, gametype: str) -> int | float | None: ...
@@ -305,16 +385,46 @@ class Suggestion:
     @property
     def score_sum(self) -> int: ...
 
-class KickThread(threading.Thread):
+class ScheduledKick:
     steam_id: SteamId
     kickmsg: str
-    go: bool
+    stage: int
+    event: sched.Event | None
     def __init__(self, steam_id: SteamId, kickmsg: str) -> None: ...
-    def try_msg(self) -> None: ...
-    def try_mute(self) -> None: ...
-    def try_kick(self) -> None: ...
-    def run(self) -> None: ...
-    def stop(self) -> None: ...
+
+class KickScheduler:
+    scheduler: sched.scheduler
+    pending: dict[SteamId, ScheduledKick]
+    _lock: threading.Lock
+    STAGES: tuple[tuple[str, int], ...]
+    def __init__(self, scheduler: sched.scheduler | None = ...) -> None: ...
+    def __contains__(self, steam_id: SteamId) -> bool: ...
+    def __len__(self) -> int: ...
+    def scheduled_steam_ids(self) -> list[SteamId]: ...
+    def pending_actions(self) -> list[tuple[SteamId, str, float]]: ...
+    def schedule(self, steam_id: SteamId, kickmsg: str) -> bool: ...
+    def cancel(self, steam_id: SteamId) -> bool: ...
+    def cancel_all(self) -> list[SteamId]: ...
+    def _enter_stage(self, scheduled: ScheduledKick) -> None: ...
+    def _cancel_event(self, scheduled: ScheduledKick) -> None: ...
+    def _run_stage(self, scheduled: ScheduledKick) -> None: ...
+
+class PrecomputedBalance:
+    suggestions: list[Suggestion]
+    teams: tuple[list[SteamId], list[SteamId]] | None
+    def __init__(
+        self, suggestions: list[Suggestion], teams: tuple[list[SteamId], list[SteamId]] | None = ...
+    ) -> None: ...
+
+class FingerprintCache:
+    maxsize: int
+    _entries: dict[Hashable, PrecomputedBalance]
+    _lock: threading.Lock
+    def __init__(self, maxsize: int = ...) -> None: ...
+    def __contains__(self, fingerprint: Hashable) -> bool: ...
+    def get(self, fingerprint: Hashable) -> PrecomputedBalance | None: ...
+    def put(self, fingerprint: Hashable, value: PrecomputedBalance) -> None: ...
+    def clear(self) -> None: ...
 
 class PlayerMovedToSpecError(Exception):
     player: Player
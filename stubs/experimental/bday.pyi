@@ -1,16 +1,22 @@
+import threading
 from typing import TYPE_CHECKING
 
 from minqlx import Plugin
 
 if TYPE_CHECKING:
-    from datetime import datetime
-    from minqlx import AbstractChannel, Player, GameEndData
+    from typing import Iterable
+    from collections import OrderedDict
+    from datetime import datetime, date
+    from redis.client import Pipeline
+    from minqlx import AbstractChannel, Player, GameEndData, UserInfoEventInput
     from minqlx.database import Redis
 
 SteamId = int
 
 BDAY_KEY: str
+BDAY_INDEX_KEY: str
 LONG_MAP_NAMES_KEY: str
+NAME_CACHE_SIZE: int
 
 # noinspection PyPep8Naming
 class bday(Plugin):
@@ -20,6 +26,10 @@ class bday(Plugin):
     number_of_bday_maps: int
     bmap_factory: str
     pending_bday_confirmations: dict[SteamId, str]
+    todays_birthdays: set[SteamId] | None
+    todays_birthdays_date: date | None
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
     def __init__(self) -> None: ...
     def cmd_bday(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int: ...
     def parse_date(self, player: Player, msg: list[str]) -> int: ...
@@ -28,8 +38,13 @@ class bday(Plugin):
     def cmd_bmap(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int: ...
     def cmd_bdayedit(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int: ...
     def parse_admin_date(self, admin: Player, msg: list[str]) -> int: ...
+    def store_birthday(self, steam_id: SteamId, birthday: str) -> None: ...
+    def add_to_birthday_index(self, pipeline: Pipeline, scored_steam_ids: dict[str, int]) -> None: ...
+    def day_of_year(self, birthday: str | date | datetime) -> int: ...
     def identify_target(self, player: Player, target: str | int | Player) -> tuple[str | None, SteamId | None]: ...
     def resolve_player_name(self, item: str | int | Player) -> str: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: SteamId) -> None: ...
     def find_target_player_or_list_alternatives(self, player: Player, target: str | int) -> Player | None: ...
     def cmd_when(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int: ...
     def cmd_nextbday(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
@@ -40,8 +55,13 @@ class bday(Plugin):
     def handle_game_end(self, _data: GameEndData) -> None: ...
     def handle_map(self, mapname: str, _factory: str) -> None: ...
     def handle_team_switch(self, player: Player, _old: str, new: str) -> None: ...
+    def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def play_birthday_song(self) -> None: ...
     def has_birthday_today(self, player: Player) -> bool: ...
+    def birthdays_today(self) -> set[SteamId]: ...
+    def cmd_backfill_bdays(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
+    def backfill_birthday_index(self, channel: AbstractChannel) -> None: ...
     def has_birthday_set(self, player: Player) -> bool: ...
     def can_still_pick_bday_map(self, player: Player) -> bool: ...
     def resolve_short_mapname(self, mapstring: str, player: Player) -> str | None: ...
@@ -1,23 +1,30 @@
+import threading
 from typing import TYPE_CHECKING
 
 from minqlx import Plugin
 
 if TYPE_CHECKING:
+    from collections import OrderedDict
     from typing import Callable, Awaitable, Iterable, Iterator
+    from asyncio import AbstractEventLoop
+    from aiohttp import ClientTimeout
+    from aiohttp_retry import RetryClient, ExponentialRetry
     from requests import Session
 
-    from minqlx import AbstractChannel, Player, GameEndData
+    from minqlx import AbstractChannel, Player, GameEndData, UserInfoEventInput
     from minqlx.database import Redis
 
 SteamId = int
 PLAYER_BASE: str
 IPS_BASE: str
+NAME_CACHE_SIZE: int
 
 def requests_retry_session(
     retries: int = ...,
     backoff_factor: float = ...,
     status_forcelist: tuple[int, int, int] = ...,
     session: Session | None = ...,
+    pool_maxsize: int = ...,
 ) -> Session: ...
 def identify_reply_channel(channel: AbstractChannel) -> AbstractChannel: ...
 def remove_trailing_color_code(text: str) -> str: ...
@@ -28,6 +35,7 @@ class elocheck(Plugin):
     reply_channel: str
     show_steam_ids: bool
     use_truskill_bn: bool
+    alias_graph: AliasGraph
     balance_api: str
     previous_map: str | None
     previous_gametype: str | None
@@ -35,7 +43,13 @@ class elocheck(Plugin):
     ratings: dict[str, RatingProvider]
     rating_diffs: dict[str, dict[SteamId, dict]]
     informed_players: list[SteamId]
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
+    http_session: Session
     def __init__(self) -> None: ...
+    def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
+    def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def get_truskill_provider(self) -> SkillRatingProvider: ...
     def fetch_elos_from_all_players(self) -> None: ...
     async def fetch_ratings(self, steam_ids: list[SteamId], mapname: str | None = ...) -> None: ...
@@ -70,6 +84,8 @@ class elocheck(Plugin):
     ) -> str: ...
     def format_player_name(self, steam_id: SteamId) -> str: ...
     def resolve_player_name(self, steam_id: SteamId) -> str: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: SteamId) -> None: ...
     def cmd_aliases(self, player: Player, msg: list[str], channel: AbstractChannel) -> int | None: ...
     def do_aliases(self, player: Player, target: str, channel: AbstractChannel) -> None: ...
     def format_player_aliases(self, steam_id: SteamId, aliases: list[str]) -> str: ...
@@ -77,14 +93,61 @@ class elocheck(Plugin):
         self, player: Player, _msg: list[str], _channel: AbstractChannel
     ) -> int | None: ...
 
+class AliasGraph:
+    max_hops: int
+    max_nodes: int
+    ttl: int
+    _resolved: dict[SteamId, tuple[float, tuple[SteamId, ...]]]
+    _lock: threading.Lock
+    def __init__(self, *, max_hops: int = ..., max_nodes: int = ..., ttl: int = ...) -> None: ...
+    def used_steam_ids_for(self, db: Redis, steam_id: SteamId) -> list[SteamId]: ...
+    def used_steam_ids_for_all(self, db: Redis, steam_ids: Iterable[SteamId]) -> dict[SteamId, list[SteamId]]: ...
+    def traverse(self, db: Redis, steam_ids: Iterable[SteamId]) -> dict[SteamId, tuple[SteamId, ...]]: ...
+    @staticmethod
+    def _fetch_members(db: Redis, keys: list[str]) -> list[set[str]]: ...
+    def invalidate(self, steam_id: SteamId | None = ...) -> None: ...
+
 FILTERED_OUT_GAMETYPE_RESPONSES: Iterable[str]
 
+class PooledRetryClient:
+    limit_per_host: int
+    keepalive_timeout: float
+    retry_options: ExponentialRetry
+    timeout: ClientTimeout
+    _lock: threading.Lock
+    _loop: AbstractEventLoop | None
+    _thread: threading.Thread | None
+    _client: RetryClient | None
+    def __init__(
+        self,
+        *,
+        limit_per_host: int = ...,
+        keepalive_timeout: float = ...,
+        retry_options: ExponentialRetry | None = ...,
+        timeout: ClientTimeout | None = ...,
+    ) -> None: ...
+    def _running_loop(self) -> AbstractEventLoop: ...
+    async def _get_json(self, url: str, headers: dict[str, str] | None) -> dict | None: ...
+    async def get_json(self, url: str, *, headers: dict[str, str] | None = ...) -> dict | None: ...
+    async def _close_client(self) -> None: ...
+    def close(self) -> None: ...
+
+RATINGS_CLIENT: PooledRetryClient
+
 class SkillRatingProvider:
     name: str
     url_base: str
     balance_api: str
     timeout: int
-    def __init__(self, name: str, url_base: str, balance_api: str, timeout: int = ...) -> None: ...
+    client: PooledRetryClient
+    def __init__(
+        self,
+        name: str,
+        url_base: str,
+        balance_api: str,
+        timeout: int = ...,
+        client: PooledRetryClient | None = ...,
+    ) -> None: ...
     async def fetch_elos(self, steam_ids: list[SteamId], *, headers: dict[str, str] | None = ...) -> dict | None: ...
 
 TRUSKILLS: SkillRatingProvider
@@ -1,8 +1,11 @@
+import threading
 from typing import NamedTuple, Generic, TYPE_CHECKING
 from minqlx import Plugin
 
 if TYPE_CHECKING:
-    from typing import Callable, TypeVar, Iterator, Sequence, Literal
+    from typing import Callable, TypeVar, Iterable, Iterator, Sequence, Literal
+    from array import array
+    from collections import OrderedDict
     from datetime import datetime
     from minqlx import (
         AbstractChannel,
@@ -13,16 +16,11 @@ if TYPE_CHECKING:
         GameEndData,
         StatsData,
         PlayerStatsStats,
+        UserInfoEventInput,
     )
 
 SteamId = int
 
-class Position(NamedTuple):
-    x: int
-    y: int
-    z: int
-
-def calculate_distance(previous: Position, current: Position) -> float: ...
 def format_float(value: float) -> str: ...
 def format_int(value: int) -> str: ...
 def convert_units_to_meters(units: float) -> float: ...
@@ -176,18 +174,21 @@ class PlayerStatsEntry:
     def win(self) -> int: ...
     def combine(self, other: object) -> None: ...
 
-def filter_stats_for_max_value(
-    stats: list[PlayerStatsEntry], func: Callable[[PlayerStatsEntry], bool]
-) -> list[PlayerStatsEntry]: ...
-def most_weapon_hits_announcement(stats: list[PlayerStatsEntry]) -> str | None: ...
-def most_accurate_railbitches_announcement(
-    stats: list[PlayerStatsEntry],
-) -> str | None: ...
-def longest_shaftlamers_announcement(stats: list[PlayerStatsEntry]) -> str | None: ...
-def most_honorable_haste_pickup_announcement(
-    stats: list[PlayerStatsEntry],
-) -> str | None: ...
-def weird_facts(stats: list[PlayerStatsEntry]) -> str | None: ...
+class StatsLeaderboards:
+    names: dict[SteamId, str]
+    arrival: dict[SteamId, int]
+    totals: dict[SteamId, dict[tuple[str, ...], int | float]]
+    leaderboards: dict[tuple[str, ...], tuple[int | float, set[SteamId]]]
+    def __init__(self) -> None: ...
+    def add(self, player_stats: PlayerStatsEntry) -> None: ...
+    def _update_leaderboard(self, stat: tuple[str, ...], steam_id: SteamId, value: int | float) -> None: ...
+    def leaders(self, *stat: str) -> tuple[int | float, list[str]]: ...
+
+def most_weapon_hits_announcement(leaderboards: StatsLeaderboards) -> str | None: ...
+def most_accurate_railbitches_announcement(leaderboards: StatsLeaderboards) -> str | None: ...
+def longest_shaftlamers_announcement(leaderboards: StatsLeaderboards) -> str | None: ...
+def most_honorable_haste_pickup_announcement(leaderboards: StatsLeaderboards) -> str | None: ...
+def weird_facts(leaderboards: StatsLeaderboards) -> str | None: ...
 
 T = TypeVar("T")
 
@@ -202,19 +203,33 @@ class RandomIterator(Generic[T]):
 conjunction_iter: Iterator[str]
 
 def random_conjunction() -> str: ...
-def random_medal_facts(stats: list[PlayerStatsEntry], *, count: int = ...) -> list[str]: ...
-def formatted_medal_fact(stats: list[PlayerStatsEntry], medal_stat: str) -> str: ...
+def random_medal_facts(leaderboards: StatsLeaderboards, *, count: int = ...) -> list[str]: ...
+def formatted_medal_fact(leaderboards: StatsLeaderboards, medal_stat: str) -> str: ...
 
 WEAPON_FACTS_LOOKUP: dict[str, dict[str, list[str]]]
 
 def format_weapon_fact(weapon_stat: str, player_names: str, weapon_name: str, stats_amount: int) -> str: ...
-def random_weapon_stats(stats: list[PlayerStatsEntry], *, count: int = ...) -> list[str]: ...
-def formatted_weapon_fact(stats: list[PlayerStatsEntry], weapon: str, weapon_fact: str) -> str: ...
+def random_weapon_stats(leaderboards: StatsLeaderboards, *, count: int = ...) -> list[str]: ...
+def formatted_weapon_fact(leaderboards: StatsLeaderboards, weapon: str, weapon_fact: str) -> str: ...
+
+class MovementSampler:
+    sample_rate: int
+    teleport_distance: float
+    frame_count: int
+    positions: array[float]
+    steam_ids: list[SteamId | None]
+    def __init__(self, *, sample_rate: int = ..., teleport_distance: float = ..., max_clients: int = ...) -> None: ...
+    def reset(self) -> None: ...
+    def tick(self) -> list[tuple[SteamId, float]]: ...
+    def sample(self) -> list[tuple[SteamId, float]]: ...
 
 LAST_USED_NAME_KEY: str
 PLAYER_TOP_SPEEDS: str
 MAP_TOP_SPEEDS: str
 MAP_SPEED_LOG: str
+MAP_SPEED_STATS: str
+MAP_AVERAGE_SPEEDS: str
+NAME_CACHE_SIZE: int
 
 # noinspection PyPep8Naming
 class weird_stats(Plugin):
@@ -223,6 +238,7 @@ class weird_stats(Plugin):
     fastestmaps_display_ingame: int
     fastestmaps_display_warmup: int
     openai_announce_stats: bool
+    movement_sampler: MovementSampler
     game_start_time: datetime | None
     join_times: dict[SteamId, datetime]
     play_times: dict[SteamId, float]
@@ -233,16 +249,18 @@ class weird_stats(Plugin):
     round_start_datetime: datetime | None
     fastest_death: tuple[SteamId, float]
     alive_times: dict[SteamId, float]
-    previous_positions: dict[SteamId, Position]
     travelled_distances: dict[SteamId, float]
     player_stats: dict[SteamId, PlayerStatsEntry]
-    playerstats_announcements: list[Callable[[list[PlayerStatsEntry]], str | None]]
+    stats_leaderboards: StatsLeaderboards
+    playerstats_announcements: list[Callable[[StatsLeaderboards], str | None]]
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
 
     def __init__(self) -> None: ...
     def handle_team_switch(self, player: Player, old_team: str, new_team: str) -> None: ...
     def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def handle_frame(self) -> None: ...
-    def calculate_player_distance(self, player: Player) -> float: ...
     def handle_game_countdown(self) -> None: ...
     def reinitialize_game(self) -> None: ...
     def handle_game_start(self, _data: GameStartData) -> None: ...
@@ -268,6 +286,9 @@ class weird_stats(Plugin):
         means_of_death_filter: list[str],
     ) -> str: ...
     def record_speeds(self, mapname: str, speeds: dict[SteamId, float]) -> None: ...
+    def record_map_speed_statistics(
+        self, mapname: str, speeds: Iterable[float | str], *, replaced_speed_log: str | None = ...
+    ) -> None: ...
     def record_personal_speed(self, mapname: str, steam_id: SteamId, speed: float) -> None: ...
     def cmd_player_speeds(self, _player: Player, _msg: list[str], _channel: AbstractChannel) -> None: ...
     def cmd_player_top_speeds(self, player: Player, msg: list[str], channel: AbstractChannel) -> None: ...
@@ -276,11 +297,16 @@ class weird_stats(Plugin):
     def identify_target(self, player: Player, target: str | int | Player) -> tuple[str | None, SteamId | None]: ...
     def find_target_player_or_list_alternatives(self, player: Player, target: str | int) -> Player | None: ...
     def resolve_player_name(self, item: int | str) -> str: ...
+    def resolve_player_names(self, items: list[int | str]) -> list[str]: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: SteamId) -> None: ...
     def collect_and_report_player_top_speeds(self, channel: AbstractChannel, steam_id: int) -> None: ...
     def db_get_top_speed_for_player(self, steam_id: int) -> list[tuple[str, float]]: ...
     def cmd_map_top_speeds(self, _player: Player, msg: list[str], channel: AbstractChannel) -> None: ...
     def collect_and_report_map_top_speeds(self, channel: AbstractChannel, mapname: str) -> None: ...
     def cmd_fastest_maps(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
     def collect_and_report_fastest_maps(self, channel: AbstractChannel) -> None: ...
+    def cmd_migrate_speed_logs(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
+    def migrate_speed_logs(self, channel: AbstractChannel) -> None: ...
     def map_speed_log(self, mapname: str) -> list[tuple[int, float]]: ...
     def alive_time_of(self, steam_id: SteamId) -> float: ...
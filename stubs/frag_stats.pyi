@@ -1,3 +1,4 @@
+import threading
 from typing import TYPE_CHECKING
 
 from minqlx import Plugin
@@ -5,25 +6,44 @@ from minqlx import Plugin
 if TYPE_CHECKING:
     from typing import Sequence, Iterable
 
-    from collections import Counter
+    from collections import Counter, OrderedDict
 
-    from minqlx import Player, AbstractChannel, DeathData
+    from minqlx import Player, AbstractChannel, DeathData, GameEndData, UserInfoEventInput
 
 COLLECTED_SOULZ_KEY: str
 REAPERZ_KEY: str
+SOULZ_BALANCE_KEY: str
 _name_key: str
+NAME_CACHE_SIZE: int
 
 SPECIAL_KILLERS: Iterable[str]
 
 # noinspection PyPep8Naming
 class frag_stats(Plugin):
     toplimit: int
+    flush_interval: int
     frag_log: list[tuple[int | str, int | str]]
+    pending_frags: Counter[tuple[str, str]]
+    pending_lock: threading.Lock
+    flush_lock: threading.RLock
+    last_flush: float
+    name_cache: OrderedDict[int, str]
+    name_cache_lock: threading.Lock
     def __init__(self) -> None: ...
     def handle_player_disconnect(self, player: Player, _reason: str) -> None: ...
+    def handle_userinfo(self, player: Player, changed: UserInfoEventInput) -> None: ...
     def handle_game_countdown(self) -> None: ...
+    def handle_game_end(self, _data: GameEndData) -> None: ...
+    def handle_map_change(self, _mapname: str, _factory: str) -> None: ...
+    def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
+    def handle_frame(self) -> None: ...
     def handle_death(self, victim: Player, killer: Player | None, data: DeathData) -> None: ...
     def record_frag(self, recorded_killer: str | int, victim: str | int) -> None: ...
+    def persist_pending_frags(self) -> None: ...
+    def flush_pending_frags(self) -> None: ...
+    def pending_soulz_of(self, fragger_identifier: int | str | None) -> Counter[str]: ...
+    def pending_reaperz_of(self, fragged_identifier: int | str | None) -> Counter[str]: ...
+    def pending_soulz_balance_of(self, fragger_identifier: int | str | None) -> dict[str, int]: ...
     def determine_killer(self, killer: Player | None, means_of_death: str) -> int | str: ...
     def cmd_mapsoulz(self, player: Player, msg: list[str], channel: AbstractChannel) -> None: ...
     def identify_target(self, player: Player, target: Player | str | int) -> tuple[str | None, int | str | None]: ...
@@ -32,11 +52,22 @@ class frag_stats(Plugin):
     def mapfraggers_of(self, fragged_identifier: int | str | None) -> Counter: ...
     def resolve_player_names(self, entries: Sequence[int | str]) -> Sequence[str]: ...
     def resolve_player_name(self, item: int | str) -> str: ...
+    def lookup_player_names(self, identifiers: Iterable[int | str]) -> dict[int | str, str]: ...
+    def forget_player_name(self, steam_id: int) -> None: ...
     def find_target_player_or_list_alternatives(self, player: Player, target: str | int) -> Player | None: ...
-    def overall_frag_statistics_for(self, fragger_identifier: int | str) -> Counter: ...
-    def overall_fraggers_of(self, fragger_identifier: int | str) -> Counter: ...
+    def top_soulz_balances_for(
+        self, fragger_identifier: int | str, limit: int
+    ) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]: ...
+    def head_to_head_frag_counts(
+        self, fragger_identifier: int | str, opponents: list[str]
+    ) -> dict[str, tuple[int, int]]: ...
     def identify_reply_channel(self, channel: AbstractChannel) -> AbstractChannel: ...
     def cmd_soulzbalance(self, player: Player, msg: list[str], channel: AbstractChannel) -> None: ...
     def report_top_soulzbalance(self, player: Player, channel: AbstractChannel) -> None: ...
     def report_single_soulzbalance(self, player: Player, opponent: Player | str, channel: AbstractChannel) -> None: ...
+    def cmd_backfill_soulzbalance(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
+    def backfill_soulz_balances(self, channel: AbstractChannel) -> None: ...
+    def backfill_soulz_balance_for(self, steam_id: str) -> None: ...
+    def cmd_fragstats_size(self, _player: Player, _msg: list[str], channel: AbstractChannel) -> None: ...
+    def report_fragstats_size(self, channel: AbstractChannel) -> None: ...
     def color_coded_balance_diff(self, balance_diff: int) -> str: ...
@@ -22,6 +22,7 @@ def requests_retry_session(
     backoff_factor: float = ...,
     status_forcelist: tuple[int, int, int] = ...,
     session: Session | None = ...,
+    pool_maxsize: int = ...,
 ) -> Session: ...
 def identify_reply_channel(channel: AbstractChannel) -> AbstractChannel: ...
 def is_player_in_exception_list(player: Player) -> bool: ...
@@ -33,11 +34,13 @@ class merciful_elo_limit(Plugin):
     above_games: int
     banned_days: int
     connectthreads: dict[SteamId, ConnectThread]
+    http_session: Session
 
     tracked_player_sids: set[SteamId]
     announced_player_elos: set[SteamId]
 
     def __init__(self) -> None: ...
+    def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
     def handle_map_change(self, _mapname: str, _factory: str) -> None: ...
     def handle_player_connect(self, player: Player) -> int | str: ...
     def player_has_been_tracked(self, steam_id: SteamId) -> bool: ...
@@ -66,10 +69,11 @@ class merciful_elo_limit(Plugin):
 class ConnectThread(Thread):
     _balance_api: str
     _steam_id: SteamId
+    _session: Session | None
     _elo: dict[str, dict[str, int]] | None
     _is_parsed: Event
 
-    def __init__(self, steam_id: SteamId, balance_api: str) -> None: ...
+    def __init__(self, steam_id: SteamId, balance_api: str, *, session: Session | None = ...) -> None: ...
     def is_parsed(self) -> bool: ...
     def elo_for(self, gametype: str) -> int: ...
     def run(self) -> None: ...
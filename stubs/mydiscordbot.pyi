@@ -1,5 +1,10 @@
-from typing import TYPE_CHECKING
-from threading import Thread
+import re
+from typing import TYPE_CHECKING, Callable, Generic, Hashable, Iterable, Iterator, NamedTuple, TypeVar
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Queue
+from threading import Thread, Lock, RLock
+from collections import deque
 
 # noinspection PyPackageRequirements
 from discord.ext.commands import Bot, DefaultHelpCommand
@@ -7,6 +12,7 @@ from discord.ext.commands import Bot, DefaultHelpCommand
 from minqlx import Plugin, Player, AbstractChannel
 
 if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop, Task
     from logging import Logger
 
     # noinspection PyPackageRequirements
@@ -21,6 +27,7 @@ if TYPE_CHECKING:
         DMChannel,
         PartialMessageable,
         GroupChannel,
+        Guild,
         User,
     )
 
@@ -31,21 +38,37 @@ if TYPE_CHECKING:
 
 plugin_version: str
 
+DISCORD_MESSAGE_LIMIT: int
+COMMAND_TREE_HASH_FILE: str
+USER_MENTION_PATTERN: re.Pattern[str]
+CHANNEL_MENTION_PATTERN: re.Pattern[str]
+MENTION_PATTERN: re.Pattern[str]
+COLOR_TAG_PATTERN: re.Pattern[str]
+DEFAULT_REGEX_FLAGS: int
+COMMAND_TO_DICT_TAKES_TREE: bool
+
+def escaped_player_name(name: str) -> str: ...
+
 # noinspection PyPep8Naming
 class mydiscordbot(Plugin):
     discord_message_filters: set[str]
+    message_filters: tuple[re.Pattern[str], ...]
+    game_state: GameStatePublisher
+    quake_chat: QuakeChatRelay
     discord: SimpleAsyncDiscord
     def __init__(self, discord_client: SimpleAsyncDiscord | None = ...) -> None: ...
     def version_information(self) -> str: ...
     def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
     @staticmethod
-    def game_status_information(game: minqlxGame) -> str: ...
+    def game_status_information(game: GameSnapshot) -> str: ...
     @staticmethod
-    def get_game_info(game: minqlxGame) -> str: ...
+    def get_game_info(game: minqlxGame | GameSnapshot) -> str: ...
     @staticmethod
-    def player_data() -> str: ...
+    def player_data(game: GameSnapshot) -> str: ...
     @staticmethod
-    def team_data(player_list: list[Player], limit: int | None = ...) -> str: ...
+    def team_data(player_list: list[Player] | list[PlayerSnapshot], limit: int | None = ...) -> str: ...
+    @staticmethod
+    def compile_message_filters(message_filters: set[str]) -> tuple[re.Pattern[str], ...]: ...
     def is_filtered_message(self, msg: str) -> bool: ...
     def handle_ql_chat(self, player: Player, msg: str, channel: AbstractChannel) -> None: ...
     def handle_player_connect(self, player: Player) -> None: ...
@@ -53,6 +76,8 @@ class mydiscordbot(Plugin):
     def handle_map(self, mapname: str, _factory: str) -> None: ...
     def handle_vote_started(self, caller: Player | None, vote: str, args: str) -> None: ...
     def handle_vote_ended(self, votes: tuple[int, int], _vote: str, _args: str, passed: bool) -> None: ...
+    def handle_frame(self) -> None: ...
+    def handle_game_state_change(self, *_args: object, **_kwargs: object) -> None: ...
     def handle_game_countdown_or_end(self, *_args: GameEndData, **_kwargs: str) -> None: ...
     def cmd_discord(self, player: Player, msg: list[str], _channel: AbstractChannel) -> int: ...
     def cmd_discordbot(self, _player: Player, msg: list[str], channel: AbstractChannel) -> int: ...
@@ -64,10 +89,159 @@ class MinqlxHelpCommand(DefaultHelpCommand):
     def get_ending_note(self) -> str: ...
     async def send_error_message(self, error: str) -> None: ...
 
+class BatchedLogWriter(QueueListener):
+    records: Queue[logging.LogRecord | None]
+    file_handler: RotatingFileHandler
+    batch_size: int
+    stopping: bool
+    written_records: int
+    written_batches: int
+    dropped_records: int
+    reported_dropped_records: int
+    def __init__(
+        self, records: Queue[logging.LogRecord | None], file_handler: RotatingFileHandler, *, batch_size: int = ...
+    ) -> None: ...
+    def dequeue(self, block: bool) -> list[logging.LogRecord] | None: ...  # type: ignore[override]
+    def enqueue_sentinel(self) -> None: ...
+    def handle(self, batch: list[logging.LogRecord]) -> None: ...  # type: ignore[override]
+
+class QueuedLogHandler(QueueHandler):
+    records: Queue[logging.LogRecord | None]
+    file_handler: RotatingFileHandler
+    writer: BatchedLogWriter
+    writing: bool
+    def __init__(self, file_handler: RotatingFileHandler, *, max_buffer: int = ..., batch_size: int = ...) -> None: ...
+    def enqueue(self, record: logging.LogRecord) -> None: ...
+    @staticmethod
+    def gzip_namer(name: str) -> str: ...
+    @staticmethod
+    def gzip_rotator(source: str, dest: str) -> None: ...
+    def close(self) -> None: ...
+    def metrics(self) -> dict[str, int]: ...
+
+class OutboundMessageQueue:
+    logger: Logger
+    coalesce_window: float
+    rate_limit: int
+    rate_limit_period: float
+    max_backlog: int
+    lock: Lock
+    queued_messages: dict[int, tuple[deque[str], deque[str]]]
+    rate_limit_buckets: dict[int, tuple[float, float]]
+    delivery_tasks: dict[int, Task]
+    sent_messages: int
+    sent_batches: int
+    dropped_messages: int
+    throttled_batches: int
+    def __init__(
+        self,
+        logger: Logger,
+        *,
+        coalesce_window: float = ...,
+        rate_limit: int = ...,
+        rate_limit_period: float = ...,
+        max_backlog: int = ...,
+    ) -> None: ...
+    def enqueue(
+        self, loop: AbstractEventLoop, channel: TextChannel, content: str, *, interactive: bool = ...
+    ) -> None: ...
+    def schedule_delivery(self, loop: AbstractEventLoop, channel: TextChannel) -> None: ...
+    async def deliver(self, channel: TextChannel) -> None: ...
+    async def send_batch(self, channel: TextChannel, batch: list[str], *, retries: int = ...) -> bool: ...
+    def next_batch(self, channel_id: int) -> list[str]: ...
+    async def wait_for_rate_limit(self, channel_id: int) -> None: ...
+    async def drain(self) -> None: ...
+    def backlog(self) -> int: ...
+    def metrics(self) -> dict[str, int]: ...
+
+T = TypeVar("T")
+
+class MentionIndex(Generic[T]):
+    names_of: Callable[[T], tuple[str | None, ...]]
+    lock: RLock
+    items: dict[Hashable, T]
+    names: dict[Hashable, tuple[str | None, ...]]
+    positions: dict[Hashable, int]
+    next_position: Iterator[int]
+    name_lookups: dict[int, dict[str, set[Hashable]]]
+    trigrams: dict[str, set[Hashable]]
+    def __init__(self, names_of: Callable[[T], tuple[str | None, ...]]) -> None: ...
+    @classmethod
+    def from_list(cls, names_of: Callable[[T], tuple[str | None, ...]], items: Iterable[T]) -> MentionIndex[T]: ...
+    @staticmethod
+    def member_names(member: Member) -> tuple[str, str | None]: ...
+    @staticmethod
+    def channel_names(
+        channel: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel,
+    ) -> tuple[str]: ...
+    @staticmethod
+    def key_of(item: T) -> tuple[int | None, int]: ...
+    @staticmethod
+    def trigrams_of(*names: str | None) -> set[str]: ...
+    def __len__(self) -> int: ...
+    def add(self, item: T, key: Hashable | None = ...) -> None: ...
+    def remove(self, item: T, key: Hashable | None = ...) -> None: ...
+    def _unindex(self, key: Hashable) -> None: ...
+    def named(self, match: str, field: int = ...) -> list[T]: ...
+    def containing(self, match: str) -> list[T]: ...
+    def _ordered(self, keys: Iterable[Hashable]) -> list[T]: ...
+
+class PlayerSnapshot(NamedTuple):
+    id: int
+    steam_id: int
+    name: str
+    clean_name: str
+    team: str
+    score: int
+
+    @classmethod
+    def of(cls, player: Player) -> PlayerSnapshot: ...
+
+class GameSnapshot(NamedTuple):
+    map: str
+    map_title: str | None
+    type: str
+    type_short: str
+    state: str
+    roundlimit: int
+    red_score: int
+    blue_score: int
+    maxclients: int
+    players: tuple[PlayerSnapshot, ...]
+
+    @classmethod
+    def of(cls, game: minqlxGame, players: Iterable[Player]) -> GameSnapshot: ...
+    def teams(self) -> dict[str, list[PlayerSnapshot]]: ...
+
+class QuakeChatRelay:
+    lock: Lock
+    messages: list[str]
+    def __init__(self) -> None: ...
+    def add(self, msg: str) -> None: ...
+    def flush(self) -> None: ...
+
+class GameStatePublisher:
+    min_interval: float
+    max_age: float
+    snapshot: GameSnapshot | None
+    published_at: float | None
+    version: int
+    _dirty: bool
+
+    def __init__(self, *, min_interval: float = ..., max_age: float = ...) -> None: ...
+    def mark_dirty(self) -> None: ...
+    def refresh(self) -> None: ...
+    def publish(self) -> GameSnapshot | None: ...
+
 class SimpleAsyncDiscord(Thread):
     version_information: str
     logger: Logger
     discord: Bot | None
+    quake_chat: QuakeChatRelay
+    outbound_messages: OutboundMessageQueue
+    mention_index_lock: Lock
+    member_index: MentionIndex[Member] | None
+    channel_index: MentionIndex[VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel] | None
     discord_bot_token: str
     discord_application_id: str
     discord_relay_channel_ids: set[int]
@@ -81,12 +255,17 @@ class SimpleAsyncDiscord(Thread):
     discord_show_relay_channel_names: bool
     discord_replace_relayed_mentions: bool
     discord_replace_triggered_mentions: bool
-    def __init__(self, version_information: str, logger: Logger) -> None: ...
+    extended_log_handlers: list[logging.Handler]
+    def __init__(
+        self, version_information: str, logger: Logger, *, quake_chat: QuakeChatRelay | None = ...
+    ) -> None: ...
     @staticmethod
-    def setup_extended_logger() -> None: ...
+    def setup_extended_logger() -> list[logging.Handler]: ...
+    def remove_extended_logger(self) -> None: ...
     @staticmethod
     def int_set(string_set: set[str] | None) -> set[int]: ...
     def status(self) -> str: ...
+    def periodic_job_statuses(self) -> list[str]: ...
     def run(self) -> None: ...
     def initialize_bot(self, discord_bot: Bot) -> None: ...
     async def version(self, ctx: Context[Bot], *_args: list, **_kwargs: dict) -> None: ...
@@ -97,22 +276,69 @@ class SimpleAsyncDiscord(Thread):
         content: str,
     ) -> str: ...
     async def on_ready(self) -> None: ...
+    def command_tree_hash(self) -> str | None: ...
+    @staticmethod
+    def command_tree_hash_path() -> str: ...
+    def read_synced_command_tree(self) -> tuple[str, float] | tuple[None, None]: ...
+    def store_synced_command_tree(self, tree_hash: str, sync_duration: float) -> None: ...
+    async def sync_command_tree(self, *, force: bool = ...) -> bool: ...
+    def resync_command_tree(self) -> None: ...
     async def on_message(self, message: Message) -> None: ...
+    def mentionable_members(self) -> MentionIndex[Member]: ...
+    def mentionable_channels(
+        self,
+    ) -> MentionIndex[VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel]: ...
+    @staticmethod
+    def is_mentionable_channel(
+        channel: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel,
+    ) -> bool: ...
+    def invalidate_mention_indexes(self) -> None: ...
+    async def on_member_join(self, member: Member) -> None: ...
+    async def on_member_update(self, _before: Member, after: Member) -> None: ...
+    async def on_member_remove(self, member: Member) -> None: ...
+    async def on_user_update(self, _before: User, after: User) -> None: ...
+    async def on_guild_channel_create(
+        self, channel: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel
+    ) -> None: ...
+    async def on_guild_channel_update(
+        self,
+        _before: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel,
+        after: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel,
+    ) -> None: ...
+    async def on_guild_channel_delete(
+        self, channel: VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel
+    ) -> None: ...
+    async def on_guild_join(self, _guild: Guild) -> None: ...
+    async def on_guild_remove(self, _guild: Guild) -> None: ...
     async def on_command_error(self, exception: Exception, ctx: Context[Bot]) -> None: ...
     def is_discord_logged_in(self) -> bool: ...
     def stop(self) -> None: ...
-    def relay_message(self, msg: str) -> None: ...
-    def send_to_discord_channels(self, channel_ids: set[str] | set[int], content: str) -> None: ...
+    async def shutdown(self, *, drain_timeout: float = ...) -> None: ...
+    def relay_message(self, msg: str, *, interactive: bool = ...) -> None: ...
+    def send_to_discord_channels(
+        self, channel_ids: set[str] | set[int], content: str, *, interactive: bool = ...
+    ) -> None: ...
     def relay_chat_message(self, player: Player, channel: str, message: str) -> None: ...
     def relay_team_chat_message(self, player: Player, channel: str, message: str) -> None: ...
+    def translate_message(
+        self, player: Player, message: str, *, channel: str = ..., replace_mentions: bool = ...
+    ) -> str: ...
+    def replace_mentions(self, message: str, player: Player | None = ...) -> str: ...
     def replace_user_mentions(self, message: str, player: Player | None = ...) -> str: ...
+    def replace_matched_user_mentions(self, message: str, matches: list[str], player: Player | None = ...) -> str: ...
     @staticmethod
-    def find_user_that_matches(match: str, member_list: list[Member], player: Player | None = ...) -> Member | None: ...
+    def find_user_that_matches(
+        match: str, member_list: list[Member] | MentionIndex[Member], player: Player | None = ...
+    ) -> Member | None: ...
     def replace_channel_mentions(self, message: str, player: Player | None = ...) -> str: ...
+    def replace_matched_channel_mentions(
+        self, message: str, matches: list[str], player: Player | None = ...
+    ) -> str: ...
     @staticmethod
     def find_channel_that_matches(
         match: str,
-        channel_list: list[VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel],
+        channel_list: list[VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel]
+        | MentionIndex[VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel],
         player: Player | None = ...,
     ) -> VoiceChannel | StageChannel | ForumChannel | TextChannel | CategoryChannel | None: ...
     def triggered_message(self, player: Player, message: str) -> None: ...
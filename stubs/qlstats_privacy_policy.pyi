@@ -4,13 +4,21 @@ from threading import Thread
 from minqlx import Plugin
 
 if TYPE_CHECKING:
-    from requests import Response
+    from requests import Response, Session
     from minqlx import Player, AbstractChannel, CancellableEventReturn
 
 SteamId = int
 
 COLORED_QLSTATS_INSTRUCTIONS: str
 
+def requests_retry_session(
+    retries: int = ...,
+    backoff_factor: float = ...,
+    status_forcelist: tuple[int, int, int] = ...,
+    session: Session | None = ...,
+    pool_maxsize: int = ...,
+) -> Session: ...
+
 # noinspection PyPep8Naming
 class qlstats_privacy_policy(Plugin):
     plugin_enabled: bool
@@ -20,8 +28,10 @@ class qlstats_privacy_policy(Plugin):
     exceptions: set[SteamId]
     join_attempts: dict[SteamId, int]
     connectthreads: dict[SteamId, ConnectThread]
+    http_session: Session
 
     def __init__(self) -> None: ...
+    def handle_plugin_unload(self, plugin: Plugin | str) -> None: ...
     def check_balance_plugin_loaded(self) -> bool: ...
     def check_for_right_version_of_balance_plugin(self) -> bool: ...
     def check_for_correct_balance_plugin(self) -> bool: ...
@@ -39,7 +49,8 @@ class qlstats_privacy_policy(Plugin):
 
 class ConnectThread(Thread):
     _steam_id: SteamId
+    _session: Session | None
     _result: Response | None
 
-    def __init__(self, steam_id: SteamId) -> None: ...
+    def __init__(self, steam_id: SteamId, *, session: Session | None = ...) -> None: ...
     def run(self) -> None: ...
@@ -5,6 +5,10 @@ import pytest
 import pytest_asyncio
 from mockito import mock, unstub
 
+from minqlx import Plugin
+
+from mydiscordbot import GameStatePublisher, QuakeChatRelay
+
 if sys.version_info < (3, 8):
     __test__ = False
 else:
@@ -102,3 +106,27 @@ def _private_channel():
 
     yield channel
     unstub(channel)
+
+
+@pytest.fixture(name="game_state")
+def _game_state():
+    game_state = GameStatePublisher()
+    # noinspection PyProtectedMember
+    Plugin._loaded_plugins["mydiscordbot"] = mock({"game_state": game_state})
+
+    yield game_state
+
+    # noinspection PyProtectedMember
+    Plugin._loaded_plugins.pop("mydiscordbot", None)
+
+
+@pytest.fixture(name="quake_chat")
+def _quake_chat():
+    quake_chat = QuakeChatRelay()
+    # noinspection PyProtectedMember
+    Plugin._loaded_plugins["mydiscordbot"] = mock({"quake_chat": quake_chat})
+
+    yield quake_chat
+
+    # noinspection PyProtectedMember
+    Plugin._loaded_plugins.pop("mydiscordbot", None)
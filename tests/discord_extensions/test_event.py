@@ -1,4 +1,4 @@
-import threading
+import asyncio
 from datetime import datetime, timezone, timedelta
 from unittest.mock import AsyncMock
 
@@ -12,13 +12,15 @@ from discord import (
     EntityType,
     ScheduledEvent,
     EventStatus,
+    HTTPException,
 )
 from hamcrest import assert_that, equal_to, has_entries
 
 # noinspection PyProtectedMember
-from mockito import mock, any_, when2, spy2, verify, unstub
+from mockito import mock, when2, patch, unstub, verify, when
 
 from minqlx_plugin_test import setup_cvars, connected_players, fake_player
+import minqlx
 from minqlx import Plugin
 from discord_extensions import event
 
@@ -158,18 +160,18 @@ class TestEvent:
         event.end_event = AsyncMock()
         connected_players()
 
-        event.check_playing_activity(bot)
+        await event.check_playing_activity(bot)
 
-        event.end_event.assert_called_once_with(bot)
+        event.end_event.assert_awaited_once_with(bot)
 
     @pytest.mark.asyncio
     async def test_check_playing_activity_creates_and_starts_event_when_player_connected(self, bot):
         event.create_and_start_event = AsyncMock()
         connected_players(fake_player(1, "Dummy Player"))
 
-        event.check_playing_activity(bot)
+        await event.check_playing_activity(bot)
 
-        event.create_and_start_event.assert_called_once_with(bot)
+        event.create_and_start_event.assert_awaited_once_with(bot)
 
     @pytest.mark.asyncio
     async def test_bot_setup_called_with_wrong_intentions(self, bot):
@@ -184,15 +186,79 @@ class TestEvent:
 
     @pytest.mark.asyncio
     async def test_bot_setup_called_with_right_intentions(self, bot):
-        threading_mock = mock(spec=threading.Thread)
-        threading_mock.start = mock()
-        spy2(threading.Thread)
-        when2(threading.Thread, target=any_).thenReturn(threading_mock)
-
         bot.intents = mock(spec=Intents)
         bot.intents.guild_scheduled_events = True
 
         await event.setup(bot)
 
-        verify(threading).Thread(target=event.run_schedule)
-        verify(threading_mock.start).__call__()
+        bot.add_cog.assert_awaited_once()
+        assert_that(isinstance(bot.add_cog.call_args.args[0], event.EventScheduler), equal_to(True))
+
+    @pytest.mark.asyncio
+    async def test_playing_activity_check_is_started_on_cog_load(self, bot):
+        setup_cvars({"qlx_discord_ext_event_check_interval": "120"})
+        patch(event.check_playing_activity, AsyncMock())
+        extension = event.EventScheduler(bot)
+
+        await extension.cog_load()
+
+        assert_that(extension.playing_activity_check.is_running(), equal_to(True))
+        assert_that(extension.playing_activity_check.seconds, equal_to(120))
+
+        await extension.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_playing_activity_check_keeps_running_when_check_fails(self, bot):
+        setup_cvars({"qlx_discord_ext_event_check_interval": "60"})
+        response = mock({"status": 400, "reason": "Bad Request"})
+        patch(event.check_playing_activity, AsyncMock(side_effect=HTTPException(response, "event failed")))
+        when2(minqlx.log_exception).thenReturn(None)
+        extension = event.EventScheduler(bot)
+
+        await extension.cog_load()
+        while extension.job_metrics.runs == 0:
+            await asyncio.sleep(0.01)
+
+        assert_that(extension.playing_activity_check.is_running(), equal_to(True))
+        verify(minqlx).log_exception()
+
+        await extension.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_playing_activity_check_records_job_metrics(self, bot):
+        setup_cvars({"qlx_discord_ext_event_check_interval": "60"})
+        check_playing_activity = AsyncMock()
+        patch(event.check_playing_activity, check_playing_activity)
+        extension = event.EventScheduler(bot)
+
+        await extension.playing_activity_check.coro(extension)
+
+        check_playing_activity.assert_awaited_once_with(bot)
+        assert_that(extension.job_metrics.metrics(), has_entries({"runs": 1, "overruns": 0}))
+
+    @pytest.mark.asyncio
+    async def test_playing_activity_check_counts_overruns(self, bot, monkeypatch):
+        setup_cvars({"qlx_discord_ext_event_check_interval": "60"})
+        patch(event.check_playing_activity, AsyncMock())
+        extension = event.EventScheduler(bot)
+        fake_time = mock()
+        when(fake_time).monotonic().thenReturn(100.0, 185.0)
+        monkeypatch.setattr("discord_extensions.time", fake_time)
+
+        await extension.playing_activity_check.coro(extension)
+
+        assert_that(
+            extension.job_metrics.metrics(),
+            has_entries({"runs": 1, "overruns": 1, "last_duration": 85.0, "average_duration": 85.0}),
+        )
+
+    @pytest.mark.asyncio
+    async def test_playing_activity_check_records_job_metrics_when_check_fails(self, bot):
+        setup_cvars({"qlx_discord_ext_event_check_interval": "60"})
+        patch(event.check_playing_activity, AsyncMock(side_effect=ValueError("event failed")))
+        when2(minqlx.log_exception).thenReturn(None)
+        extension = event.EventScheduler(bot)
+
+        await extension.playing_activity_check.coro(extension)
+
+        assert_that(extension.job_metrics.metrics(), has_entries({"runs": 1, "overruns": 0}))
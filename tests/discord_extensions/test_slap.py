@@ -2,6 +2,7 @@ import random
 from unittest.mock import AsyncMock
 
 import pytest
+from hamcrest import assert_that, equal_to
 
 # noinspection PyPackageRequirements
 from discord import Member, InteractionMessage
@@ -10,7 +11,7 @@ from discord import Member, InteractionMessage
 from mockito import mock, unstub, spy2, when, any_, verify
 
 from minqlx_plugin_test import setup_cvars
-from minqlx import Plugin
+import minqlx
 
 from discord_extensions import slap
 
@@ -83,7 +84,8 @@ class TestSlap:
         )
 
     @pytest.mark.asyncio
-    async def test_slap_is_forwarded_to_relay_channel(self, bot, interaction, member):
+    async def test_slap_is_forwarded_to_relay_channel(self, bot, interaction, member, mock_channel):
+        minqlx.CHAT_CHANNEL = mock_channel
         other_user = mock(spec=Member)
         other_user.id = 21
         other_user.mention = "@SlappedDiscordMember"
@@ -107,10 +109,13 @@ class TestSlap:
 
         await slap._slap(interaction, other_user)
 
-        verify(Plugin).msg("[DISCORD]^2 @DiscordMember slaps @SlappedDiscordMember with a large trout.")
+        verify(minqlx.CHAT_CHANNEL).reply("[DISCORD]^2 @DiscordMember slaps @SlappedDiscordMember with a large trout.")
 
     @pytest.mark.asyncio
-    async def test_slap_is_forwarded_to_relay_channel_with_channel_name(self, bot, interaction, member, guild_channel):
+    async def test_slap_is_forwarded_to_relay_channel_with_channel_name(
+        self, bot, interaction, member, guild_channel, mock_channel
+    ):
+        minqlx.CHAT_CHANNEL = mock_channel
         setup_cvars({"qlx_displayChannelForDiscordRelayChannels": "1"})
         other_user = mock(spec=Member)
         other_user.id = 21
@@ -136,10 +141,42 @@ class TestSlap:
 
         await slap._slap(interaction, other_user)
 
-        verify(Plugin).msg(
+        verify(minqlx.CHAT_CHANNEL).reply(
             "[DISCORD] ^5#DiscordGuildChannel^7:^2 @DiscordMember slaps @SlappedDiscordMember with a large trout."
         )
 
+    @pytest.mark.asyncio
+    async def test_slap_is_queued_with_mydiscordbot(self, bot, interaction, member, mock_channel, quake_chat):
+        minqlx.CHAT_CHANNEL = mock_channel
+        other_user = mock(spec=Member)
+        other_user.id = 21
+        other_user.mention = "@SlappedDiscordMember"
+        other_user.display_name = "SlappedDiscordMember"
+
+        interaction.channel_id = 1234
+        mocked_original_message = AsyncMock()
+        mocked_response = mock(spec=InteractionMessage)
+        mocked_response.clean_content = f"{member.mention} slaps {other_user.mention} with a large trout."
+        mocked_original_message.return_value = mocked_response
+        mocked_response.mentions = [member, other_user]
+        interaction.original_response = mocked_original_message
+        interaction.user = member
+        interaction.client = mock(spec=Member)
+        interaction.client.user = bot.client.user
+
+        spy2(random.choice)
+        when(random).choice(any_).thenReturn(
+            f"_{interaction.user.mention} slaps {other_user.mention} with a large trout._"
+        )
+
+        await slap._slap(interaction, other_user)
+
+        verify(minqlx.CHAT_CHANNEL, times=0).reply(any_)
+        assert_that(
+            quake_chat.messages,
+            equal_to(["[DISCORD]^2 @DiscordMember slaps @SlappedDiscordMember with a large trout."]),
+        )
+
     @pytest.mark.asyncio
     async def test_bot_setup_called(self, bot):
         await slap.setup(bot)
@@ -1,3 +1,5 @@
+import time
+
 from unittest.mock import AsyncMock
 
 import pytest
@@ -48,6 +50,7 @@ class TestStatus:
                 "qlx_discordTriggeredChatMessagePrefix": "",
                 "qlx_discordRelayChannelIds": "1234",
                 "qlx_discordTriggeredChannelIds": "5678",
+                "qlx_discord_ext_status_max_staleness": "60",
             }
         )
 
@@ -117,7 +120,9 @@ class TestStatus:
         assert_that(game_info, equal_to("Warmup"))
 
     @pytest.mark.usefixtures("no_minqlx_game")
-    def test_game_status_information_when_no_game_is_running(self):
+    def test_game_status_information_when_no_game_is_running(self, game_state):
+        game_state.publish()
+
         game_status = status.game_status_with_teams()
 
         assert_that(
@@ -125,7 +130,14 @@ class TestStatus:
             equal_to("Currently no game running."),
         )
 
-    def test_game_status_information(self, game_in_progress):
+    def test_game_status_information_without_mydiscordbot_loaded(self, game_in_progress):
+        connected_players(fake_player(1, "RedPlayer1", team="red"))
+
+        game_status = status.game_status_with_teams()
+
+        assert_that(game_status, equal_to("Currently no game running."))
+
+    def test_game_status_information(self, game_state, game_in_progress):
         connected_players(
             fake_player(1, "RedPlayer1", team="red"),
             fake_player(2, "RedPlayer2", team="red"),
@@ -139,6 +151,8 @@ class TestStatus:
         game_in_progress.red_score = 5
         game_in_progress.blue_score = 3
 
+        game_state.publish()
+
         game_status = status.game_status_with_teams()
 
         assert_that(
@@ -150,7 +164,7 @@ class TestStatus:
             ),
         )
 
-    def test_game_status_information_with_spectators(self, game_in_progress):
+    def test_game_status_information_with_spectators(self, game_state, game_in_progress):
         setup_cvars({"qlx_discord_ext_status_show_spectators": "1"})
         connected_players(
             fake_player(1, "RedPlayer1", team="red"),
@@ -165,6 +179,8 @@ class TestStatus:
         game_in_progress.red_score = 5
         game_in_progress.blue_score = 3
 
+        game_state.publish()
+
         game_status = status.game_status_with_teams()
 
         assert_that(
@@ -177,7 +193,7 @@ class TestStatus:
             ),
         )
 
-    def test_game_status_information_with_no_players(self, game_in_progress):
+    def test_game_status_information_with_no_players(self, game_state, game_in_progress):
         connected_players()
         game_in_progress.maxclients = 16
         game_in_progress.map_title = "Campgrounds"
@@ -185,6 +201,8 @@ class TestStatus:
         game_in_progress.red_score = 5
         game_in_progress.blue_score = 3
 
+        game_state.publish()
+
         game_status = status.game_status_with_teams()
 
         assert_that(
@@ -192,6 +210,84 @@ class TestStatus:
             matches_regexp(r"Match in progress: .*5.* - .*3.* on .*Campgrounds.* \(CA\) with .*0/16.* players\. "),
         )
 
+    def test_game_status_information_reads_latest_published_snapshot(self, game_state, game_in_progress):
+        connected_players(fake_player(1, "RedPlayer1", team="red"))
+        game_in_progress.maxclients = 16
+        game_in_progress.map_title = "Campgrounds"
+        game_in_progress.red_score = 5
+        game_in_progress.blue_score = 3
+        game_state.publish()
+
+        game_in_progress.red_score = 6
+        connected_players()
+
+        game_status = status.game_status_with_teams()
+
+        assert_that(
+            game_status,
+            matches_regexp(
+                r"Match in progress: .*5.* - .*3.* on .*Campgrounds.* \(CA\) with .*1/16.* players\. \n"
+                r"\*\*R:\*\* \*\*RedPlayer1\*\*\(0\) "
+            ),
+        )
+
+    @pytest.fixture(name="published_game")
+    def _published_game(self, game_in_progress):
+        connected_players(fake_player(1, "RedPlayer1", team="red"))
+        game_in_progress.maxclients = 16
+        game_in_progress.map_title = "Campgrounds"
+        game_in_progress.type = "Clan Arena"
+        yield game_in_progress
+
+    def test_game_status_is_reused_while_game_state_unchanged(self, game_state, bot, published_game):
+        published_game.red_score = 5
+        game_state.publish()
+        extension = Status(bot)
+        cached_status = extension.game_status()
+
+        when(status).game_status_with_teams().thenReturn("rebuilt status")
+
+        assert_that(extension.game_status(), equal_to(cached_status))
+
+    def test_game_status_is_rebuilt_when_game_state_changed(self, game_state, bot, published_game):
+        published_game.red_score = 5
+        game_state.publish()
+        extension = Status(bot)
+        extension.game_status()
+
+        published_game.red_score = 6
+        game_state.publish()
+
+        assert_that(extension.game_status(), matches_regexp(r"Match in progress: \*\*6\*\* - "))
+
+    def test_game_status_is_rebuilt_when_cached_status_is_too_old(self, game_state, bot, published_game):
+        game_state.publish()
+        extension = Status(bot)
+        extension.game_status()
+        extension.cached_status_at = time.monotonic() - 61
+
+        when(status).game_status_with_teams().thenReturn("rebuilt status")
+
+        assert_that(extension.game_status(), equal_to("rebuilt status"))
+
+    def test_game_status_is_not_cached_without_mydiscordbot_loaded(self, bot, published_game):
+        extension = Status(bot)
+        extension.game_status()
+
+        when(status).game_status_with_teams().thenReturn("rebuilt status")
+
+        assert_that(extension.game_status(), equal_to("rebuilt status"))
+
+    def test_game_status_is_not_cached_with_zero_max_staleness(self, game_state, bot, published_game):
+        setup_cvars({"qlx_discord_ext_status_max_staleness": "0"})
+        game_state.publish()
+        extension = Status(bot)
+        extension.game_status()
+
+        when(status).game_status_with_teams().thenReturn("rebuilt status")
+
+        assert_that(extension.game_status(), equal_to("rebuilt status"))
+
     @pytest.mark.parametrize("channel_id,expected", [(1234, True), (5678, True), (42, False)])
     def test_is_message_in_configured_triggered_or_relay_channel(
         self, channel_id, expected, context, bot, guild_channel
@@ -1,10 +1,11 @@
-import threading
+import asyncio
+from unittest.mock import AsyncMock
 
 import pytest
 import redis
 
 # noinspection PyPackageRequirements
-from discord import Intents, app_commands, Member, Activity, ActivityType
+from discord import Intents, app_commands, Member, Activity, ActivityType, Forbidden
 from hamcrest import (
     assert_that,
     equal_to,
@@ -16,7 +17,7 @@ from hamcrest import (
 )
 
 # noinspection PyProtectedMember
-from mockito import unstub, mock, patch, when, any_, verify
+from mockito import unstub, mock, when, any_, verify
 
 from minqlx_plugin_test import setup_cvars, connected_players, fake_player
 import minqlx
@@ -51,6 +52,11 @@ def setup_db_players(mocked_db, known_users):
         when(mocked_db).get(f"minqlx:players:{steam_id}:last_used_name").thenReturn(name)
 
 
+def setup_known_players(extension, known_players):
+    for steam_id, name in known_players.items():
+        extension.remember_player(steam_id, name)
+
+
 class TestSubscribe:
     @pytest.fixture(name="no_presences_bot")
     def no_presences_bot(self, bot):
@@ -68,10 +74,14 @@ class TestSubscribe:
     def mocked_db(self):
         redis_mock = mock(spec=redis.StrictRedis)
         when(redis_mock).exists(any_).thenReturn(False)
+        when(redis_mock).get(any_).thenReturn(None)
         when(redis_mock).keys(any_).thenReturn([])
         when(redis_mock).sadd(any_, any_).thenReturn(True)
         when(redis_mock).srem(any_, any_).thenReturn(True)
         when(redis_mock).smembers(any_).thenReturn([])
+        when(redis_mock).scan_iter(match=any_).thenReturn([])
+        when(redis_mock).mget(any_).thenAnswer(lambda keys: [redis_mock.get(key) for key in keys])
+        when(redis_mock).set(any_, any_).thenReturn(True)
         # noinspection PyPropertyAccess
         minqlx.database.Redis.r = redis_mock
 
@@ -145,6 +155,8 @@ class TestSubscribe:
                 campgrounds="campgrounds",
             ),
         )
+        assert_that(list(extension.map_index.search("rust")), equal_to(["ra3azra1"]))
+        assert_that(list(extension.map_index.search("A")), equal_to(["campgrounds", "ra3azra1", "theatreofpain"]))
 
     def test_installed_maps_gathered_from_maps_plugin(self, no_presences_bot, mocked_db):
         maps_plugin = mock(spec=Plugin)
@@ -172,7 +184,7 @@ class TestSubscribe:
         )
 
     def test_installed_maps_gathered_known_player_names_from_db(self, no_presences_bot, mocked_db):
-        when(mocked_db).keys("minqlx:players:*:last_used_name").thenReturn(
+        when(mocked_db).scan_iter(match="minqlx:players:*:last_used_name").thenReturn(
             [
                 "minqlx:players:123:last_used_name",
                 "minqlx:players:456:last_used_name",
@@ -186,6 +198,41 @@ class TestSubscribe:
 
         # noinspection PyTypeChecker
         assert_that(extension.known_players, has_entries({123: "plainname", 456: "coloredname"}))
+        assert_that(list(extension.player_index.search("colored")), equal_to([456]))
+
+    def test_subscriber_indexes_built_from_existing_subscriptions(self, no_presences_bot, mocked_db):
+        pipeline = mock(spec=redis.client.Pipeline, strict=False)
+        when(mocked_db).pipeline().thenReturn(pipeline)
+        when(mocked_db).scan_iter(match="minqlx:discord:*:subscribed_maps").thenReturn(
+            ["minqlx:discord:42:subscribed_maps", "minqlx:discord:misconfigured:subscribed_maps"]
+        )
+        when(mocked_db).scan_iter(match="minqlx:discord:*:subscribed_players").thenReturn(
+            ["minqlx:discord:42:subscribed_players"]
+        )
+        when(mocked_db).scan_iter(match="minqlx:discord:*:subscribed_members").thenReturn(
+            ["minqlx:discord:21:subscribed_members"]
+        )
+        when(mocked_db).smembers("minqlx:discord:42:subscribed_maps").thenReturn(["campgrounds", "overkill"])
+        when(mocked_db).smembers("minqlx:discord:42:subscribed_players").thenReturn(["123"])
+        when(mocked_db).smembers("minqlx:discord:21:subscribed_members").thenReturn(["42"])
+
+        SubscriberCog(no_presences_bot, mocked_db)
+
+        verify(pipeline).sadd("minqlx:maps:campgrounds:discord_subscribers", "42")
+        verify(pipeline).sadd("minqlx:maps:overkill:discord_subscribers", "42")
+        verify(pipeline).sadd("minqlx:players:123:discord_subscribers", "42")
+        verify(pipeline).sadd("minqlx:discord:42:subscribers", "21")
+        verify(pipeline, times=3).execute()
+        verify(mocked_db, times=0).smembers("minqlx:discord:misconfigured:subscribed_maps")
+        verify(mocked_db).set("minqlx:discord:subscribers_indexed", 1)
+
+    def test_subscriber_indexes_are_only_built_once(self, no_presences_bot, mocked_db):
+        when(mocked_db).exists("minqlx:discord:subscribers_indexed").thenReturn(True)
+
+        SubscriberCog(no_presences_bot, mocked_db)
+
+        verify(mocked_db, times=0).scan_iter(match="minqlx:discord:*:subscribed_maps")
+        verify(mocked_db, times=0).set("minqlx:discord:subscribers_indexed", any_)
 
     @pytest.mark.asyncio
     async def test_subscribe_map_with_no_provided_map(self, no_presences_bot, mocked_db, interaction):
@@ -224,6 +271,7 @@ class TestSubscribe:
             times=2,
         )
         verify(mocked_db).sadd("minqlx:discord:42:subscribed_maps", "thunderstruck")
+        verify(mocked_db).sadd("minqlx:maps:thunderstruck:discord_subscribers", 42)
 
     @pytest.mark.asyncio
     async def test_subscribe_map_with_long_mapname(self, no_presences_bot, mocked_db, interaction, user):
@@ -275,6 +323,7 @@ class TestSubscribe:
         extension = SubscriberCog(no_presences_bot, mocked_db)
         extension.installed_maps = ["campgrounds"]
         extension.formatted_installed_maps["campgrounds"] = "campgrounds"
+        extension.index_installed_maps()
 
         result = await extension.subscribe_map_autocomplete(interaction, "camp")
 
@@ -312,7 +361,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._subscribe_player(interaction, "matchedplayer")
 
@@ -335,7 +384,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._subscribe_player(interaction, "matchedplayer")
 
@@ -358,7 +407,7 @@ class TestSubscribe:
         when(mocked_db).smembers(any_).thenReturn([123, 456])
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._subscribe_player(interaction, "matchedplayer")
 
@@ -379,7 +428,7 @@ class TestSubscribe:
         interaction.user = user
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players[123] = "matchedplayer"
+        extension.remember_player(123, "matchedplayer")
 
         await extension._subscribe_player(interaction, "123")
 
@@ -390,6 +439,7 @@ class TestSubscribe:
             times=2,
         )
         verify(mocked_db).sadd("minqlx:discord:42:subscribed_players", 123)
+        verify(mocked_db).sadd("minqlx:players:123:discord_subscribers", 42)
 
     @pytest.mark.asyncio
     async def test_subscribe_player_autocomplete_with_no_subscribed_players(
@@ -414,7 +464,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         subscribed_players = await extension.subscribe_player_autocomplete(interaction, "matchedplayer")
 
@@ -424,6 +474,22 @@ class TestSubscribe:
         assert_that(subscribed_players[1].value, equal_to("456"))
         assert_that(subscribed_players[1].name, equal_to("matchedplayer2"))
 
+    @pytest.mark.asyncio
+    async def test_subscribe_player_autocomplete_serves_names_from_known_players(
+        self, no_presences_bot, mocked_db, interaction, user
+    ):
+        interaction.user = user
+
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+        setup_known_players(extension, {123: "matched`player1", 456: "matchedplayer2"})
+
+        subscribed_players = await extension.subscribe_player_autocomplete(interaction, "matched")
+
+        assert_that(subscribed_players[0].name, equal_to(r"matched\`player1"))
+        assert_that(subscribed_players[1].name, equal_to("matchedplayer2"))
+        verify(mocked_db, times=0).get(any_)
+        verify(mocked_db, times=0).mget(any_)
+
     @pytest.mark.asyncio
     async def test_subscribe_member_subscribes_to_discord_user_playing(
         self, presences_aware_bot, mocked_db, interaction, user
@@ -440,6 +506,7 @@ class TestSubscribe:
         await extension._subscribe_member(interaction, member)
 
         verify(mocked_db).sadd("minqlx:discord:42:subscribed_members", 21)
+        verify(mocked_db).sadd("minqlx:discord:21:subscribers", 42)
         assert_interaction_deferred_thinking(interaction)
         assert_interaction_response_description_matches(
             interaction,
@@ -534,6 +601,7 @@ class TestSubscribe:
             times=2,
         )
         verify(mocked_db).srem("minqlx:discord:42:subscribed_maps", "thunderstruck")
+        verify(mocked_db).srem("minqlx:maps:thunderstruck:discord_subscribers", 42)
 
     @pytest.mark.asyncio
     async def test_unsubscribe_map_with_long_mapname(self, no_presences_bot, mocked_db, interaction, user):
@@ -632,7 +700,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._unsubscribe_player(interaction, "matchedplayer")
 
@@ -655,7 +723,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._unsubscribe_player(interaction, "matchedplayer")
 
@@ -683,7 +751,7 @@ class TestSubscribe:
         when(mocked_db).smembers(any_).thenReturn([456])
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         await extension._unsubscribe_player(interaction, "matchedplayer")
 
@@ -704,7 +772,7 @@ class TestSubscribe:
         interaction.user = user
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players[123] = "matchedplayer"
+        extension.remember_player(123, "matchedplayer")
 
         await extension._unsubscribe_player(interaction, "123")
 
@@ -714,7 +782,8 @@ class TestSubscribe:
             contains_string("You have been unsubscribed from player `123`"),
             times=2,
         )
-        verify(mocked_db).srem("minqlx:discord:42:subscribed_players", "123")
+        verify(mocked_db).srem("minqlx:discord:42:subscribed_players", 123)
+        verify(mocked_db).srem("minqlx:players:123:discord_subscribers", 42)
 
     @pytest.mark.asyncio
     async def test_unsubscribe_player_autocomplete_with_no_subscribed_players(
@@ -739,7 +808,7 @@ class TestSubscribe:
         setup_db_players(mocked_db, known_players)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
-        extension.known_players = known_players
+        setup_known_players(extension, known_players)
 
         unsubscribed_players = await extension.unsubscribe_player_autocomplete(interaction, "matchedplayer")
 
@@ -749,6 +818,24 @@ class TestSubscribe:
         assert_that(unsubscribed_players[1].value, equal_to("456"))
         assert_that(unsubscribed_players[1].name, equal_to("matchedplayer2"))
 
+    @pytest.mark.asyncio
+    async def test_unsubscribe_player_autocomplete_looks_up_names_in_one_round_trip(
+        self, no_presences_bot, mocked_db, interaction, user
+    ):
+        interaction.user = user
+
+        when(mocked_db).smembers(any_).thenReturn([123, 456])
+        setup_db_players(mocked_db, {123: "matchedplayer1", 456: "otherplayer"})
+
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+
+        unsubscribed_players = await extension.unsubscribe_player_autocomplete(interaction, "matched")
+
+        assert_that(len(unsubscribed_players), equal_to(1))
+        assert_that(unsubscribed_players[0].value, equal_to("123"))
+        verify(mocked_db, times=1).mget(["minqlx:players:123:last_used_name", "minqlx:players:456:last_used_name"])
+        verify(mocked_db, times=0).exists("minqlx:players:123:last_used_name")
+
     @pytest.mark.asyncio
     async def test_unsubscribe_member_subscribes_to_discord_user_playing(
         self, presences_aware_bot, mocked_db, interaction, user
@@ -765,6 +852,7 @@ class TestSubscribe:
         await extension._unsubscribe_member(interaction, member)
 
         verify(mocked_db).srem("minqlx:discord:42:subscribed_members", 21)
+        verify(mocked_db).srem("minqlx:discord:21:subscribers", 42)
         assert_interaction_deferred_thinking(interaction)
         assert_interaction_response_description_matches(
             interaction,
@@ -831,16 +919,7 @@ class TestSubscribe:
         other_member.id = 21
         when(no_presences_bot).get_user(other_member.id).thenReturn(other_member)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_maps").thenReturn(
-            [
-                "minqlx:discord:21:subscribed_maps",
-                "minqlx:discord:42:subscribed_maps",
-                "minqlx:discord:666:subscribed_maps",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:666:subscribed_maps", "overkill").thenReturn(True)
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_maps", "overkill").thenReturn(True)
-        when(mocked_db).sismember("minqlx:discord:21:subscribed_maps", "overkill").thenReturn(False)
+        when(mocked_db).smembers("minqlx:maps:overkill:discord_subscribers").thenReturn(["666", "42"])
         extension = SubscriberCog(no_presences_bot, mocked_db)
 
         await extension.notify_map_change("overkill")
@@ -855,16 +934,7 @@ class TestSubscribe:
         connected_player.steam_id = 123
         connected_player.clean_name = "ConnectedPlayer"
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_players").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_players",
-                "minqlx:discord:21:subscribed_players",
-                "minqlx:discord:666:subscribed_players",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:666:subscribed_players", 123).thenReturn(True)
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_players", 123).thenReturn(True)
-        when(mocked_db).sismember("minqlx:discord:21:subscribed_players", 123).thenReturn(False)
+        when(mocked_db).smembers("minqlx:players:123:discord_subscribers").thenReturn(["666", "42"])
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
 
@@ -879,11 +949,7 @@ class TestSubscribe:
     async def test_check_subscriptions_no_game_running(self, no_presences_bot, mocked_db, user):
         when(no_presences_bot).get_user(user.id).thenReturn(user)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_maps").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_maps",
-            ]
-        )
+        when(mocked_db).smembers("minqlx:maps:campgrounds:discord_subscribers").thenReturn(["42"])
         connected_players()
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
@@ -896,12 +962,7 @@ class TestSubscribe:
     async def test_check_subscriptions_map_already_notified(self, no_presences_bot, mocked_db, game_in_warmup, user):
         when(no_presences_bot).get_user(user.id).thenReturn(user)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_maps").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_maps",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_maps", game_in_warmup.map).thenReturn(True)
+        when(mocked_db).smembers(f"minqlx:maps:{game_in_warmup.map}:discord_subscribers").thenReturn(["42"])
         connected_players()
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
@@ -917,12 +978,7 @@ class TestSubscribe:
     ):
         when(no_presences_bot).get_user(user.id).thenReturn(user)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_maps").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_maps",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_maps", game_in_warmup.map).thenReturn(True)
+        when(mocked_db).smembers(f"minqlx:maps:{game_in_warmup.map}:discord_subscribers").thenReturn(["42"])
         connected_players()
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
@@ -938,12 +994,7 @@ class TestSubscribe:
 
         when(no_presences_bot).get_user(user.id).thenReturn(user)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_players").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_players",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_players", new_player.steam_id).thenReturn(True)
+        when(mocked_db).smembers(f"minqlx:players:{new_player.steam_id}:discord_subscribers").thenReturn(["42"])
         connected_players(new_player)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
@@ -961,12 +1012,7 @@ class TestSubscribe:
 
         when(no_presences_bot).get_user(user.id).thenReturn(user)
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_players").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_players",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_players", new_player.steam_id).thenReturn(True)
+        when(mocked_db).smembers(f"minqlx:players:{new_player.steam_id}:discord_subscribers").thenReturn(["42"])
         connected_players(new_player)
 
         extension = SubscriberCog(no_presences_bot, mocked_db)
@@ -976,6 +1022,20 @@ class TestSubscribe:
 
         assert_that(user.send.await_count, equal_to(0))
 
+    @pytest.mark.asyncio
+    async def test_check_subscriptions_keeps_player_index_fresh(self, no_presences_bot, mocked_db):
+        renamed_player = fake_player(123, "renamedplayer")
+        connected_players(renamed_player)
+
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+        extension.remember_player(123, "oldname")
+
+        await extension.check_subscriptions()
+
+        assert_that(extension.known_players[123], equal_to("renamedplayer"))
+        assert_that(extension.find_matching_players("renamed"), equal_to([123]))
+        assert_that(extension.find_matching_players("oldname"), equal_to([]))
+
     def test_find_relevant_activitiy_with_no_activity(self, presences_aware_bot, mocked_db):
         member = mock(spec=Member)
         member.activities = []
@@ -1018,8 +1078,7 @@ class TestSubscribe:
         before_member.id = 21
         before_member.activities = [Activity(type=ActivityType.playing, name="Quake Live")]
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_members").thenReturn(["minqlx:discord:42:subscribed_members"])
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_members", 21).thenReturn(True)
+        when(mocked_db).smembers("minqlx:discord:21:subscribers").thenReturn(["42"])
 
         extension = SubscriberCog(presences_aware_bot, mocked_db)
 
@@ -1033,8 +1092,7 @@ class TestSubscribe:
         after_member.id = 21
         after_member.activities = []
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_members").thenReturn(["minqlx:discord:42:subscribed_members"])
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_members", 21).thenReturn(True)
+        when(mocked_db).smembers("minqlx:discord:21:subscribers").thenReturn(["42"])
 
         extension = SubscriberCog(presences_aware_bot, mocked_db)
 
@@ -1053,14 +1111,7 @@ class TestSubscribe:
         after_member.display_name = "PlayingMember"
         after_member.activities = [Activity(type=ActivityType.playing, name="Quake Live")]
 
-        when(mocked_db).keys("minqlx:discord:*:subscribed_members").thenReturn(
-            [
-                "minqlx:discord:42:subscribed_members",
-                "minqlx:discord:666:subscribed_members",
-            ]
-        )
-        when(mocked_db).sismember("minqlx:discord:42:subscribed_members", "21").thenReturn(True)
-        when(mocked_db).sismember("minqlx:discord:666:subscribed_members", "21").thenReturn(True)
+        when(mocked_db).smembers("minqlx:discord:21:subscribers").thenReturn(["42", "666"])
 
         when(presences_aware_bot).get_user(user.id).thenReturn(user)
 
@@ -1073,11 +1124,48 @@ class TestSubscribe:
         )
 
     @pytest.mark.asyncio
-    async def test_bot_setup_called(self, no_presences_bot):
-        thread_nock = mock(spec=threading.Thread)
-        when(thread_nock).start().thenReturn()
-        patch(threading.Thread, lambda target: thread_nock)
+    async def test_subscription_check_is_started_on_cog_load(self, no_presences_bot, mocked_db):
+        setup_cvars({"qlx_discord_ext_subscribe_check_interval": "90"})
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+        extension.check_subscriptions = AsyncMock()
+
+        await extension.cog_load()
+
+        assert_that(extension.subscription_check.is_running(), equal_to(True))
+        assert_that(extension.subscription_check.seconds, equal_to(90))
+
+        await extension.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_subscription_check_keeps_running_when_notification_fails(self, no_presences_bot, mocked_db):
+        setup_cvars({"qlx_discord_ext_subscribe_check_interval": "60"})
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+        response = mock({"status": 403, "reason": "Forbidden"})
+        extension.check_subscriptions = AsyncMock(side_effect=Forbidden(response, "Cannot send messages to this user"))
+        when(minqlx).log_exception().thenReturn(None)
 
+        await extension.cog_load()
+        while extension.job_metrics.runs == 0:
+            await asyncio.sleep(0.01)
+
+        assert_that(extension.subscription_check.is_running(), equal_to(True))
+        verify(minqlx).log_exception()
+
+        await extension.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_subscription_check_records_job_metrics(self, no_presences_bot, mocked_db):
+        setup_cvars({"qlx_discord_ext_subscribe_check_interval": "60"})
+        extension = SubscriberCog(no_presences_bot, mocked_db)
+        extension.check_subscriptions = AsyncMock()
+
+        await extension.subscription_check.coro(extension)
+
+        extension.check_subscriptions.assert_awaited_once()
+        assert_that(extension.job_metrics.metrics(), has_entries({"runs": 1, "overruns": 0}))
+
+    @pytest.mark.asyncio
+    async def test_bot_setup_called(self, no_presences_bot):
         await subscribe.setup(no_presences_bot)
 
         no_presences_bot.add_cog.assert_awaited_once()
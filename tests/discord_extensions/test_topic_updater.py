@@ -1,4 +1,3 @@
-import threading
 from unittest.mock import AsyncMock
 
 import pytest
@@ -8,7 +7,7 @@ from discord.abc import GuildChannel
 from hamcrest import assert_that, equal_to, matches_regexp
 
 # noinspection PyProtectedMember
-from mockito import when, mock, unstub, verify, when2, spy2, any_
+from mockito import when, mock, unstub
 
 from minqlx_plugin_test import setup_cvars, connected_players, fake_player
 
@@ -119,7 +118,7 @@ class TestTopicUpdater:
 
         assert_that(game_info, equal_to("Warmup"))
 
-    def test_game_status_information(self, game_in_progress):
+    def test_game_status_information(self, game_state, game_in_progress):
         connected_players(
             fake_player(1, "RedPlayer1", team="red"),
             fake_player(2, "RedPlayer2", team="red"),
@@ -133,7 +132,7 @@ class TestTopicUpdater:
         game_in_progress.red_score = 5
         game_in_progress.blue_score = 3
 
-        game_status = topic_updater.game_status_information(game_in_progress)
+        game_status = topic_updater.game_status_information(game_state.publish())
 
         assert_that(
             game_status,
@@ -141,37 +140,57 @@ class TestTopicUpdater:
         )
 
     @pytest.mark.asyncio
-    async def test_timer_is_started_on_cog_load(self, bot, game_in_warmup):
-        timer_mock = mock(spec=threading.Timer)
-        timer_mock.start = mock()
-        spy2(threading.Timer)
-        when2(threading.Timer, any_, any_).thenReturn(timer_mock)
+    async def test_topic_updater_is_started_on_cog_load(self, bot):
+        setup_cvars({"qlx_discordUpdateTopicInterval": "120"})
+        extension = TopicUpdater(bot)
+        when(extension).game_topic().thenReturn(None)
 
-        game_in_warmup.maxclients = 16
-        game_in_warmup.map_title = None
-        connected_players()
+        await extension.cog_load()
+
+        assert_that(extension.topic_updater.is_running(), equal_to(True))
+        assert_that(extension.topic_updater.seconds, equal_to(120))
 
+        await extension.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_topic_updater_updates_topics_with_game_topic(self, bot, relay_channel):
+        when(bot).is_ready().thenReturn(True)
+        when(bot).is_closed().thenReturn(False)
         extension = TopicUpdater(bot)
+        when(extension).game_topic().thenReturn("new topic")
 
-        await extension.cog_load()
+        await extension.topic_updater.coro(extension)
 
-        verify(threading).Timer(305, extension._topic_updater)
-        verify(timer_mock.start).__call__()
+        relay_channel.edit.assert_called_once_with(topic="new topic")
 
     @pytest.mark.asyncio
     @pytest.mark.usefixtures("no_minqlx_game")
-    async def test_timer_is_started_on_cog_load_no_game_running(self, bot):
-        timer_mock = mock(spec=threading.Timer)
-        timer_mock.start = mock()
-        spy2(threading.Timer)
-        when2(threading.Timer, any_, any_).thenReturn(timer_mock)
+    async def test_topic_updater_with_no_game_running(self, game_state, bot, relay_channel):
+        when(bot).is_ready().thenReturn(True)
+        when(bot).is_closed().thenReturn(False)
+        extension = TopicUpdater(bot)
+        game_state.publish()
+
+        await extension.topic_updater.coro(extension)
 
+        assert_that(extension.game_topic(), equal_to(None))
+        relay_channel.edit.assert_not_called()
+
+    def test_game_topic_before_first_snapshot(self, bot, game_in_warmup):
         extension = TopicUpdater(bot)
 
-        await extension.cog_load()
+        assert_that(extension.game_topic(), equal_to(None))
+
+    def test_game_topic_is_derived_from_latest_snapshot(self, game_state, bot, game_in_warmup):
+        game_in_warmup.maxclients = 16
+        game_in_warmup.map_title = None
+        connected_players()
+        game_state.publish()
+        extension = TopicUpdater(bot)
 
-        verify(threading).Timer(305, extension._topic_updater)
-        verify(timer_mock.start).__call__()
+        assert_that(
+            extension.game_topic(), matches_regexp(r"Warmup on .*campgrounds.* \(CA\) with .*0/16.* players\. ")
+        )
 
     def test_when_bot_is_none_discord_is_not_logged_in(self, bot):
         extension = TopicUpdater(bot)
@@ -231,6 +250,32 @@ class TestTopicUpdater:
         relay_channel.edit.assert_called_once_with(topic="new topic")
         triggered_channel.edit.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_update_topics_skips_channels_with_unchanged_topic(self, bot, triggered_channel):
+        when(bot).is_ready().thenReturn(True)
+        when(bot).is_closed().thenReturn(False)
+        triggered_channel.topic = "new topic | kept suffix"
+
+        extension = TopicUpdater(bot)
+
+        extension.update_topics_on_relay_and_triggered_channels("new topic")
+
+        triggered_channel.edit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_update_topics_respects_discord_topic_edit_limit(self, bot, relay_channel):
+        when(bot).is_ready().thenReturn(True)
+        when(bot).is_closed().thenReturn(False)
+
+        extension = TopicUpdater(bot)
+
+        extension.update_topics_on_relay_and_triggered_channels("first topic")
+        extension.update_topics_on_relay_and_triggered_channels("second topic")
+        extension.update_topics_on_relay_and_triggered_channels("third topic")
+
+        assert_that(relay_channel.edit.call_count, equal_to(2))
+        relay_channel.edit.assert_called_with(topic="second topic")
+
     @pytest.mark.asyncio
     async def test_bot_setup_called(self, bot):
         await topic_updater.setup(bot)
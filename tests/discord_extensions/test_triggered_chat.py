@@ -1,6 +1,6 @@
 import pytest
 from hamcrest import assert_that, equal_to
-from mockito import verify, mock
+from mockito import verify, mock, any_
 
 # noinspection PyPackageRequirements
 from discord import Message
@@ -63,6 +63,25 @@ class TestTriggeredChat:
             "[DISCORD] ^5#DiscordGuildChannel ^6DiscordMember^7:^2 message from discord to quake"
         )
 
+    @pytest.mark.asyncio
+    async def test_text_triggered_chat_is_queued_with_mydiscordbot(
+        self, bot, chat_context, member, guild_channel, mock_channel, quake_chat
+    ):
+        minqlx.CHAT_CHANNEL = mock_channel
+        chat_context.channel = guild_channel
+        chat_context.author = member
+        chat_context.message.clean_content = "!quakelive message from discord to quake"
+
+        extension = TriggeredChat(bot)
+
+        await extension.triggered_chat(chat_context)
+
+        verify(minqlx.CHAT_CHANNEL, times=0).reply(any_)
+        assert_that(
+            quake_chat.messages,
+            equal_to(["[DISCORD] ^5#DiscordGuildChannel ^6DiscordMember^7:^2 message from discord to quake"]),
+        )
+
     @pytest.mark.asyncio
     async def test_forwarded_message_uses_nick(self, bot, chat_context, member, guild_channel, mock_channel):
         minqlx.CHAT_CHANNEL = mock_channel
@@ -26,9 +26,19 @@ class TestFragStats:
 
         when(db).zincrby(any_, any_, any_).thenReturn(None)
         when(db).set(any_, any_).thenReturn(None)
+        when(db).mget(any_).thenAnswer(lambda keys: [db.get(key) for key in keys])
         yield db
         unstub()
 
+    @pytest.fixture(name="fragstats_pipeline")
+    def fragstats_pipeline(self, fragstats_db):
+        pipeline = mock(spec=redis.client.Pipeline, strict=False)
+        when(fragstats_db).pipeline(transaction=False).thenReturn(pipeline)
+        when(pipeline).zincrby(any_, any_, any_).thenReturn(pipeline)
+        when(pipeline).execute().thenReturn([])
+        yield pipeline
+        unstub()
+
     def setup_method(self):
         setup_cvars({"qlx_fragstats_toplimit": "10"})
 
@@ -38,6 +48,43 @@ class TestFragStats:
     def teardown_method(self):
         unstub()
 
+    # noinspection PyMethodMayBeStatic
+    def setup_soulz_records(self, db, steam_id, *, soulz, reaperz):
+        soulz_scores = {str(opponent): score for opponent, score in soulz}
+        reaperz_scores = {str(opponent): score for opponent, score in reaperz}
+        balances = {
+            opponent: soulz_scores.get(opponent, 0) - reaperz_scores.get(opponent, 0)
+            for opponent in {**soulz_scores, **reaperz_scores}
+            if opponent.isdigit()
+        }
+        ranked_balances = sorted(balances.items(), key=lambda item: (item[1], item[0]))
+        queued_results: list = []
+
+        def execute():
+            results = list(queued_results)
+            queued_results.clear()
+            return results
+
+        pipeline = mock(spec=redis.client.Pipeline, strict=False)
+        when(db).pipeline(transaction=False).thenReturn(pipeline)
+        when(pipeline).zrange(f"minqlx:players:{steam_id}:soulzbalance", any_, any_, withscores=True).thenAnswer(
+            lambda _key, start, end, withscores: queued_results.append(ranked_balances[start : end + 1])
+        )
+        when(pipeline).zrevrange(f"minqlx:players:{steam_id}:soulzbalance", any_, any_, withscores=True).thenAnswer(
+            lambda _key, start, end, withscores: queued_results.append(ranked_balances[::-1][start : end + 1])
+        )
+        when(pipeline).zscore(f"minqlx:players:{steam_id}:soulzbalance", any_).thenAnswer(
+            lambda _key, opponent: queued_results.append(balances.get(opponent))
+        )
+        when(pipeline).zscore(f"minqlx:players:{steam_id}:soulz", any_).thenAnswer(
+            lambda _key, opponent: queued_results.append(soulz_scores.get(opponent))
+        )
+        when(pipeline).zscore(f"minqlx:players:{steam_id}:reaperz", any_).thenAnswer(
+            lambda _key, opponent: queued_results.append(reaperz_scores.get(opponent))
+        )
+        when(pipeline).execute().thenAnswer(execute)
+        return pipeline
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_handle_player_disconnect_records_player_name(self, fragstats_db):
         player = fake_player(123, "Disconnecting Player")
@@ -46,6 +93,67 @@ class TestFragStats:
 
         verify(fragstats_db).set(f"minqlx:players:{player.steam_id}:last_used_name", player.name)
 
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_player_disconnect_forgets_cached_player_name(self, fragstats_db):
+        player = fake_player(123, "Disconnecting Player")
+        self.plugin.name_cache[player.steam_id] = "Old Name"
+
+        self.plugin.handle_player_disconnect(player, "quit")
+
+        assert_that(self.plugin.name_cache, equal_to({}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_userinfo_with_name_change_forgets_cached_player_name(self):
+        player = fake_player(123, "Renamed Player")
+        self.plugin.name_cache[player.steam_id] = "Old Name"
+
+        self.plugin.handle_userinfo(player, {"name": "Renamed Player"})
+
+        assert_that(self.plugin.name_cache, equal_to({}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_userinfo_without_name_change_keeps_cached_player_name(self):
+        player = fake_player(123, "Some Player")
+        self.plugin.name_cache[player.steam_id] = "Some Player"
+
+        self.plugin.handle_userinfo(player, {"handicap": "50"})
+
+        assert_that(self.plugin.name_cache, equal_to({player.steam_id: "Some Player"}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_lookup_player_names_serves_repeated_lookups_from_name_cache(self, fragstats_db):
+        connected_players()
+        when(fragstats_db).get("minqlx:players:4:last_used_name").thenReturn("Disconnected Player")
+
+        self.plugin.lookup_player_names([4])
+        resolved_names = self.plugin.lookup_player_names([4, "telefrag"])
+
+        assert_that(resolved_names, equal_to({4: "Disconnected Player", "telefrag": "telefrag"}))
+        verify(fragstats_db, times=1).mget(["minqlx:players:4:last_used_name"])
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_lookup_player_names_prefers_connected_players(self, fragstats_db):
+        player = fake_player(123, "Connected Player")
+        connected_players(player)
+        self.plugin.name_cache[player.steam_id] = "Old Name"
+
+        resolved_names = self.plugin.lookup_player_names([str(player.steam_id)])
+
+        assert_that(resolved_names, equal_to({str(player.steam_id): "Connected Player"}))
+        verify(fragstats_db, times=0).mget(any_)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_lookup_player_names_evicts_least_recently_used_names(self, fragstats_db, monkeypatch):
+        connected_players()
+        monkeypatch.setattr("frag_stats.NAME_CACHE_SIZE", 2)
+        when(fragstats_db).get(any_).thenAnswer(lambda key: f"Player {key.split(':')[2]}")
+
+        self.plugin.lookup_player_names([1, 2])
+        self.plugin.lookup_player_names([1])
+        self.plugin.lookup_player_names([3])
+
+        assert_that(list(self.plugin.name_cache), equal_to([1, 3]))
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_handle_game_countdown_clears_frag_log(self):
         self.plugin.frag_log = [(123, 456)]
@@ -67,7 +175,7 @@ class TestFragStats:
         assert_that(self.plugin.frag_log, contains_inanyorder((killer.steam_id, victim.steam_id)))  # type: ignore
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_records_soulz_in_db(self, fragstats_db):
+    def test_handle_death_records_soulz_in_db(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -75,15 +183,16 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, killer, {"MOD": "ROCKET"})
+        self.plugin.flush_pending_frags()
 
-        verify(fragstats_db).zincrby(
+        verify(fragstats_pipeline).zincrby(
             f"minqlx:players:{killer.steam_id}:soulz",
             value=str(victim.steam_id),
             amount=1,
         )
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_records_reaper_in_db(self, fragstats_db):
+    def test_handle_death_records_reaper_in_db(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -91,8 +200,9 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, killer, {"MOD": "ROCKET"})
+        self.plugin.flush_pending_frags()
 
-        verify(fragstats_db).zincrby(
+        verify(fragstats_pipeline).zincrby(
             f"minqlx:players:{victim.steam_id}:reaperz",
             amount=1,
             value=str(killer.steam_id),
@@ -122,7 +232,7 @@ class TestFragStats:
         assert_that(self.plugin.frag_log, not_(contains_inanyorder((killer.steam_id, victim.steam_id))))  # type: ignore
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_lava_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_lava_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -130,13 +240,14 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "LAVA"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("lava", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:lava:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="lava")
+        verify(fragstats_pipeline).zincrby("minqlx:players:lava:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="lava")
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_hurt_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_hurt_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -144,13 +255,14 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "HURT"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("void", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:void:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="void")
+        verify(fragstats_pipeline).zincrby("minqlx:players:void:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="void")
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_slime_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_slime_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -158,13 +270,14 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "SLIME"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("acid", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:acid:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="acid")
+        verify(fragstats_pipeline).zincrby("minqlx:players:acid:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="acid")
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_water_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_water_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -172,13 +285,14 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "WATER"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("drowning", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:drowning:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="drowning")
+        verify(fragstats_pipeline).zincrby("minqlx:players:drowning:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="drowning")
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_crush_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_crush_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -186,13 +300,14 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "CRUSH"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("squished", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:squished:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="squished")
+        verify(fragstats_pipeline).zincrby("minqlx:players:squished:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="squished")
 
     @pytest.mark.usefixtures("game_in_progress")
-    def test_handle_death_by_unknown_records_frag_log_entry(self, fragstats_db):
+    def test_handle_death_by_unknown_records_frag_log_entry(self, fragstats_pipeline):
         victim = fake_player(123, "Fragged Player", team="red")
         killer = fake_player(456, "Fragging Player", team="blue")
 
@@ -200,10 +315,153 @@ class TestFragStats:
 
         # noinspection PyTypeChecker
         self.plugin.handle_death(victim, None, {"MOD": "UNKNOWN"})
+        self.plugin.flush_pending_frags()
 
         assert_that(self.plugin.frag_log, contains_inanyorder(("unknown", victim.steam_id)))  # type: ignore
-        verify(fragstats_db).zincrby("minqlx:players:unknown:soulz", amount=1, value=str(victim.steam_id))
-        verify(fragstats_db).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="unknown")
+        verify(fragstats_pipeline).zincrby("minqlx:players:unknown:soulz", amount=1, value=str(victim.steam_id))
+        verify(fragstats_pipeline).zincrby(f"minqlx:players:{victim.steam_id}:reaperz", amount=1, value="unknown")
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_death_keeps_frags_pending_until_flushed(self, fragstats_db):
+        victim = fake_player(123, "Fragged Player", team="red")
+        killer = fake_player(456, "Fragging Player", team="blue")
+
+        connected_players(victim, killer)
+
+        # noinspection PyTypeChecker
+        self.plugin.handle_death(victim, killer, {"MOD": "ROCKET"})
+        # noinspection PyTypeChecker
+        self.plugin.handle_death(victim, killer, {"MOD": "RAILGUN"})
+
+        assert_that(self.plugin.pending_frags, equal_to({(str(killer.steam_id), str(victim.steam_id)): 2}))
+        verify(fragstats_db, times=0).zincrby(any_, any_, any_)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_flush_pending_frags_batches_repeated_frags(self, fragstats_db, fragstats_pipeline):
+        victim = fake_player(123, "Fragged Player", team="red")
+        killer = fake_player(456, "Fragging Player", team="blue")
+
+        connected_players(victim, killer)
+
+        # noinspection PyTypeChecker
+        self.plugin.handle_death(victim, killer, {"MOD": "ROCKET"})
+        # noinspection PyTypeChecker
+        self.plugin.handle_death(victim, killer, {"MOD": "RAILGUN"})
+        self.plugin.flush_pending_frags()
+
+        verify(fragstats_db).pipeline(transaction=False)
+        verify(fragstats_pipeline).zincrby(
+            f"minqlx:players:{killer.steam_id}:soulz", value=str(victim.steam_id), amount=2
+        )
+        verify(fragstats_pipeline).zincrby(
+            f"minqlx:players:{victim.steam_id}:reaperz", value=str(killer.steam_id), amount=2
+        )
+        verify(fragstats_pipeline).execute()
+        assert_that(self.plugin.pending_frags, equal_to({}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_flush_pending_frags_without_pending_frags_does_not_touch_db(self, fragstats_db):
+        self.plugin.flush_pending_frags()
+
+        verify(fragstats_db, times=0).pipeline(transaction=False)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_flush_pending_frags_keeps_frags_when_db_fails(self, fragstats_pipeline):
+        self.plugin.pending_frags[("456", "123")] = 3
+        when(fragstats_pipeline).execute().thenRaise(redis.ConnectionError("connection lost"))
+
+        with pytest.raises(redis.ConnectionError):
+            self.plugin.flush_pending_frags()
+
+        assert_that(self.plugin.pending_frags, equal_to({("456", "123"): 3}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_flushes_pending_frags_after_flush_interval(self, fragstats_pipeline):
+        victim = fake_player(123, "Fragged Player", team="red")
+        killer = fake_player(456, "Fragging Player", team="blue")
+
+        connected_players(victim, killer)
+
+        # noinspection PyTypeChecker
+        self.plugin.handle_death(victim, killer, {"MOD": "ROCKET"})
+        self.plugin.last_flush -= self.plugin.flush_interval
+        self.plugin.handle_frame()
+
+        verify(fragstats_pipeline).zincrby(
+            f"minqlx:players:{killer.steam_id}:soulz", value=str(victim.steam_id), amount=1
+        )
+        assert_that(self.plugin.pending_frags, equal_to({}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_keeps_frags_pending_within_flush_interval(self, fragstats_db):
+        self.plugin.pending_frags[("456", "123")] = 2
+
+        self.plugin.handle_frame()
+
+        verify(fragstats_db, times=0).pipeline(transaction=False)
+        assert_that(self.plugin.pending_frags, equal_to({("456", "123"): 2}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_without_pending_frags_does_not_touch_db(self, fragstats_db):
+        self.plugin.last_flush -= self.plugin.flush_interval
+
+        self.plugin.handle_frame()
+
+        verify(fragstats_db, times=0).pipeline(transaction=False)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_game_end_flushes_pending_frags(self, fragstats_pipeline):
+        self.plugin.pending_frags[("456", "123")] = 2
+
+        self.plugin.handle_game_end({})
+
+        verify(fragstats_pipeline).zincrby("minqlx:players:456:soulz", value="123", amount=2)
+        verify(fragstats_pipeline).zincrby("minqlx:players:123:reaperz", value="456", amount=2)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_map_change_flushes_pending_frags(self, fragstats_pipeline):
+        self.plugin.pending_frags[("lava", "123")] = 1
+
+        self.plugin.handle_map_change("campgrounds", "ca")
+
+        verify(fragstats_pipeline).zincrby("minqlx:players:lava:soulz", value="123", amount=1)
+        verify(fragstats_pipeline).zincrby("minqlx:players:123:reaperz", value="lava", amount=1)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_plugin_unload_flushes_pending_frags(self, fragstats_pipeline):
+        self.plugin.pending_frags[("456", "123")] = 1
+
+        self.plugin.handle_plugin_unload("frag_stats")
+
+        verify(fragstats_pipeline).execute()
+        assert_that(self.plugin.pending_frags, equal_to({}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_plugin_unload_of_other_plugin_keeps_pending_frags(self, fragstats_pipeline):
+        self.plugin.pending_frags[("456", "123")] = 1
+
+        self.plugin.handle_plugin_unload("balance")
+
+        verify(fragstats_pipeline, times=0).execute()
+        assert_that(self.plugin.pending_frags, equal_to({("456", "123"): 1}))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_flush_pending_frags_updates_soulz_balances(self, fragstats_pipeline):
+        self.plugin.pending_frags[("456", "123")] = 3
+
+        self.plugin.flush_pending_frags()
+
+        verify(fragstats_pipeline).zincrby("minqlx:players:456:soulzbalance", value="123", amount=3)
+        verify(fragstats_pipeline).zincrby("minqlx:players:123:soulzbalance", value="456", amount=-3)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_flush_pending_frags_skips_soulz_balances_for_environmental_deaths(self, fragstats_pipeline):
+        self.plugin.pending_frags[("lava", "123")] = 1
+
+        self.plugin.flush_pending_frags()
+
+        verify(fragstats_pipeline, times=0).zincrby("minqlx:players:lava:soulzbalance", value=any_, amount=any_)
+        verify(fragstats_pipeline, times=0).zincrby("minqlx:players:123:soulzbalance", value=any_, amount=any_)
 
     @pytest.mark.usefixtures("game_in_progress")
     def test_handle_death_by_team_switch_is_not_recorded(self):
@@ -700,18 +958,12 @@ class TestFragStats:
 
         connected_players(player)
 
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:soulz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn([])
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:reaperz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn([])
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[],
+            reaperz=[],
+        )
 
         self.plugin.cmd_soulzbalance(player, ["!soulz"], mock_channel)
 
@@ -725,18 +977,12 @@ class TestFragStats:
         disconnected_killed2 = fake_player(5, "Disconnected Killed2", team="blue")
         connected_players(player, killed1)
 
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:soulz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn([(killed1.steam_id, 1), (disconnected_killed2.steam_id, 2)])
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:reaperz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn([])
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[(killed1.steam_id, 1), (disconnected_killed2.steam_id, 2)],
+            reaperz=[],
+        )
         when(fragstats_db).exists(f"minqlx:players:{disconnected_killed2.steam_id}:last_used_name").thenReturn(True)
         when(fragstats_db).get(f"minqlx:players:{disconnected_killed2.steam_id}:last_used_name").thenReturn(
             disconnected_killed2.name
@@ -751,6 +997,43 @@ class TestFragStats:
             )
         )
 
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_soulzbalance_resolves_disconnected_players_in_bulk(self, mock_channel, fragstats_db):
+        player = fake_player(123, "Issuing Player", team="red")
+
+        disconnected_killed1 = fake_player(4, "Disconnected Killed1", team="blue")
+        disconnected_killed2 = fake_player(5, "Disconnected Killed2", team="blue")
+        connected_players(player)
+
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[(disconnected_killed1.steam_id, 3), (disconnected_killed2.steam_id, 2)],
+            reaperz=[(disconnected_killed1.steam_id, 1), (disconnected_killed2.steam_id, 4)],
+        )
+        when(fragstats_db).get(f"minqlx:players:{disconnected_killed1.steam_id}:last_used_name").thenReturn(
+            disconnected_killed1.name
+        )
+        when(fragstats_db).get(f"minqlx:players:{disconnected_killed2.steam_id}:last_used_name").thenReturn(
+            disconnected_killed2.name
+        )
+
+        self.plugin.cmd_soulzbalance(player, ["!soulz"], mock_channel)
+
+        mock_channel.assert_was_replied(
+            matches(r"Best 5 soul balance for Issuing Player.*: Disconnected Killed1.*\(\^2\+2\^7\)\(3/1\)")
+        )
+        mock_channel.assert_was_replied(
+            matches(r"Worst 5 soul balance for Issuing Player.*: Disconnected Killed2.*\(\^1-2\^7\)\(2/4\)")
+        )
+        verify(fragstats_db, times=1).mget(
+            [
+                f"minqlx:players:{disconnected_killed1.steam_id}:last_used_name",
+                f"minqlx:players:{disconnected_killed2.steam_id}:last_used_name",
+            ]
+        )
+        verify(fragstats_db, times=0).exists(any_)
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_cmd_soulzbalance_returns_best5_worst_5(self, mock_channel, fragstats_db):
         player = fake_player(123, "Issuing Player", team="red")
@@ -761,31 +1044,21 @@ class TestFragStats:
         killed4 = fake_player(7, "Killed4", team="blue")
         connected_players(player, killed1, killed2, killed3, killed4)
 
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:soulz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn(
-            [
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[
                 (killed1.steam_id, 2),
                 (killed2.steam_id, 3),
                 (killed3.steam_id, 5),
                 (killed4.steam_id, 8),
-            ]
-        )
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:reaperz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn(
-            [
+            ],
+            reaperz=[
                 (killed1.steam_id, 1),
                 (killed2.steam_id, 1),
                 (killed3.steam_id, 2),
                 (killed4.steam_id, 6),
-            ]
+            ],
         )
 
         self.plugin.cmd_soulzbalance(player, ["!soulz"], mock_channel)
@@ -793,8 +1066,8 @@ class TestFragStats:
         mock_channel.assert_was_replied(
             matches(
                 r"Best 5 soul balance for Issuing Player.*: "
-                r"Killed3.*\(\^2\+3\^7\)\(5/2\), Killed2.*\(\^2\+2\^7\)\(3/1\), "
-                r"Killed4.*\(\^2\+2\^7\)\(8/6\), Killed1.*\(\^2\+1\^7\)\(2/1\)"
+                r"Killed3.*\(\^2\+3\^7\)\(5/2\), Killed4.*\(\^2\+2\^7\)\(8/6\), "
+                r"Killed2.*\(\^2\+2\^7\)\(3/1\), Killed1.*\(\^2\+1\^7\)\(2/1\)"
             )
         )
         mock_channel.assert_was_replied(
@@ -827,6 +1100,75 @@ class TestFragStats:
             matches(r"Issuing Player.+ leads by \^23\^7 soulz vs. Fragging Player.* \(3/0\)")
         )
 
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_soulzbalance_for_another_player_includes_pending_frags(self, mock_channel, fragstats_db):
+        player = fake_player(123, "Issuing Player", team="red")
+        fragging_player = fake_player(456, "Fragging Player", team="red")
+        connected_players(player, fragging_player)
+
+        when(fragstats_db).zscore(f"minqlx:players:{player.steam_id}:soulz", fragging_player.steam_id).thenReturn(3)
+        when(fragstats_db).zscore(f"minqlx:players:{player.steam_id}:reaperz", fragging_player.steam_id).thenReturn(2)
+        self.plugin.pending_frags[(str(fragging_player.steam_id), str(player.steam_id))] = 2
+
+        self.plugin.cmd_soulzbalance(player, ["!soulz", "Fragging"], mock_channel)
+
+        mock_channel.assert_was_replied(
+            matches(r"Fragging Player.+ leads by \^11\^7 soulz vs. Issuing Player.* \(4/3\)")
+        )
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_soulzbalance_ranks_pending_frags_beyond_persisted_top_balances(self, mock_channel, fragstats_db):
+        player = fake_player(123, "Issuing Player", team="red")
+
+        killed = [fake_player(steam_id, f"Killed{steam_id}", team="blue") for steam_id in range(1, 8)]
+        connected_players(player, *killed)
+
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[(killed_player.steam_id, 10 - killed_player.steam_id) for killed_player in killed],
+            reaperz=[],
+        )
+        self.plugin.pending_frags[(str(player.steam_id), "7")] = 9
+
+        self.plugin.cmd_soulzbalance(player, ["!soulz"], mock_channel)
+
+        mock_channel.assert_was_replied(
+            matches(
+                r"Best 5 soul balance for Issuing Player.*: "
+                r"Killed7.*\(\^2\+12\^7\)\(12/0\), Killed1.*\(\^2\+9\^7\)\(9/0\), "
+                r"Killed2.*\(\^2\+8\^7\)\(8/0\), Killed3.*\(\^2\+7\^7\)\(7/0\), "
+                r"Killed4.*\(\^2\+6\^7\)\(6/0\)$"
+            )
+        )
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_soulzbalance_includes_pending_frags(self, mock_channel, fragstats_db):
+        player = fake_player(123, "Issuing Player", team="red")
+
+        killed1 = fake_player(4, "Killed1", team="blue")
+        killed2 = fake_player(5, "Killed2", team="blue")
+        connected_players(player, killed1, killed2)
+
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[(str(killed1.steam_id), 2)],
+            reaperz=[(str(killed1.steam_id), 1)],
+        )
+        self.plugin.pending_frags[(str(player.steam_id), str(killed1.steam_id))] = 1
+        self.plugin.pending_frags[(str(player.steam_id), str(killed2.steam_id))] = 2
+        self.plugin.pending_frags[("lava", str(player.steam_id))] = 1
+
+        self.plugin.cmd_soulzbalance(player, ["!soulz"], mock_channel)
+
+        mock_channel.assert_was_replied(
+            matches(
+                r"Best 5 soul balance for Issuing Player.*: "
+                r"Killed2.*\(\^2\+2\^7\)\(2/0\), Killed1.*\(\^2\+2\^7\)\(3/1\)"
+            )
+        )
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_cmd_soulzbalance_for_another_disconnected_player(self, mock_channel, fragstats_db):
         player = fake_player(123, "Issuing Player", team="red")
@@ -1005,34 +1347,71 @@ class TestFragStats:
         killed4 = fake_player(7, "Killed4", team="blue")
         connected_players(player, killed1, killed2, killed3, killed4)
 
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:soulz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn(
-            [
+        self.setup_soulz_records(
+            fragstats_db,
+            player.steam_id,
+            soulz=[
                 (killed1.steam_id, 2),
                 (killed2.steam_id, 3),
                 (killed3.steam_id, 5),
                 (killed4.steam_id, 8),
-            ]
-        )
-        when(fragstats_db).zrevrangebyscore(
-            f"minqlx:players:{player.steam_id}:reaperz",
-            "+INF",
-            "-INF",
-            withscores=True,
-        ).thenReturn(
-            [
+            ],
+            reaperz=[
                 (killed1.steam_id, 8),
                 (killed2.steam_id, 5),
                 (killed3.steam_id, 3),
                 (killed4.steam_id, 2),
-            ]
+            ],
         )
 
         self.plugin.cmd_soulzbalance(player, ["!soulz"], minqlx.RED_TEAM_CHAT_CHANNEL)
 
         mock_channel.assert_was_replied(matches(r"Best 5 soul balance for Issuing Player.*"))
         mock_channel.assert_was_replied(matches(r"Worst 5 soul balance for Issuing Player.*"))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_backfill_soulzbalance_recomputes_balances_from_soulz_and_reaperz(
+        self, mock_channel, fragstats_db, fragstats_pipeline
+    ):
+        player = fake_player(123, "Issuing Player", team="red")
+        transaction = mock(spec=redis.client.Pipeline, strict=False)
+        when(fragstats_db).pipeline().thenReturn(transaction)
+        when(fragstats_db).scan_iter(match="minqlx:players:*:soulz").thenReturn(
+            ["minqlx:players:123:soulz", "minqlx:players:lava:soulz"]
+        )
+        when(fragstats_db).scan_iter(match="minqlx:players:*:reaperz").thenReturn(["minqlx:players:123:reaperz"])
+        when(fragstats_pipeline).execute().thenReturn(
+            [
+                [("456", 3), ("789", 1)],
+                [("456", 1), ("lava", 2), ("789", 4)],
+            ]
+        )
+
+        self.plugin.cmd_backfill_soulzbalance(player, ["!backfillsoulzbalance"], mock_channel)
+
+        verify(transaction).delete("minqlx:players:123:soulzbalance")
+        verify(transaction).zadd("minqlx:players:123:soulzbalance", {"456": 2, "789": -3})
+        verify(transaction).execute()
+        mock_channel.assert_was_replied(matches(r".*Backfilled the soul balances of .*1.* players."))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_cmd_fragstats_size_reports_keys_entries_and_memory(self, mock_channel, fragstats_db, fragstats_pipeline):
+        player = fake_player(123, "Issuing Player", team="red")
+        when(fragstats_db).scan_iter(match="minqlx:players:*:soulz", count=1000).thenReturn(
+            ["minqlx:players:123:soulz", "minqlx:players:456:soulz"]
+        )
+        when(fragstats_db).scan_iter(match="minqlx:players:*:reaperz", count=1000).thenReturn(
+            ["minqlx:players:123:reaperz"]
+        )
+        when(fragstats_db).scan_iter(match="minqlx:players:*:soulzbalance", count=1000).thenReturn([])
+        when(fragstats_pipeline).execute().thenReturn([3, 1024, 2, 2048]).thenReturn([5, 512])
+
+        self.plugin.cmd_fragstats_size(player, ["!fragstatssize"], mock_channel)
+
+        mock_channel.assert_was_replied(
+            matches(
+                r".*Frag stats storage: .*soulz.*: .*2.* keys, .*5.* entries, .*3\.0.* KiB, "
+                r".*reaperz.*: .*1.* keys, .*5.* entries, .*0\.5.* KiB, "
+                r".*soulzbalance.*: .*0.* keys, .*0.* entries, .*0\.0.* KiB"
+            )
+        )
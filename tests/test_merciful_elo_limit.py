@@ -209,6 +209,42 @@ class TestMercifulEloLimit:
 
         verify(requests.Session).get(f"http://qlstats.net/belo/{player.steam_id}", timeout=any_)
 
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_player_connect_reuses_plugin_http_session(self, merciful_db):
+        when(self.plugin.http_session).get(...).thenReturn(None)
+
+        setup_cvars(
+            {
+                "qlx_mercifulelo_minelo": "800",
+                "qlx_mercifulelo_applicationgames": "10",
+                "qlx_mercifulelo_daysbanned": "30",
+                "qlx_owner": "42",
+                "qlx_balanceApi": "belo",
+            }
+        )
+
+        player = fake_player(123, "Fake Player1", team="spectator")
+        when(merciful_db).exists(f"minqlx:players:{player.steam_id}:minelo:games").thenReturn(True)
+
+        with ThreadContextManager(self.plugin):
+            self.plugin.handle_player_connect(player)
+
+        verify(self.plugin.http_session).get(f"http://qlstats.net/belo/{player.steam_id}", timeout=15)
+
+    def test_handle_plugin_unload_closes_http_session(self):
+        spy2(self.plugin.http_session.close)
+
+        self.plugin.handle_plugin_unload("merciful_elo_limit")
+
+        verify(self.plugin.http_session).close()
+
+    def test_handle_plugin_unload_of_other_plugin(self):
+        spy2(self.plugin.http_session.close)
+
+        self.plugin.handle_plugin_unload("otherplugin")
+
+        verify(self.plugin.http_session, times=0).close()
+
     @pytest.mark.usefixtures("no_minqlx_game")
     def test_fetch_elos_of_players_with_no_game_setup(self):
         self.setup_balance_ratings({})
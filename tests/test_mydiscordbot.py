@@ -1,11 +1,14 @@
 import asyncio
+import gzip
 import logging
+import time
 
+from logging.handlers import RotatingFileHandler
 from typing import Set
 from unittest.mock import AsyncMock
 
 import pytest
-from mockito import mock, unstub, verify, when  # type: ignore
+from mockito import mock, spy2, unstub, verify, when, when2  # type: ignore
 from mockito.matchers import matches, arg_that  # type: ignore
 from hamcrest import assert_that, equal_to
 
@@ -30,7 +33,7 @@ from minqlx_plugin_test import (
 )
 
 import minqlx
-from mydiscordbot import mydiscordbot, MinqlxHelpCommand, SimpleAsyncDiscord
+from mydiscordbot import mydiscordbot, MinqlxHelpCommand, SimpleAsyncDiscord, QueuedLogHandler, escaped_player_name
 
 
 class TestMyDiscordBotTests:
@@ -51,11 +54,13 @@ class TestMyDiscordBotTests:
         self.plugin.handle_plugin_unload("mydiscordbot")
 
         verify(self.discord).stop()
+        verify(self.discord).remove_extended_logger()
 
     def test_handle_unload_of_other_plugin(self):
         self.plugin.handle_plugin_unload("otherplugin")
 
         verify(self.discord, times=0).stop()
+        verify(self.discord, times=0).remove_extended_logger()
 
     def test_handle_ql_chat_message_relayed(self):
         chatter = fake_player(1, "Chatter")
@@ -81,6 +86,63 @@ class TestMyDiscordBotTests:
 
         verify(self.discord, times=0).relay_chat_message(any, any, any)
 
+    def test_compile_message_filters_combines_filters(self):
+        compiled = mydiscordbot.compile_message_filters({r"^\!s$", r"^\!p$"})
+
+        assert_that(len(compiled), equal_to(1))
+        assert_that(compiled[0].match("!p") is not None, equal_to(True))
+        assert_that(compiled[0].match("!score") is None, equal_to(True))
+
+    def test_compile_message_filters_falls_back_to_separate_patterns(self):
+        compiled = mydiscordbot.compile_message_filters({r"(?i)^\!s$", r"^\!p$"})
+
+        assert_that(len(compiled), equal_to(2))
+
+    def test_compile_message_filters_global_flags_do_not_apply_to_other_filters(self):
+        compiled = mydiscordbot.compile_message_filters({r"(?i)^\!s$", r"^\!p$"})
+
+        assert_that(any(f.match("!S") for f in compiled), equal_to(True))
+        assert_that(any(f.match("!P") for f in compiled), equal_to(False))
+
+    def test_compile_message_filters_keeps_backreferences_separate(self):
+        compiled = mydiscordbot.compile_message_filters({r"^(\w)\1$", r"^\!p$"})
+
+        assert_that(len(compiled), equal_to(2))
+        assert_that(any(f.match("aa") for f in compiled), equal_to(True))
+        assert_that(any(f.match("ab") for f in compiled), equal_to(False))
+
+    def test_compile_message_filters_keeps_conditional_groups_separate(self):
+        compiled = mydiscordbot.compile_message_filters({r"^(<)?\w+(?(1)>)$", r"^\!p$"})
+
+        assert_that(len(compiled), equal_to(2))
+        assert_that(any(f.match("<tag>") for f in compiled), equal_to(True))
+        assert_that(any(f.match("<tag") for f in compiled), equal_to(False))
+
+    def test_compile_message_filters_skips_invalid_filters(self):
+        mocked_logger = mock(spec=logging.Logger, strict=False)
+        spy2(minqlx.get_logger)
+        when(minqlx).get_logger("mydiscordbot").thenReturn(mocked_logger)
+
+        compiled = mydiscordbot.compile_message_filters({r"^\!s$", r"^(\!p$"})
+
+        assert_that(len(compiled), equal_to(1))
+        assert_that(compiled[0].match("!s") is not None, equal_to(True))
+        verify(mocked_logger).warning(matches(r".*invalid message filter '\^\(\\\\!p\$'.*"))
+
+    def test_plugin_loads_with_invalid_message_filter(self):
+        setup_cvars({"qlx_discordQuakeRelayMessageFilters": r"^\!s$, ^(\!p$"})
+
+        plugin = mydiscordbot(discord_client=self.discord)
+
+        assert_that(plugin.is_filtered_message("!s"), equal_to(True))
+        assert_that(plugin.is_filtered_message("!p"), equal_to(False))
+
+    def test_compile_message_filters_without_filters(self):
+        assert_that(mydiscordbot.compile_message_filters(set()), equal_to(()))
+
+    def test_escaped_player_name_strips_colors_and_escapes_markdown(self):
+        assert_that(escaped_player_name("^1Chat^7ting_pl*ayer"), equal_to(r"Chatting\_pl\*ayer"))
+
     def test_handle_player_connects(self):
         undecorated(self.plugin.handle_player_connect)(self.plugin, fake_player(1, "Connecting Player"))
 
@@ -127,6 +189,93 @@ class TestMyDiscordBotTests:
 
         verify(self.discord).relay_message("*Changing map to Theatre of Pain...*")
 
+    def test_handle_frame_publishes_first_game_state(self, game_in_progress):
+        connected_players(fake_player(1, "Player1", "red"))
+
+        self.plugin.handle_frame()
+
+        assert_that(self.plugin.game_state.snapshot.map, equal_to(game_in_progress.map))
+        assert_that(len(self.plugin.game_state.snapshot.players), equal_to(1))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_sends_relayed_messages_together(self, mock_channel):
+        minqlx.CHAT_CHANNEL = mock_channel
+        self.plugin.quake_chat.add("[DISCORD] ^6Sender^7:^2 first message")
+        self.plugin.quake_chat.add("[DISCORD] ^6Sender^7:^2 second message")
+
+        self.plugin.handle_frame()
+
+        verify(minqlx.CHAT_CHANNEL).reply(
+            "[DISCORD] ^6Sender^7:^2 first message\n^7[DISCORD] ^6Sender^7:^2 second message"
+        )
+        assert_that(self.plugin.quake_chat.messages, equal_to([]))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_without_relayed_messages(self, mock_channel):
+        minqlx.CHAT_CHANNEL = mock_channel
+
+        self.plugin.handle_frame()
+
+        verify(minqlx.CHAT_CHANNEL, times=0).reply(any)
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_does_not_republish_unchanged_game_state(self):
+        self.plugin.handle_frame()
+        snapshot = self.plugin.game_state.snapshot
+        self.plugin.game_state.published_at -= self.plugin.game_state.min_interval
+
+        connected_players(fake_player(1, "Player1", "red"))
+        self.plugin.handle_frame()
+
+        assert_that(self.plugin.game_state.snapshot, equal_to(snapshot))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_game_state_change_republishes_on_next_frame(self):
+        self.plugin.handle_frame()
+        self.plugin.game_state.published_at -= self.plugin.game_state.min_interval
+
+        connected_players(fake_player(1, "Player1", "red"))
+        self.plugin.handle_game_state_change(fake_player(1, "Player1", "red"), "spectator", "red")
+        self.plugin.handle_frame()
+
+        assert_that(len(self.plugin.game_state.snapshot.players), equal_to(1))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_frame_republishes_outdated_game_state(self):
+        self.plugin.handle_frame()
+        self.plugin.game_state.published_at -= self.plugin.game_state.max_age
+
+        connected_players(fake_player(1, "Player1", "red"))
+        self.plugin.handle_frame()
+
+        assert_that(len(self.plugin.game_state.snapshot.players), equal_to(1))
+
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_game_state_change_does_not_republish_within_min_interval(self):
+        self.plugin.handle_frame()
+
+        connected_players(fake_player(1, "Player1", "red"))
+        self.plugin.handle_game_state_change()
+        self.plugin.handle_frame()
+
+        assert_that(len(self.plugin.game_state.snapshot.players), equal_to(0))
+
+    def test_game_state_version_only_bumped_when_game_state_changed(self, game_in_progress):
+        game_in_progress.maxclients = 16
+        game_in_progress.map_title = "Campgrounds"
+        game_in_progress.type = "Clan Arena"
+        self.plugin.game_state.publish()
+        version = self.plugin.game_state.version
+
+        self.plugin.game_state.publish()
+
+        assert_that(self.plugin.game_state.version, equal_to(version))
+
+        connected_players(fake_player(1, "Player1", "red"))
+        self.plugin.game_state.publish()
+
+        assert_that(self.plugin.game_state.version, equal_to(version + 1))
+
     def test_handle_vote_started_by_player(self):
         self.plugin.handle_vote_started(fake_player(1, "Votecaller"), "kick", "asdf")
 
@@ -240,7 +389,7 @@ class TestMyDiscordBotTests:
 
         assert_that(game_info, equal_to("Warmup"))
 
-    def test_player_data_with_players_on_both_teams(self):
+    def test_player_data_with_players_on_both_teams(self, game_in_progress):
         connected_players(
             fake_player(1, "Player1", "red", score=1),
             fake_player(2, "Player2", "blue", score=3),
@@ -248,24 +397,24 @@ class TestMyDiscordBotTests:
             fake_player(4, "Player4", "red", score=5),
         )
 
-        player_data = mydiscordbot.player_data()
+        player_data = mydiscordbot.player_data(self.plugin.game_state.publish())
 
         assert_that(
             player_data,
             equal_to("\n**R:** **Player4**(5) **Player1**(1) \n**B:** **Player2**(3) **Player3**(2) "),
         )
 
-    def test_player_data_with_just_red_players(self):
+    def test_player_data_with_just_red_players(self, game_in_progress):
         connected_players(fake_player(1, "Player1", "red"), fake_player(4, "Player4", "red"))
 
-        player_data = mydiscordbot.player_data()
+        player_data = mydiscordbot.player_data(self.plugin.game_state.publish())
 
         assert_that(player_data, equal_to("\n**R:** **Player1**(0) **Player4**(0) "))
 
-    def test_player_data_with_just_blue_players(self):
+    def test_player_data_with_just_blue_players(self, game_in_progress):
         connected_players(fake_player(2, "Player2", "blue"), fake_player(3, "Player3", "blue"))
 
-        player_data = mydiscordbot.player_data()
+        player_data = mydiscordbot.player_data(self.plugin.game_state.publish())
 
         assert_that(player_data, equal_to("\n**B:** **Player2**(0) **Player3**(0) "))
 
@@ -316,6 +465,22 @@ class TestMyDiscordBotTests:
 
         mock_channel.assert_was_replied("Discord status message")
 
+    def test_cmd_discordbot_sync(self, mock_channel):
+        when(self.discord).is_discord_logged_in().thenReturn(True)
+        triggering_player = fake_player(1, "Triggering Player")
+        self.plugin.cmd_discordbot(triggering_player, ["!discordbot", "sync"], mock_channel)
+
+        mock_channel.assert_was_replied("Syncing application commands with Discord...")
+        verify(self.discord).resync_command_tree()
+
+    def test_cmd_discordbot_sync_when_disconnected(self, mock_channel):
+        when(self.discord).is_discord_logged_in().thenReturn(False)
+        triggering_player = fake_player(1, "Triggering Player")
+        self.plugin.cmd_discordbot(triggering_player, ["!discordbot", "sync"], mock_channel)
+
+        mock_channel.assert_was_replied("Discord client not connected.")
+        verify(self.discord, times=0).resync_command_tree()
+
     def test_cmd_discordbot_connect(self, mock_channel):
         triggering_player = fake_player(1, "Triggering Player")
         self.plugin.cmd_discordbot(triggering_player, ["!discordbot", "connect"], mock_channel)
@@ -479,6 +644,8 @@ class TestSimpleAsyncDiscord:
         self.discord_client.change_presence = AsyncMock()
         self.discord_client.tree = mock(spec=discord.app_commands.CommandTree, strict=False)
         self.discord_client.tree.sync = AsyncMock()
+        when(self.discord_client.tree).get_commands().thenReturn([])
+        self.discord_client.cogs = {}
 
         self.discord_client.user = mock(User, strict=False)
         self.discord_client.user.name = "Bot Name"
@@ -496,6 +663,7 @@ class TestSimpleAsyncDiscord:
         when(self.discord_client).is_closed().thenReturn(False)
 
         self.discord.discord = self.discord_client
+        self.discord.outbound_messages.coalesce_window = 0
 
     def mocked_context(
         self,
@@ -514,6 +682,9 @@ class TestSimpleAsyncDiscord:
 
         return context
 
+    def deliver_outbound_messages(self):
+        self.discord_client.loop.run_until_complete(self.discord.outbound_messages.drain())
+
     def relay_channel(self):
         channel = mocked_discord_channel(_id=1234, name="relay-channel")
 
@@ -556,7 +727,45 @@ class TestSimpleAsyncDiscord:
     def test_status_connected(self):
         status = self.discord.status()
 
-        assert_that(status, equal_to("Discord connection up and running."))
+        assert_that(
+            status,
+            equal_to(
+                "Discord connection up and running. Outbound messages: 0 queued, 0 sent in 0 batches, 0 dropped, "
+                "0 batches throttled."
+            ),
+        )
+
+    def test_status_connected_with_periodic_jobs(self):
+        job_metrics = mock(strict=False)
+        when(job_metrics).metrics().thenReturn(
+            {"runs": 12, "overruns": 1, "last_duration": 0.25, "average_duration": 0.125}
+        )
+        self.discord_client.cogs = {"SubscriberCog": mock({"job_metrics": job_metrics}), "Status": object()}
+
+        status = self.discord.status()
+
+        assert_that(
+            status,
+            equal_to(
+                "Discord connection up and running. Outbound messages: 0 queued, 0 sent in 0 batches, 0 dropped, "
+                "0 batches throttled. SubscriberCog: 12 runs, 1 overruns, 0.12s on average."
+            ),
+        )
+
+    def test_remove_extended_logger_removes_and_closes_its_handlers(self, tmp_path):
+        setup_cvars({"fs_homepath": str(tmp_path)})
+        discord_logger = logging.getLogger("discord")
+        existing_level = discord_logger.level
+        self.discord.extended_log_handlers = SimpleAsyncDiscord.setup_extended_logger()
+        discord_logger.setLevel(existing_level)
+        queued_handler, console_handler = self.discord.extended_log_handlers
+
+        self.discord.remove_extended_logger()
+
+        assert_that(queued_handler in discord_logger.handlers, equal_to(False))
+        assert_that(console_handler in discord_logger.handlers, equal_to(False))
+        assert_that(queued_handler.writing, equal_to(False))
+        assert_that(self.discord.extended_log_handlers, equal_to([]))
 
     def test_status_no_client(self):
         self.discord.discord = None
@@ -579,6 +788,12 @@ class TestSimpleAsyncDiscord:
         self.verify_added_command(name="version", callback=self.discord.version)
         verify(self.discord_client).add_listener(self.discord.on_ready)
         verify(self.discord_client).add_listener(self.discord.on_message)
+        verify(self.discord_client).add_listener(self.discord.on_member_join)
+        verify(self.discord_client).add_listener(self.discord.on_member_update)
+        verify(self.discord_client).add_listener(self.discord.on_member_remove)
+        verify(self.discord_client).add_listener(self.discord.on_guild_channel_create)
+        verify(self.discord_client).add_listener(self.discord.on_guild_channel_update)
+        verify(self.discord_client).add_listener(self.discord.on_guild_channel_delete)
 
     @pytest.mark.asyncio
     async def test_disable_version(self):
@@ -596,12 +811,76 @@ class TestSimpleAsyncDiscord:
         assert_matching_string_send_to_discord_context(context, "```version information```")
 
     @pytest.mark.asyncio
-    async def test_on_ready(self):
+    async def test_on_ready(self, tmp_path):
+        setup_cvars({"fs_homepath": str(tmp_path)})
         self.setup_discord_library()
 
         await self.discord.on_ready()
 
         self.discord_client.change_presence.assert_called_once_with(activity=discord.Game(name="Quake Live"))
+        self.discord_client.tree.sync.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_on_ready_skips_sync_of_unchanged_command_tree(self, tmp_path):
+        setup_cvars({"fs_homepath": str(tmp_path)})
+        self.setup_discord_library()
+
+        await self.discord.on_ready()
+        await self.discord.on_ready()
+
+        self.discord_client.tree.sync.assert_awaited_once()
+        assert_that(
+            self.discord.read_synced_command_tree()[0],
+            equal_to(self.discord.command_tree_hash()),
+        )
+
+    @pytest.mark.asyncio
+    async def test_on_ready_syncs_changed_command_tree(self, tmp_path):
+        setup_cvars({"fs_homepath": str(tmp_path)})
+        self.setup_discord_library()
+        await self.discord.on_ready()
+
+        command = mock()
+        when(command).to_dict(self.discord_client.tree).thenReturn({"name": "status", "type": 1})
+        when(self.discord_client.tree).get_commands().thenReturn([command])
+        await self.discord.on_ready()
+
+        assert_that(self.discord_client.tree.sync.await_count, equal_to(2))
+
+    @pytest.mark.asyncio
+    async def test_forced_sync_of_unchanged_command_tree(self, tmp_path):
+        setup_cvars({"fs_homepath": str(tmp_path)})
+        self.setup_discord_library()
+        await self.discord.sync_command_tree()
+
+        synced = await self.discord.sync_command_tree(force=True)
+
+        assert_that(synced, equal_to(True))
+        assert_that(self.discord_client.tree.sync.await_count, equal_to(2))
+
+    def test_command_tree_hash_is_independent_of_command_order(self):
+        self.setup_discord_library()
+        status_command = mock()
+        when(status_command).to_dict(self.discord_client.tree).thenReturn({"name": "status", "type": 1})
+        slap_command = mock()
+        when(slap_command).to_dict(self.discord_client.tree).thenReturn({"name": "slap", "type": 1})
+
+        when(self.discord_client.tree).get_commands().thenReturn([status_command, slap_command])
+        tree_hash = self.discord.command_tree_hash()
+        when(self.discord_client.tree).get_commands().thenReturn([slap_command, status_command])
+
+        assert_that(self.discord.command_tree_hash(), equal_to(tree_hash))
+
+    def test_command_tree_hash_with_discord_versions_without_tree_parameter(self, monkeypatch):
+        self.setup_discord_library()
+        monkeypatch.setattr("mydiscordbot.COMMAND_TO_DICT_TAKES_TREE", False)
+        status_command = mock()
+        when(status_command).to_dict().thenReturn({"name": "status", "type": 1})
+        when(self.discord_client.tree).get_commands().thenReturn([status_command])
+
+        self.discord.command_tree_hash()
+
+        verify(status_command).to_dict()
 
     @pytest.mark.asyncio
     async def test_on_message_is_relayed(self, mock_channel):
@@ -614,6 +893,7 @@ class TestSimpleAsyncDiscord:
         minqlx.CHAT_CHANNEL = mock_channel
 
         await self.discord.on_message(message)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL).reply("[DISCORD] ^6Sender^7:^2 some chat message")
 
@@ -628,9 +908,54 @@ class TestSimpleAsyncDiscord:
         minqlx.CHAT_CHANNEL = mock_channel
 
         await self.discord.on_message(message)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL).reply("[DISCORD] ^6SenderNick^7:^2 some chat message")
 
+    @staticmethod
+    def run_next_frame_tasks():
+        while not minqlx.next_frame_tasks.empty():
+            func, args, kwargs = minqlx.next_frame_tasks.get_nowait()
+            func(*args, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_on_message_relayed_messages_are_sent_together(self, monkeypatch):
+        monkeypatch.setattr(minqlx, "CHAT_CHANNEL", minqlx.TeamChatChannel(team="all", name="chat"))
+        when2(minqlx.send_server_command, any, any).thenReturn(None)
+        sender = mocked_discord_user(name="Sender")
+
+        await self.discord.on_message(
+            mocked_discord_message(content="first message", user=sender, channel=self.relay_channel())
+        )
+        await self.discord.on_message(
+            mocked_discord_message(content="second message", user=sender, channel=self.relay_channel())
+        )
+        self.discord.quake_chat.flush()
+        self.run_next_frame_tasks()
+
+        verify(minqlx, times=1).send_server_command(any, any)
+        verify(minqlx).send_server_command(
+            None, 'print "[DISCORD] ^6Sender^7:^2 first message\n^7[DISCORD] ^6Sender^7:^2 second message\n"\n'
+        )
+        assert_that(self.discord.quake_chat.messages, equal_to([]))
+
+    @pytest.mark.asyncio
+    async def test_on_message_relayed_messages_exceeding_the_message_length(self, monkeypatch):
+        monkeypatch.setattr(minqlx, "CHAT_CHANNEL", minqlx.TeamChatChannel(team="all", name="chat"))
+        when2(minqlx.send_server_command, any, any).thenReturn(None)
+        sender = mocked_discord_user(name="Sender")
+
+        await self.discord.on_message(
+            mocked_discord_message(content="first " * 100, user=sender, channel=self.relay_channel())
+        )
+        await self.discord.on_message(
+            mocked_discord_message(content="second " * 100, user=sender, channel=self.relay_channel())
+        )
+        self.discord.quake_chat.flush()
+        self.run_next_frame_tasks()
+
+        verify(minqlx, times=2).send_server_command(any, any)
+
     @pytest.mark.asyncio
     async def test_on_message_in_wrong_channel(self, mock_channel):
         message = mocked_discord_message(content="some chat message", channel=self.triggered_channel())
@@ -638,6 +963,7 @@ class TestSimpleAsyncDiscord:
         minqlx.CHAT_CHANNEL = mock_channel
 
         await self.discord.on_message(message)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL, times=0).reply(any)
 
@@ -648,6 +974,7 @@ class TestSimpleAsyncDiscord:
         minqlx.CHAT_CHANNEL = mock_channel
 
         await self.discord.on_message(message)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL, times=0).reply(any)
 
@@ -658,6 +985,7 @@ class TestSimpleAsyncDiscord:
         minqlx.CHAT_CHANNEL = mock_channel
 
         await self.discord.on_message(message)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL, times=0).reply(any)
 
@@ -667,6 +995,7 @@ class TestSimpleAsyncDiscord:
 
         # noinspection PyTypeChecker
         await self.discord.on_message(None)
+        self.discord.quake_chat.flush()
 
         verify(minqlx.CHAT_CHANNEL, times=0).reply(any)
 
@@ -674,10 +1003,33 @@ class TestSimpleAsyncDiscord:
         self.discord_client.close = AsyncMock()
 
         self.discord.stop()
+        self.discord_client.loop.run_until_complete(asyncio.sleep(0.01))
 
         self.discord_client.change_presence.assert_called_once_with(status=Status.offline)
         self.discord_client.close.assert_called_once()
 
+    def test_shutdown_delivers_queued_messages_before_closing(self):
+        self.discord_client.close = AsyncMock()
+        relay_channel = self.relay_channel()
+        self.discord.outbound_messages.coalesce_window = 0.01
+
+        self.discord.relay_message("_Disconnecting from discord._")
+        self.discord_client.loop.run_until_complete(self.discord.shutdown())
+
+        assert_text_was_sent_to_discord_channel(relay_channel, "_Disconnecting from discord._")
+        self.discord_client.close.assert_awaited_once()
+
+    def test_shutdown_gives_up_on_queued_messages_after_timeout(self):
+        self.discord_client.close = AsyncMock()
+        relay_channel = self.relay_channel()
+        self.discord.outbound_messages.coalesce_window = 1.0
+
+        self.discord.relay_message("undeliverable message")
+        self.discord_client.loop.run_until_complete(self.discord.shutdown(drain_timeout=0.01))
+
+        relay_channel.send.assert_not_awaited()
+        self.discord_client.close.assert_awaited_once()
+
     def test_stop_discord_client_discord_not_initialized(self):
         self.discord.discord = None
 
@@ -691,6 +1043,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_message("awesome relayed message")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_channel, "awesome relayed message")
 
     def test_relay_message_with_not_connected_client(self):
@@ -701,6 +1054,95 @@ class TestSimpleAsyncDiscord:
 
         verify(relay_channel, times=0).send(any)
 
+    def test_relay_message_coalesces_messages_sent_in_short_succession(self):
+        relay_channel = self.relay_channel()
+
+        self.discord.relay_message("first relayed message")
+        self.discord.relay_message("second relayed message")
+        self.deliver_outbound_messages()
+
+        assert_text_was_sent_to_discord_channel(relay_channel, "first relayed message\nsecond relayed message")
+        assert_that(self.discord.outbound_messages.sent_messages, equal_to(2))
+        assert_that(self.discord.outbound_messages.sent_batches, equal_to(1))
+
+    def test_relay_message_interactive_messages_are_delivered_first(self):
+        relay_channel = self.relay_channel()
+
+        self.discord.relay_message("bulk relayed message")
+        self.discord.relay_message("interactive reply", interactive=True)
+        self.deliver_outbound_messages()
+
+        assert_text_was_sent_to_discord_channel(relay_channel, "interactive reply\nbulk relayed message")
+
+    def test_relay_message_splits_batches_at_discord_message_limit(self):
+        relay_channel = self.relay_channel()
+
+        self.discord.relay_message("a" * 1500)
+        self.discord.relay_message("b" * 1500)
+        self.deliver_outbound_messages()
+
+        assert_that(relay_channel.send.call_count, equal_to(2))
+        assert_that(relay_channel.send.call_args_list[0].args[0], equal_to("a" * 1500))
+        assert_that(relay_channel.send.call_args_list[1].args[0], equal_to("b" * 1500))
+
+    def test_relay_message_drops_oldest_messages_when_backlog_is_full(self):
+        relay_channel = self.relay_channel()
+        self.discord.outbound_messages.max_backlog = 2
+
+        self.discord.relay_message("first relayed message")
+        self.discord.relay_message("second relayed message")
+        self.discord.relay_message("third relayed message")
+        self.deliver_outbound_messages()
+
+        assert_text_was_sent_to_discord_channel(relay_channel, "second relayed message\nthird relayed message")
+        assert_that(self.discord.outbound_messages.dropped_messages, equal_to(1))
+
+    def test_relay_message_counts_messages_rejected_by_discord_as_dropped(self):
+        relay_channel = self.relay_channel()
+        relay_channel.send = AsyncMock(side_effect=discord.Forbidden(mock({"status": 403, "reason": "Forbidden"}), ""))
+
+        self.discord.relay_message("first relayed message")
+        self.discord.relay_message("second relayed message")
+        self.deliver_outbound_messages()
+
+        assert_that(relay_channel.send.await_count, equal_to(1))
+        assert_that(self.discord.outbound_messages.dropped_messages, equal_to(2))
+        assert_that(self.discord.outbound_messages.sent_messages, equal_to(0))
+
+    def test_relay_message_retries_once_on_discord_server_error(self):
+        relay_channel = self.relay_channel()
+        server_error = discord.DiscordServerError(mock({"status": 503, "reason": "Service Unavailable"}), "")
+        relay_channel.send = AsyncMock(side_effect=[server_error, None])
+
+        self.discord.relay_message("awesome relayed message")
+        self.deliver_outbound_messages()
+
+        assert_that(relay_channel.send.await_count, equal_to(2))
+        assert_that(self.discord.outbound_messages.sent_messages, equal_to(1))
+        assert_that(self.discord.outbound_messages.dropped_messages, equal_to(0))
+
+    def test_relay_message_drops_batch_after_repeated_rate_limits(self):
+        relay_channel = self.relay_channel()
+        rate_limited = discord.HTTPException(mock({"status": 429, "reason": "Too Many Requests"}), "")
+        relay_channel.send = AsyncMock(side_effect=rate_limited)
+
+        self.discord.relay_message("awesome relayed message")
+        self.deliver_outbound_messages()
+
+        assert_that(relay_channel.send.await_count, equal_to(2))
+        assert_that(self.discord.outbound_messages.dropped_messages, equal_to(1))
+
+    def test_relay_message_throttles_when_rate_limit_is_exhausted(self):
+        relay_channel = self.relay_channel()
+        self.discord.outbound_messages.rate_limit_period = 0.05
+        self.discord.outbound_messages.rate_limit_buckets[relay_channel.id] = (0, time.monotonic())
+
+        self.discord.relay_message("awesome relayed message")
+        self.deliver_outbound_messages()
+
+        assert_text_was_sent_to_discord_channel(relay_channel, "awesome relayed message")
+        assert_that(self.discord.outbound_messages.throttled_batches, equal_to(1))
+
     def test_send_to_discord_channels_with_no_channel_ids(self):
         string_set: Set[str] = set()
         self.discord.send_to_discord_channels(string_set, "awesome relayed message")
@@ -719,6 +1161,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_channel, "**Chatting player**: QL is great!")
 
     def test_relay_chat_message_with_asterisks_in_playername(self):
@@ -728,6 +1171,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_channel, r"**\*Chatting\* player**: QL is great!")
 
     def test_relay_chat_message_replace_user_mention(self):
@@ -745,6 +1189,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great, @chatter !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             relay_channel,
             f"**Chatting player**: QL is great, {mentioned_user.mention} !",
@@ -765,6 +1210,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great, @chatter !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_channel, "**Chatting player**: QL is great, @chatter !")
 
     def test_relay_chat_message_does_not_replace_all_everyone_and_here(self):
@@ -782,6 +1228,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great, @all @everyone @here !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             relay_channel, "**Chatting player**: QL is great, @all @everyone @here !"
         )
@@ -801,11 +1248,34 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great, #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             relay_channel,
             f"**Chatting player**: QL is great, {mentioned_channel.mention} !",
         )
 
+    def test_relay_chat_message_replace_user_and_channel_mention(self):
+        setup_cvar("qlx_discordReplaceMentionsForRelayedMessages", "1")
+        self.discord = SimpleAsyncDiscord("version information", self.logger)
+        self.setup_discord_library()
+
+        relay_channel = self.relay_channel()
+        mentioned_user = mocked_discord_user(_id=123, name="chatter")
+        mentioned_channel = mocked_discord_channel(_id=456, name="mentioned-channel")
+        self.setup_discord_members(mentioned_user)
+        self.setup_discord_channels(mentioned_channel)
+
+        player = fake_player(steam_id=1, name="Chatting player")
+        minqlx_channel = ""
+
+        self.discord.relay_chat_message(player, minqlx_channel, "@chatter come to #mention !")
+
+        self.deliver_outbound_messages()
+        assert_text_was_sent_to_discord_channel(
+            relay_channel,
+            f"**Chatting player**: {mentioned_user.mention} come to {mentioned_channel.mention} !",
+        )
+
     def test_relay_chat_message_mentioned_channel_not_found(self):
         setup_cvar("qlx_discordReplaceMentionsForRelayedMessages", "1")
         self.discord = SimpleAsyncDiscord("version information", self.logger)
@@ -820,6 +1290,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_chat_message(player, minqlx_channel, "QL is great, #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_channel, "**Chatting player**: QL is great, #mention !")
 
     def test_relay_chat_message_discord_not_logged_in(self):
@@ -844,6 +1315,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_teamchat_channel, "**Chatting player**: QL is great!")
 
     def test_relay_team_chat_message_with_asterisks_in_playername(self):
@@ -853,6 +1325,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_teamchat_channel, r"**\*Chatting\* player**: QL is great!")
 
     def test_relay_team_chat_message_replace_user_mention(self):
@@ -870,6 +1343,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great, @chatter !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             relay_teamchat_channel,
             f"**Chatting player**: QL is great, {mentioned_user.mention} !",
@@ -889,6 +1363,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great, @chatter !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_teamchat_channel, "**Chatting player**: QL is great, @chatter !")
 
     def test_relay_team_chat_message_replace_channel_mention(self):
@@ -906,6 +1381,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great, #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             relay_teamchat_channel,
             f"**Chatting player**: QL is great, {mentioned_channel.mention} !",
@@ -925,6 +1401,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.relay_team_chat_message(player, minqlx_channel, "QL is great, #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(relay_teamchat_channel, "**Chatting player**: QL is great, #mention !")
 
     def test_relay_team_chat_message_discord_not_logged_in(self):
@@ -942,6 +1419,62 @@ class TestSimpleAsyncDiscord:
 
         verify(relay_teamchat_channel, times=0).send(any)
 
+    def test_mentionable_members_are_indexed_once(self):
+        self.setup_discord_members(mocked_discord_user(_id=123, name="chatter"))
+
+        member_index = self.discord.mentionable_members()
+
+        assert_that(self.discord.mentionable_members(), equal_to(member_index))
+        assert_that(len(member_index), equal_to(1))
+        verify(self.discord_client, times=1).get_all_members()
+
+    @pytest.mark.asyncio
+    async def test_member_index_follows_member_events(self):
+        chatter = mocked_discord_user(_id=123, name="chatter")
+        self.setup_discord_members(chatter)
+        member_index = self.discord.mentionable_members()
+
+        renamed_chatter = mocked_discord_user(_id=123, name="chatter", nick="renamed")
+        await self.discord.on_member_update(chatter, renamed_chatter)
+        joined_user = mocked_discord_user(_id=456, name="newcomer")
+        await self.discord.on_member_join(joined_user)
+
+        assert_that(member_index.named("renamed", field=1), equal_to([renamed_chatter]))
+        assert_that(member_index.containing("com"), equal_to([joined_user]))
+
+        await self.discord.on_member_remove(renamed_chatter)
+
+        assert_that(member_index.containing("chatter"), equal_to([]))
+
+    @pytest.mark.asyncio
+    async def test_channel_index_follows_channel_events(self):
+        self.setup_discord_channels(mocked_discord_channel(_id=456, name="general"))
+        channel_index = self.discord.mentionable_channels()
+
+        created_channel = mocked_discord_channel(_id=789, name="general-chat")
+        await self.discord.on_guild_channel_create(created_channel)
+        category = mocked_discord_channel(_id=790, name="general-category", channel_type=ChannelType.category)
+        await self.discord.on_guild_channel_create(category)
+
+        assert_that(
+            [channel.id for channel in channel_index.containing("general")],
+            equal_to([456, 789]),
+        )
+
+        await self.discord.on_guild_channel_delete(created_channel)
+
+        assert_that([channel.id for channel in channel_index.containing("general")], equal_to([456]))
+
+    @pytest.mark.asyncio
+    async def test_mention_indexes_are_rebuilt_on_guild_changes(self):
+        self.discord.mentionable_members()
+        self.discord.mentionable_channels()
+
+        await self.discord.on_guild_join(mock(spec=discord.Guild))
+
+        assert_that(self.discord.member_index, equal_to(None))
+        assert_that(self.discord.channel_index, equal_to(None))
+
     def test_find_user_match_exact_match(self):
         exact_matching_user = mocked_discord_user(name="user")
         other_user = mocked_discord_user(name="non-exact-match-User")
@@ -1106,7 +1639,9 @@ class TestSimpleAsyncDiscord:
 
         self.discord.triggered_message(player, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(triggered_channel, "**Chatting player**: QL is great!")
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(trigger_channel2, "**Chatting player**: QL is great!")
         assert_plugin_sent_to_console(
             "Message ^1QL is great!^7 sent to discord channels ^5#triggered-channel^7, ^5#channel-name^7!"
@@ -1124,7 +1659,9 @@ class TestSimpleAsyncDiscord:
 
         self.discord.triggered_message(player, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(triggered_channel, r"**\*Chatting\_player\***: QL is great!")
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(trigger_channel2, r"**\*Chatting\_player\***: QL is great!")
 
     def test_triggered_message_replaces_mentions(self):
@@ -1138,6 +1675,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.triggered_message(player, "QL is great, @chatter #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             triggered_channel,
             f"**Chatting player**: QL is great, {mentioned_user.mention} {mentioned_channel.mention} !",
@@ -1173,6 +1711,7 @@ class TestSimpleAsyncDiscord:
 
         self.discord.triggered_message(player, "QL is great, @member #mention !")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(
             triggered_channel, "**Chatting player**: QL is great, @member #mention !"
         )
@@ -1191,5 +1730,125 @@ class TestSimpleAsyncDiscord:
 
         self.discord.triggered_message(player, "QL is great!")
 
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(triggered_channel, "Server Prefix **Chatting player**: QL is great!")
+        self.deliver_outbound_messages()
         assert_text_was_sent_to_discord_channel(trigger_channel2, "Server Prefix **Chatting player**: QL is great!")
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestQueuedLogHandler:
+    @staticmethod
+    def log_record(msg, args=None):
+        return logging.LogRecord("discord", logging.DEBUG, __file__, 1, msg, args, None)
+
+    @staticmethod
+    def file_handler(file_path, max_bytes=0, backup_count=0):
+        file_handler = RotatingFileHandler(file_path, encoding="utf-8", maxBytes=max_bytes, backupCount=backup_count)
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        return file_handler
+
+    def test_records_are_written_by_writer_thread(self, tmp_path):
+        log_file = tmp_path / "minqlx_discord.log"
+        handler = QueuedLogHandler(self.file_handler(log_file))
+
+        handler.handle(self.log_record("first message"))
+        handler.handle(self.log_record("second message"))
+        handler.close()
+
+        assert_that(log_file.read_text(encoding="utf-8"), equal_to("first message\nsecond message\n"))
+        assert_that(handler.metrics()["written_records"], equal_to(2))
+
+    def test_records_are_formatted_when_queued(self, tmp_path):
+        log_file = tmp_path / "minqlx_discord.log"
+        file_handler = self.file_handler(log_file)
+        handler = QueuedLogHandler(file_handler)
+        payload = {"op": 1}
+
+        file_handler.acquire()
+        try:
+            handler.handle(self.log_record("gateway payload %s", (payload,)))
+            payload["op"] = 2
+        finally:
+            file_handler.release()
+        handler.close()
+
+        assert_that(log_file.read_text(encoding="utf-8"), equal_to("gateway payload {'op': 1}\n"))
+
+    def test_closing_twice_is_harmless(self, tmp_path):
+        log_file = tmp_path / "minqlx_discord.log"
+        handler = QueuedLogHandler(self.file_handler(log_file))
+
+        handler.handle(self.log_record("only message"))
+        handler.close()
+        handler.close()
+
+        assert_that(log_file.read_text(encoding="utf-8"), equal_to("only message\n"))
+
+    def test_records_beyond_buffer_are_dropped_and_reported(self, tmp_path):
+        log_file = tmp_path / "minqlx_discord.log"
+        file_handler = self.file_handler(log_file)
+        handler = QueuedLogHandler(file_handler, max_buffer=1)
+
+        file_handler.acquire()
+        try:
+            handler.handle(self.log_record("written message"))
+            wait_until(handler.records.empty)
+            handler.handle(self.log_record("buffered message"))
+            handler.handle(self.log_record("dropped message"))
+        finally:
+            file_handler.release()
+        handler.close()
+
+        assert_that(handler.metrics()["dropped_records"], equal_to(1))
+        assert_that(
+            log_file.read_text(encoding="utf-8"),
+            equal_to("written message\nbuffered message\n1 log records dropped\n"),
+        )
+
+    def test_rotated_logs_are_compressed(self, tmp_path):
+        log_file = tmp_path / "minqlx_discord.log"
+        file_handler = self.file_handler(log_file, max_bytes=20, backup_count=2)
+        file_handler.namer = QueuedLogHandler.gzip_namer
+        file_handler.rotator = QueuedLogHandler.gzip_rotator
+        handler = QueuedLogHandler(file_handler)
+
+        handler.handle(self.log_record("first rotated message"))
+        wait_until(lambda: handler.writer.written_batches == 1)
+        handler.handle(self.log_record("second message"))
+        handler.close()
+
+        with gzip.open(tmp_path / "minqlx_discord.log.1.gz", "rt", encoding="utf-8") as rotated_file:
+            assert_that(rotated_file.read(), equal_to("first rotated message\n"))
+        assert_that(log_file.read_text(encoding="utf-8"), equal_to("second message\n"))
+
+    def test_extended_logger_writes_through_queued_handler(self, tmp_path):
+        setup_cvars(
+            {
+                "fs_homepath": str(tmp_path),
+                "qlx_logs": "5",
+                "qlx_logsSize": "1024",
+                "qlx_discordLogBufferSize": "50",
+                "qlx_discordCompressRotatedLogs": "1",
+            }
+        )
+        discord_logger = logging.getLogger("discord")
+        existing_handlers = list(discord_logger.handlers)
+        existing_level = discord_logger.level
+
+        SimpleAsyncDiscord.setup_extended_logger()
+
+        discord_logger.setLevel(existing_level)
+        added_handlers = [handler for handler in discord_logger.handlers if handler not in existing_handlers]
+        for handler in added_handlers:
+            discord_logger.removeHandler(handler)
+            handler.close()
+        queued_handlers = [handler for handler in added_handlers if isinstance(handler, QueuedLogHandler)]
+        assert_that(len(queued_handlers), equal_to(1))
+        assert_that(queued_handlers[0].records.maxsize, equal_to(50))
+        assert_that(queued_handlers[0].file_handler.namer, equal_to(QueuedLogHandler.gzip_namer))
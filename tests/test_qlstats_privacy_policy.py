@@ -74,6 +74,20 @@ class TestQlstatsPrivacyPolicy:
         yield response
         unstub(response, requests.Session)
 
+    def test_handle_plugin_unload_closes_http_session(self):
+        spy2(self.plugin.http_session.close)
+
+        self.plugin.handle_plugin_unload("qlstats_privacy_policy")
+
+        verify(self.plugin.http_session).close()
+
+    def test_handle_plugin_unload_of_other_plugin(self):
+        spy2(self.plugin.http_session.close)
+
+        self.plugin.handle_plugin_unload("otherplugin")
+
+        verify(self.plugin.http_session, times=0).close()
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_handle_player_connect_plugin_disable(self):
         self.plugin.plugin_enabled = False
@@ -186,6 +200,26 @@ class TestQlstatsPrivacyPolicy:
 
         verify(requests.Session).get(f"http://qlstats.net/elo/{connecting_player.steam_id}", timeout=any_())
 
+    @pytest.mark.usefixtures("game_in_progress")
+    def test_handle_player_connect_reuses_plugin_http_session(self):
+        when(self.plugin.http_session).get(...).thenReturn(None)
+
+        setup_cvars(
+            {
+                "qlx_qlstatsPrivacyKick": "0",
+                "qlx_qlstatsPrivacyBlock": "1",
+                "qlx_qlstatsPrivacyWhitelist": "public, anonymous",
+                "qlx_qlstatsPrivacyJoinAttempts": "5",
+            }
+        )
+
+        connecting_player = fake_player(123, "Connecting Player")
+
+        with ThreadContextManager(self.plugin):
+            self.plugin.handle_player_connect(connecting_player)
+
+        verify(self.plugin.http_session).get(f"http://qlstats.net/elo/{connecting_player.steam_id}", timeout=15)
+
     @pytest.mark.usefixtures("game_in_progress")
     def test_handle_player_connect_logs_error_if_result_status_not_ok(self, qlstats_response):
         qlstats_response.status_code = 500